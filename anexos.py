@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from esquema import unificar_categorias
+
+# === CONFIGURAÇÕES ===
+# Uma resposta inteira com pelo menos LIMIAR_LINHAS linhas marca o ente como "grande": as consultas seguintes
+# dele são divididas por anexo e feitas em paralelo. 5000 linhas = uma página ORDS (acima disso a paginação
+# é sequencial; por anexo, as páginas de anexos diferentes saem ao mesmo tempo)
+LIMIAR_LINHAS = int(os.environ.get("SICONFI_ANEXO_LINHAS", "5000"))
+PARALELISMO = int(os.environ.get("SICONFI_ANEXO_PARALELISMO", "4"))
+
+ANEXOS_RGF = [f"RGF-Anexo {n:02d}" for n in range(1, 7)]
+
+
+# === DIVISÃO POR ANEXO ===
+class DivisorAnexos:
+    def __init__(self, consultar, anexos_padrao=ANEXOS_RGF, limiar_linhas=None, paralelismo=None, familia=None):
+        # consultar(*args, anexo=None) -> DataFrame; deve levantar exceção em falha (não devolver vazio).
+        # familia(*args) -> chave das consultas do ente que costumam vir juntas vazias ou com dados (ex.: tipo de
+        # demonstrativo, periodicidade e poder); sem ela, todo ente grande é sempre consultado por anexo
+        self.consultar = consultar
+        self.anexos_padrao = list(anexos_padrao)
+        self.limiar_linhas = LIMIAR_LINHAS if limiar_linhas is None else limiar_linhas
+        self.paralelismo = PARALELISMO if paralelismo is None else paralelismo
+        self.familia = familia
+        self.anexos = {}  # ente grande -> anexos consultados um a um
+        self.com_dados = {}  # (ente, família) -> a resposta inteira já trouxe linhas
+
+    def grande(self, ente):
+        return ente in self.anexos
+
+    def obter(self, ente, *args):
+        chave = (ente, self.familia(*args)) if self.familia else None
+        if ente in self.anexos and (chave is None or self.com_dados.get(chave)):
+            return self._por_anexo(self.anexos[ente], args)
+
+        # Família que veio vazia (ex.: RGF Simplificado de um estado) ou ainda não vista: uma requisição só
+        try:
+            df = self.consultar(*args)
+        except Exception:
+            # Resposta inteira falhou (timeout de 60s, 5xx...): só esta consulta é refeita por anexo, em pedaços
+            # menores; o ente não muda de categoria por uma falha
+            return self._por_anexo(self.anexos.get(ente, self.anexos_padrao), args)
+
+        if chave is not None:
+            self.com_dados[chave] = self.com_dados.get(chave, False) or not df.empty
+        if ente not in self.anexos and len(df) >= self.limiar_linhas:
+            self._marcar(ente, df, f"{len(df)} linhas")
+        return df
+
+    def _marcar(self, ente, df, motivo):
+        observados = set(df["anexo"].dropna().astype(str)) if "anexo" in df.columns else set()
+        self.anexos[ente] = sorted(set(self.anexos_padrao) | observados)
+        print(f"✂️ Ente {ente}: {motivo} - próximas consultas divididas em {len(self.anexos[ente])} anexos")
+
+    def _por_anexo(self, anexos, args):
+        # Falha em qualquer anexo invalida o conjunto: resultado parcial não é devolvido como completo
+        with ThreadPoolExecutor(max_workers=max(self.paralelismo, 1)) as executor:
+            partes = list(executor.map(lambda anexo: self.consultar(*args, anexo=anexo), anexos))
+        partes = [df for df in partes if not df.empty]
+        if not partes:
+            return pd.DataFrame()
+        return pd.concat(unificar_categorias(partes), ignore_index=True)
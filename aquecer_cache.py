@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime
+import motor
+from armazem import gravar_no_armazem
+from cache_http import ARQUIVO_AQUECIMENTO, CACHE_PADRAO, cache_respostas
+from indicadores import atualizar_indicadores
+from indice_entes import gravar_indice
+from metricas import metricas
+from planejador import Planejador, trabalhadores_para_anos
+from prazo import configurar_prazo, prazo, segundos_do_texto
+
+# === AQUECIMENTO NOTURNO DO CACHE ===
+# Roda de madrugada (cron/agendador do Windows, ou --intervalo 24h) as mesmas consultas que o Streamlit faria
+# para o exercício corrente e o anterior: respostas no cache HTTP e linhas no armazém. De dia, as extrações do
+# Streamlit encontram as respostas frescas no disco e terminam em segundos
+def anos_padrao():
+    ano = datetime.now().year
+    return [ano - 1, ano]
+
+
+def grupos(entes, esfera):
+    # Mesmos grupos dos extratores (municípios por UF): as consultas em grupo (q=) só têm a mesma chave de
+    # cache se o grupo de entes for o mesmo
+    entes_esfera = entes[entes["esfera"] == esfera]
+    if esfera == "M":
+        return list(entes_esfera.groupby("uf"))
+    return [(esfera, entes_esfera)] if not entes_esfera.empty else []
+
+
+def gravador(relatorio):
+    # ao_concluir_ano do motor: cada exercício vai para o armazém assim que termina, sem esperar os outros
+    def gravar(ano, resultados, falhas):
+        if resultados:
+            gravar_no_armazem(resultados.concatenar(), relatorio)
+            resultados.limpar()
+    return gravar
+
+
+def contar_falhas(por_ano):
+    return sum(len(falhas) for _, falhas in por_ano.values())
+
+
+def aquecer(anos=None, relatorios=("RREO",)):
+    anos = anos or anos_padrao()
+    if not cache_respostas.ativo():
+        cache_respostas.diretorio = CACHE_PADRAO
+    cache_respostas.frescor = 0  # o job sempre pergunta à API (304 quando nada mudou)
+    inicio = time.time()
+    entes = motor.obter_entes(atualizar=True)
+    gravar_indice(entes)  # UFs da barra lateral do Streamlit em dia com o catálogo
+    print(f"🌙 Aquecendo {cache_respostas.diretorio} para {', '.join(relatorios)} {anos[0]}-{anos[-1]}")
+
+    falhas = 0
+    if "RREO" in relatorios:
+        planejador = Planejador("RREO", trabalhadores_para_anos(anos))
+        for esfera in ["U", "E", "D", "M"]:
+            for uf, grupo in planejador.ordenar_grupos(grupos(entes, esfera), len(motor.PERIODOS_RREO) * len(anos)):
+                falhas += contar_falhas(motor.extrair_rreo_anos(anos, grupo, planejador=planejador,
+                                                                descricao=f"Aquecimento RREO {esfera} {uf}",
+                                                                ao_concluir_ano=gravador("RREO")))
+    if "RGF" in relatorios:
+        planejador = Planejador("RGF", trabalhadores_para_anos(anos))
+        divisor = motor.divisor_rgf()
+        for esfera in motor.ESFERAS_RGF:
+            for uf, grupo in planejador.ordenar_grupos(grupos(entes, esfera), motor.consultas_rgf(esfera) * len(anos)):
+                falhas += contar_falhas(motor.extrair_rgf_anos(anos, esfera, grupo, divisor=divisor,
+                                                               planejador=planejador,
+                                                               descricao=f"Aquecimento RGF {esfera} {uf}",
+                                                               ao_concluir_ano=gravador("RGF")))
+
+    atualizar_indicadores()  # só as partições (ano, UF) que o aquecimento regravou
+
+    estado = {"ts": datetime.now().isoformat(timespec="seconds"), "anos": anos, "relatorios": list(relatorios),
+              "segundos": round(time.time() - inicio, 1), "unidades_sem_dados": falhas}
+    os.makedirs(cache_respostas.diretorio, exist_ok=True)
+    with open(os.path.join(cache_respostas.diretorio, ARQUIVO_AQUECIMENTO), "w", encoding="utf-8") as f:
+        json.dump(estado, f)
+    print(f"✅ Cache aquecido em {estado['segundos']}s ({falhas} unidade(s) sem dados)")
+    return estado
+
+
+if __name__ == "__main__":
+    # python aquecer_cache.py [--anos 2024-2025] [--rgf] [--time-budget 5h] [--intervalo 24h]
+    configurar_prazo()
+    relatorios = ("RREO", "RGF") if "--rgf" in sys.argv else ("RREO",)
+    intervalo = next((segundos_do_texto(sys.argv[i + 1]) for i, a in enumerate(sys.argv[:-1]) if a == "--intervalo"),
+                     None)
+    while True:
+        # Sem --anos, o corrente e o anterior de hoje (na virada do ano, a janela anda sozinha)
+        try:
+            anos = motor.anos_da_linha_de_comando([]) or anos_padrao()
+        except ValueError:
+            print("❌ Ano inválido.")
+            sys.exit(1)
+        prazo.iniciar(prazo.segundos)
+        metricas.reiniciar()
+        try:
+            aquecer(anos, relatorios)
+        finally:
+            metricas.salvar_execucao("AQUECIMENTO")
+        if not intervalo:
+            break
+        print(f"💤 Próximo aquecimento em {intervalo / 3600:.1f}h")
+        time.sleep(intervalo)
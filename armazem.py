@@ -0,0 +1,266 @@
+import hashlib
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+from esquema import ITENS_API
+from limitador import Trava
+from perfil import fase
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+except ImportError:  # pyarrow é opcional: sem ele o armazém local fica desativado
+    pa = None
+
+# === CONFIGURAÇÕES ===
+ARMAZEM_DIR = os.environ.get("SICONFI_ARMAZEM", "armazem")
+SEM_UF = "BR"
+
+# Colunas que identificam um "pedaço" extraído: ao regravar, as linhas com a mesma chave são substituídas
+CHAVES = {
+    "RREO": ["cod_ibge", "periodo"],
+    "RGF": ["cod_ibge", "periodicidade", "periodo", "poder"],
+}
+
+COLUNAS_INTEIRAS = ["cod_ibge", "ano", "periodo", "exercicio", "populacao"]
+COLUNAS_DECIMAIS = ["valor"]
+# Atributos do ente, não do demonstrativo: mudam sem que haja retificação
+FORA_DO_HASH = ["uf", "populacao"]
+
+
+def armazem_disponivel():
+    return pa is not None
+
+
+def _particionamento():
+    return ds.partitioning(pa.schema([("ano", pa.int32()), ("uf", pa.string())]), flavor="hive")
+
+
+def caminho_particao(relatorio, ano, uf):
+    return os.path.join(ARMAZEM_DIR, relatorio, f"ano={ano}", f"uf={uf}", "dados.parquet")
+
+
+def relatorios_disponiveis():
+    if not os.path.isdir(ARMAZEM_DIR):
+        return []
+    return sorted(d for d in os.listdir(ARMAZEM_DIR)
+                  if os.path.isdir(os.path.join(ARMAZEM_DIR, d)) and not d.startswith("_"))
+
+
+def _normalizar(df):
+    # Tipos estáveis entre gravações, para que as partições formem um único schema
+    df = df.copy()
+    for coluna in df.columns:
+        if coluna in COLUNAS_INTEIRAS:
+            df[coluna] = pd.to_numeric(df[coluna], errors="coerce").astype("Int64")
+        elif coluna in COLUNAS_DECIMAIS:
+            df[coluna] = pd.to_numeric(df[coluna], errors="coerce").astype("float64")
+        else:
+            df[coluna] = df[coluna].astype("string")
+    return df
+
+
+# === GRAVAÇÃO ===
+def trava(relatorio):
+    # Vários extratores podem gravar ao mesmo tempo (SICONFI_TAXA): partições e índice de hashes são
+    # lidos, alterados e regravados, então um processo espera o outro terminar
+    return Trava(os.path.join(ARMAZEM_DIR, "_travas", f"{relatorio}.trava"))
+
+
+def caminho_temporario(caminho):
+    # Um por processo, e com "." na frente para a leitura do dataset ignorar o arquivo pela metade
+    pasta, nome = os.path.split(caminho)
+    return os.path.join(pasta, f".{nome}.{os.getpid()}.tmp")
+
+
+def gravar_no_armazem(df, relatorio):
+    if not armazem_disponivel():
+        print("⚠️ pyarrow não instalado - armazém local desativado.")
+        return
+    if df.empty:
+        return
+
+    with fase("armazem"):
+        normalizado = _normalizar(df)
+        hashes = hashes_de_conteudo(normalizado, relatorio)
+        with trava(relatorio):
+            _gravar_particoes(normalizado, relatorio)
+            _gravar_hashes(hashes, relatorio)
+    print(f"🗄️ Armazém local atualizado: {relatorio} ({len(df)} linhas)")
+
+
+def _gravar_particoes(df, relatorio):
+    if "uf" not in df.columns:
+        df["uf"] = SEM_UF
+    df["uf"] = df["uf"].fillna(SEM_UF)
+    chaves = [c for c in CHAVES.get(relatorio, ["cod_ibge", "periodo"]) if c in df.columns]
+
+    for (ano, uf), parte in df.groupby(["ano", "uf"], sort=False):
+        caminho = caminho_particao(relatorio, ano, uf)
+        parte = parte.drop(columns=["ano", "uf"])
+        if os.path.exists(caminho):
+            existente = pd.read_parquet(caminho)
+            if chaves:
+                novas = pd.MultiIndex.from_frame(parte[chaves].drop_duplicates())
+                manter = ~pd.MultiIndex.from_frame(existente[chaves]).isin(novas)
+                existente = existente[manter]
+            parte = pd.concat([existente, parte], ignore_index=True)
+
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = caminho_temporario(caminho)
+        parte.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho)
+
+
+# === HASHES DE CONTEÚDO ===
+# Um hash por (ente, período, anexo), independente da ordem das linhas: permite revalidar o que está
+# guardado contra a API sem baixar/comparar o conteúdo inteiro (ver retificacao.py)
+def chaves_hash(relatorio):
+    return ["ano"] + CHAVES.get(relatorio, ["cod_ibge", "periodo"]) + ["anexo"]
+
+
+def caminho_hashes(relatorio):
+    return os.path.join(ARMAZEM_DIR, "_hashes", f"{relatorio}.parquet")
+
+
+def hashes_de_conteudo(normalizado, relatorio):
+    # normalizado: saída de _normalizar, para que dados guardados e recém-baixados gerem o mesmo hash
+    chaves = [c for c in chaves_hash(relatorio) if c in normalizado.columns]
+    colunas = sorted(c for c in normalizado.columns if c in ITENS_API.get(relatorio, {})
+                     and c not in chaves and c not in FORA_DO_HASH)
+    if normalizado.empty or "anexo" not in chaves or not colunas:
+        return pd.DataFrame(columns=chaves + ["hash", "linhas"])
+    # Os tipos já saem estáveis de _normalizar (Int64/float64/string): hash direto, sem cópia em texto
+    linhas = pd.Series(pd.util.hash_pandas_object(normalizado[colunas], index=False).values, index=normalizado.index)
+    grupos = linhas.groupby([normalizado[c] for c in chaves], sort=True, dropna=False)
+    hashes = grupos.agg(lambda h: hashlib.sha1(np.sort(h.values).tobytes()).hexdigest()[:16])
+    resultado = pd.DataFrame({"hash": hashes, "linhas": grupos.size()}).reset_index()
+    return resultado[chaves + ["hash", "linhas"]]
+
+
+def _gravar_hashes(hashes, relatorio):
+    if hashes.empty:
+        return
+    caminho = caminho_hashes(relatorio)
+    # Regravar uma série (ente, período...) substitui todos os seus anexos: anexo que sumiu some do índice
+    serie = [c for c in hashes.columns if c not in ("anexo", "hash", "linhas")]
+    if os.path.exists(caminho):
+        existente = pd.read_parquet(caminho)
+        novas = pd.MultiIndex.from_frame(hashes[serie].drop_duplicates())
+        existente = existente[~pd.MultiIndex.from_frame(existente[serie]).isin(novas)]
+        hashes = pd.concat([existente, hashes], ignore_index=True)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho_temporario(caminho)
+    hashes.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def hashes_guardados(relatorio, ano=None):
+    # Armazém anterior ao índice de hashes: calcula a partir dos próprios dados guardados
+    caminho = caminho_hashes(relatorio)
+    if os.path.exists(caminho):
+        hashes = pd.read_parquet(caminho)
+    elif os.path.isdir(os.path.join(ARMAZEM_DIR, relatorio)):
+        hashes = hashes_de_conteudo(_normalizar(abrir_dataset(relatorio).to_table().to_pandas()), relatorio)
+        with trava(relatorio):
+            _gravar_hashes(hashes, relatorio)
+    else:
+        return pd.DataFrame(columns=chaves_hash(relatorio) + ["hash", "linhas"])
+    return hashes if ano is None else hashes[hashes["ano"] == ano].reset_index(drop=True)
+
+
+def importar_zip(caminho_zip, relatorio=None):
+    # Importa uma saída já extraída (CSV dentro de ZIP) para o armazém local
+    relatorio = relatorio or os.path.basename(caminho_zip).split("_")[0]
+    with zipfile.ZipFile(caminho_zip) as zipf:
+        for nome in zipf.namelist():
+            if nome.endswith(".csv"):
+                with zipf.open(nome) as f:
+                    gravar_no_armazem(pd.read_csv(f, sep=";", encoding="utf-8", low_memory=False), relatorio)
+
+
+def importar_diretorio(diretorio, relatorio=None):
+    arquivos = sorted(f for f in os.listdir(diretorio) if f.endswith(".zip"))
+    for nome in arquivos:
+        print(f"📥 Importando {nome}")
+        importar_zip(os.path.join(diretorio, nome), relatorio)
+    return len(arquivos)
+
+
+# === LEITURA PREGUIÇOSA ===
+def abrir_dataset(relatorio):
+    # Leitura com memory-map: só as colunas/linhas filtradas são carregadas de fato
+    return ds.dataset(os.path.join(ARMAZEM_DIR, relatorio), format="parquet",
+                      partitioning=_particionamento(),
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def montar_filtro(filtros):
+    expressao = None
+    for coluna, valor in (filtros or {}).items():
+        if valor is None or valor == "" or valor == []:
+            continue
+        if coluna in ("ente", "conta") and isinstance(valor, str):
+            condicao = pc.match_substring(ds.field(coluna), valor, ignore_case=True)
+        elif isinstance(valor, (list, tuple, set)):
+            condicao = ds.field(coluna).isin(list(valor))
+        else:
+            condicao = ds.field(coluna) == valor
+        expressao = condicao if expressao is None else expressao & condicao
+    return expressao
+
+
+def consultar_pagina(relatorio, filtros=None, pagina=0, tamanho_pagina=100, colunas=None):
+    dataset = abrir_dataset(relatorio)
+    scanner = dataset.scanner(columns=colunas, filter=montar_filtro(filtros))
+    total = scanner.count_rows()
+
+    inicio = pagina * tamanho_pagina
+    fim = inicio + tamanho_pagina
+    lotes = []
+    posicao = 0
+    for lote in scanner.to_batches():
+        if posicao + lote.num_rows > inicio:
+            corte_ini = max(inicio - posicao, 0)
+            corte_fim = min(fim - posicao, lote.num_rows)
+            lotes.append(lote.slice(corte_ini, corte_fim - corte_ini))
+        posicao += lote.num_rows
+        if posicao >= fim:
+            break
+
+    if not lotes:
+        return pd.DataFrame(columns=colunas or dataset.schema.names), total
+    return pa.Table.from_batches(lotes).to_pandas(), total
+
+
+def valores_distintos(relatorio, coluna, filtros=None):
+    tabela = abrir_dataset(relatorio).to_table(columns=[coluna], filter=montar_filtro(filtros))
+    return sorted(v for v in pc.unique(tabela[coluna]).to_pylist() if v is not None)
+
+
+def ultimos_periodos(relatorio, ano, chaves):
+    # Maior período já guardado no exercício para cada combinação de chaves (ex.: cod_ibge)
+    if not armazem_disponivel() or not os.path.isdir(os.path.join(ARMAZEM_DIR, relatorio)):
+        return {}
+    dataset = abrir_dataset(relatorio)
+    if any(c not in dataset.schema.names for c in chaves + ["periodo"]):
+        return {}
+    tabela = dataset.to_table(columns=chaves + ["periodo"], filter=ds.field("ano") == ano)
+    agregado = tabela.group_by(chaves).aggregate([("periodo", "max")]).to_pydict()
+    return {
+        tuple(agregado[c][i] for c in chaves) if len(chaves) > 1 else agregado[chaves[0]][i]: ultimo
+        for i, ultimo in enumerate(agregado["periodo_max"])
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Uso: python armazem.py <diretório com ZIPs> [RREO|RGF]")
+    else:
+        total = importar_diretorio(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"✅ {total} arquivo(s) importado(s) para {ARMAZEM_DIR}")
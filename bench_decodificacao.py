@@ -0,0 +1,87 @@
+import argparse
+import json
+import random
+import time
+import pandas as pd
+import decodificacao
+
+# === PAYLOAD REALISTA: anexos de RREO de um estado grande ===
+COLUNAS_RREO = ["PREVISÃO INICIAL", "PREVISÃO ATUALIZADA", "RECEITAS REALIZADAS ATÉ O BIMESTRE",
+                "DOTAÇÃO INICIAL", "DESPESAS EMPENHADAS ATÉ O BIMESTRE", "DESPESAS LIQUIDADAS ATÉ O BIMESTRE"]
+
+
+def gerar_payload(linhas, semente=7):
+    rnd = random.Random(semente)
+    itens = []
+    for n in range(linhas):
+        anexo = f"RREO-Anexo {n % 14 + 1:02d}"
+        itens.append({
+            "exercicio": 2024, "demonstrativo": "RREO", "periodo": 6, "periodicidade": "B",
+            "instituicao": "Governo do Estado de São Paulo", "cod_ibge": 35, "uf": "SP",
+            "populacao": 46024937, "anexo": anexo, "esfera": "E",
+            "rotulo": "Padrão" if n % 7 else "Receitas Intraorçamentárias",
+            "coluna": COLUNAS_RREO[n % len(COLUNAS_RREO)],
+            "cod_conta": f"RREO{n % 14 + 1}TotalReceitas{n % 500:04d}",
+            "conta": f"Receitas Correntes - item {n % 500} do {anexo}",
+            "valor": None if n % 97 == 0 else round(rnd.uniform(-1e6, 5e10), 2),
+        })
+    corpo = json.dumps({"items": itens, "hasMore": False, "limit": linhas, "offset": 0,
+                        "count": linhas, "links": []}, ensure_ascii=False)
+    return corpo.encode("utf-8")
+
+
+# === ESTRATÉGIAS ===
+def json_mais_dataframe(corpo):
+    return pd.DataFrame(json.loads(corpo)["items"])
+
+
+def orjson_mais_dataframe(corpo):
+    return pd.DataFrame(decodificacao.loads(corpo)["items"])
+
+
+def pyarrow_colunar(corpo):
+    return decodificacao.dataframe_de_paginas([decodificacao.decodificar_colunar(corpo, "RREO")["items"]], "RREO")
+
+
+ESTRATEGIAS = {
+    "json + DataFrame(itens)": json_mais_dataframe,
+    "orjson + DataFrame(itens)": orjson_mais_dataframe,
+    "pyarrow colunar (esquema)": pyarrow_colunar,
+}
+
+
+def medir(funcao, corpo, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        df = funcao(corpo)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark da decodificação das respostas da API")
+    parser.add_argument("--linhas", type=int, default=40000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    corpo = gerar_payload(args.linhas)
+    print(f"📦 Payload: {args.linhas} linhas, {len(corpo) / 1024 ** 2:.1f} MB | "
+          f"orjson {'sim' if decodificacao.orjson else 'não'} | pyarrow {'sim' if decodificacao._arrow() else 'não'}")
+
+    referencia = None
+    base = None
+    for nome, funcao in ESTRATEGIAS.items():
+        tempo, df = medir(funcao, corpo, args.repeticoes)
+        base = base or tempo
+        memoria = df.memory_usage(deep=True).sum() / 1024 ** 2
+        if referencia is None:
+            referencia = df
+        else:
+            pd.testing.assert_frame_equal(df, referencia, check_dtype=False, check_categorical=False)
+        print(f"  {nome:<28} {tempo * 1000:>8.1f} ms  ({base / tempo:>4.1f}x)  {memoria:>6.1f} MB")
+    print("✅ Todas as estratégias produzem o mesmo DataFrame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import zipfile
+import pandas as pd
+import armazem
+import perfil
+import cliente_siconfi
+import motor
+import stub_siconfi
+from metricas import metricas
+
+# === CONFIGURAÇÕES ===
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = {"RREO": "extrairRREO-local.py", "RGF": "extraiRGF-local-v3.py"}
+
+
+def carregar_script(relatorio, url_base, saida):
+    # Os extratores são scripts (nome com hífen), então são carregados pelo caminho do arquivo
+    caminho = os.path.join(RAIZ, SCRIPTS[relatorio])
+    spec = importlib.util.spec_from_file_location(f"extrator_{relatorio.lower()}", caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    # URLs e pausa ficam no núcleo comum (motor.py); a pasta de saída é de cada script
+    for atributo in ("URL_ENTES", "URL_RREO", "URL_RGF"):
+        if url_base:
+            setattr(motor, atributo, f"{url_base}/{atributo[4:].lower()}")
+    motor.PAUSA_ENTRE_REQUISICOES = 0
+    modulo.OUTPUT_DIR = saida
+    os.makedirs(saida, exist_ok=True)
+    return modulo
+
+
+# === CENÁRIOS ===
+def cenario_rreo(modulo, ano):
+    entes = modulo.obter_entes()
+    for esfera in ["E", "U", "D"]:
+        modulo.executar_extracao(ano, entes[entes["esfera"] == esfera], esfera)
+    for uf in sorted(entes[entes["esfera"] == "M"]["uf"].unique()):
+        modulo.executar_extracao(ano, entes[(entes["esfera"] == "M") & (entes["uf"] == uf)], "M", uf)
+
+
+def cenario_rgf(modulo, ano):
+    for esfera in modulo.esferas:
+        modulo.extrair_para_esfera(ano, esfera)
+
+
+CENARIOS = {"RREO": cenario_rreo, "RGF": cenario_rgf}
+
+
+# === EQUIVALÊNCIA DE SAÍDAS ===
+def assinatura_saidas(diretorio):
+    # Hash de cada arquivo gerado (sem o timestamp do nome), independente da ordem das linhas
+    assinaturas = {}
+    for nome in sorted(os.listdir(diretorio)):
+        if not nome.endswith(".zip"):
+            continue
+        with zipfile.ZipFile(os.path.join(diretorio, nome)) as zipf:
+            with zipf.open(zipf.namelist()[0]) as f:
+                df = pd.read_csv(f, sep=";", dtype=str, keep_default_na=False)
+        df = df[sorted(df.columns)]
+        linhas = sorted("|".join(valores) for valores in df.itertuples(index=False, name=None))
+        sha1 = hashlib.sha1("\n".join(["|".join(df.columns)] + linhas).encode("utf-8")).hexdigest()
+        assinaturas[nome.rsplit("_", 2)[0]] = {"linhas": len(df), "sha1": sha1}
+    return assinaturas
+
+
+def comparar(assinaturas, referencia):
+    diferencas = sorted(k for k in set(assinaturas) | set(referencia)
+                        if assinaturas.get(k, {}).get("sha1") != referencia.get(k, {}).get("sha1"))
+    return {"equivalente": not diferencas, "diferencas": diferencas}
+
+
+# === EXECUÇÃO ===
+def executar_cenario(relatorio, url_base, ano, diretorio_trabalho, com_perfil=False):
+    saida = os.path.join(diretorio_trabalho, relatorio)
+    armazem.ARMAZEM_DIR = os.path.join(diretorio_trabalho, "armazem")
+    modulo = carregar_script(relatorio, url_base, saida)
+
+    metricas.reiniciar()
+    if com_perfil:
+        perfil.iniciar()  # o perfil já liga o tracemalloc
+    else:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    CENARIOS[relatorio](modulo, ano)
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    if com_perfil:
+        perfil.finalizar(f"bench_{relatorio}")
+    else:
+        tracemalloc.stop()
+
+    resumo = metricas.resumo()
+    assinaturas = assinatura_saidas(saida)
+    linhas = sum(a["linhas"] for a in assinaturas.values())
+    return {
+        "relatorio": relatorio,
+        "duracao_s": round(duracao, 3),
+        "requisicoes": resumo["requisicoes"],
+        "req_por_segundo": round(resumo["requisicoes"] / duracao, 2) if duracao else 0,
+        "linhas": linhas,
+        "linhas_por_segundo": round(linhas / duracao, 1) if duracao else 0,
+        "pico_memoria_mb": round(pico / 1024 ** 2, 2),
+        "latencia": resumo["latencia"],
+        "resultados": resumo["resultados"],
+        "hedge": resumo["hedge"],
+        "timeouts_adaptativos": resumo["timeouts_adaptativos"],
+        "saidas": assinaturas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos extratores RREO/RGF contra o stub local do Siconfi")
+    parser.add_argument("--fixtures", help="diretório de fixtures (padrão: fixtures sintéticas temporárias)")
+    parser.add_argument("--relatorios", nargs="+", default=list(SCRIPTS), choices=list(SCRIPTS))
+    parser.add_argument("--ano", type=int, default=2024)
+    parser.add_argument("--latencia", type=float, default=0.0)
+    parser.add_argument("--erro", type=float, default=0.0)
+    parser.add_argument("--taxa-429", type=float, default=0.0)
+    parser.add_argument("--taxa-lenta", type=float, default=0.0, help="fração de respostas retardatárias no stub")
+    parser.add_argument("--latencia-lenta", type=float, default=5.0)
+    parser.add_argument("--limite-pagina", type=int, default=stub_siconfi.LIMITE_PAGINA)
+    parser.add_argument("--replay", help="reproduz uma gravação do cliente (.jsonl.gz) em vez de subir o stub")
+    parser.add_argument("--referencia", help="JSON de assinaturas para checar equivalência das saídas")
+    parser.add_argument("--salvar-referencia", action="store_true", help="grava as assinaturas desta execução em --referencia")
+    parser.add_argument("--profile", action="store_true", help="perfil de CPU/memória por fase de cada cenário")
+    parser.add_argument("--relatorio-saida", help="grava o relatório do benchmark em JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_siconfi_") as trabalho:
+        referencia = os.path.abspath(args.referencia) if args.referencia else None
+        relatorio_saida = os.path.abspath(args.relatorio_saida) if args.relatorio_saida else None
+        perfil.PERFIL_DIR = os.path.abspath(perfil.PERFIL_DIR)
+
+        if args.replay:
+            # Sem rede: isola o custo de pandas e de escrita das saídas
+            cliente_siconfi.iniciar_replay(args.replay)
+            servidor, url_base = None, None
+        else:
+            fixtures = args.fixtures
+            if not fixtures:
+                fixtures = os.path.join(trabalho, "fixtures")
+                stub_siconfi.gerar_fixtures(fixtures, ano=args.ano)
+            servidor, url_base = stub_siconfi.iniciar_em_segundo_plano(
+                diretorio=os.path.abspath(fixtures), latencia=args.latencia, taxa_erro=args.erro,
+                taxa_429=args.taxa_429, limite_pagina=args.limite_pagina, taxa_lenta=args.taxa_lenta,
+                latencia_lenta=args.latencia_lenta)
+        diretorio_original = os.getcwd()
+        os.chdir(trabalho)
+        try:
+            resultados = [executar_cenario(r, url_base, args.ano, trabalho, args.profile) for r in args.relatorios]
+        finally:
+            os.chdir(diretorio_original)
+            if servidor:
+                servidor.shutdown()
+
+    assinaturas = {k: v for r in resultados for k, v in r["saidas"].items()}
+    if referencia and args.salvar_referencia:
+        with open(referencia, "w", encoding="utf-8") as f:
+            json.dump(assinaturas, f, indent=2)
+        print(f"📄 Referência salva: {referencia}")
+    elif referencia:
+        with open(referencia, encoding="utf-8") as f:
+            assinaturas_ref = json.load(f)
+        for r in resultados:
+            prefixo = f"{r['relatorio']}_"
+            r["equivalencia"] = comparar(r["saidas"], {k: v for k, v in assinaturas_ref.items() if k.startswith(prefixo)})
+
+    print("\n📊 Benchmark dos extratores")
+    for r in resultados:
+        print(f"  {r['relatorio']}: {r['duracao_s']}s | {r['requisicoes']} req ({r['req_por_segundo']} req/s) | "
+              f"{r['linhas']} linhas ({r['linhas_por_segundo']} linhas/s) | pico {r['pico_memoria_mb']} MB | "
+              f"p95 {r['latencia']['p95']}s p99 {r['latencia']['p99']}s")
+        if r["hedge"]["duplicadas"] or r["timeouts_adaptativos"]:
+            print(f"    🪞 {r['hedge']['duplicadas']} duplicada(s), {r['hedge']['duplicada_venceu']} venceram, "
+                  f"{r['hedge']['segundos_economizados']}s de cauda economizados | "
+                  f"{r['timeouts_adaptativos']} timeout(s) adaptativo(s)")
+        if "equivalencia" in r:
+            eq = r["equivalencia"]
+            print("    ✅ Saídas equivalentes à referência" if eq["equivalente"]
+                  else f"    ❌ Saídas diferentes: {', '.join(eq['diferencas'])}")
+
+    if relatorio_saida:
+        with open(relatorio_saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import stub_siconfi
+
+# === CONFIGURAÇÕES ===
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(RAIZ, "extrairRREO-v6.py")
+# Módulos que a tela importa no topo hoje, e os que importava antes de adiar motor/pandas para a extração
+IMPORTS_TELA = "import streamlit, cache_http, incremental, indice_entes"
+IMPORTS_ANTIGOS = "import streamlit, pandas, base64, motor, cache_http, armazem, metricas, perfil, saidas"
+
+# Roda num processo novo (sem nada importado nem em cache): tempo até o fim da primeira execução do script, que é
+# quando o Streamlit pinta a tela, e de uma segunda execução (um clique na barra lateral)
+MEDIR_APP = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+importado = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+app.run()
+primeira = time.perf_counter()
+app.sidebar.radio[0].set_value("Municípios (M)").run()
+segunda = time.perf_counter()
+print(json.dumps({"primeira_pintura_s": round(primeira - importado, 3), "reexecucao_s": round(segunda - primeira, 3),
+                  "ufs": list(app.sidebar.selectbox[0].options), "erros": [e.value for e in app.exception]}))
+"""
+
+MEDIR_IMPORTS = """
+import json, sys, time
+inicio = time.perf_counter()
+exec(sys.argv[1])
+print(json.dumps(round(time.perf_counter() - inicio, 3)))
+"""
+
+
+def medir(codigo, *argumentos, ambiente=None, cwd=None):
+    saida = subprocess.run([sys.executable, "-c", codigo, *argumentos], capture_output=True, text=True, check=True,
+                           env=ambiente, cwd=cwd)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo até a primeira pintura do Streamlit (extrairRREO-v6.py)")
+    parser.add_argument("--latencia-entes", type=float, default=2.0,
+                        help="latência do stub, para simular o catálogo de entes lento da API (s)")
+    parser.add_argument("--relatorio-saida", help="grava o resultado em JSON")
+    args = parser.parse_args()
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        print("❌ streamlit não está instalado (pip install streamlit)")
+        sys.exit(1)
+
+    resultado = {"imports_tela_s": medir(MEDIR_IMPORTS, IMPORTS_TELA, cwd=RAIZ),
+                 "imports_antigos_s": medir(MEDIR_IMPORTS, IMPORTS_ANTIGOS, cwd=RAIZ)}
+    with tempfile.TemporaryDirectory(prefix="bench_streamlit_") as trabalho:
+        fixtures = os.path.join(trabalho, "fixtures")
+        stub_siconfi.gerar_fixtures(fixtures)
+        servidor, url_base = stub_siconfi.iniciar_em_segundo_plano(diretorio=fixtures, latencia=args.latencia_entes)
+        indice = os.path.join(trabalho, "indice_entes.json")
+        ambiente = dict(os.environ, SICONFI_URL=url_base, SICONFI_INDICE_ENTES=indice,
+                        SICONFI_CACHE_HTTP="", PYTHONPATH=RAIZ)
+        try:
+            # Sem índice (primeira vez na máquina): a tela sai com as 27 UFs e o catálogo chega depois, gravando
+            # o índice; com índice, as UFs já são as do catálogo
+            resultado["sem_indice"] = medir(MEDIR_APP, APP, ambiente=ambiente, cwd=trabalho)
+            resultado["indice_gravado"] = os.path.exists(indice)
+            resultado["com_indice"] = medir(MEDIR_APP, APP, ambiente=ambiente, cwd=trabalho)
+        finally:
+            servidor.shutdown()
+
+    print("\n🖼️ Inicialização do Streamlit")
+    print(f"  imports do topo: {resultado['imports_tela_s']}s (antes: {resultado['imports_antigos_s']}s)")
+    for cenario in ("sem_indice", "com_indice"):
+        r = resultado[cenario]
+        print(f"  {cenario}: primeira pintura {r['primeira_pintura_s']}s | reexecução {r['reexecucao_s']}s | "
+              f"{len(r['ufs']) - 1} UF(s) na barra lateral" + (f" | ❌ {r['erros']}" if r["erros"] else ""))
+    print(f"  índice gravado pelo catálogo em segundo plano: {'✅' if resultado['indice_gravado'] else '❌'}")
+    if args.relatorio_saida:
+        with open(args.relatorio_saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
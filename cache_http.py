@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+# === CONFIGURAÇÕES ===
+# SICONFI_CACHE_HTTP=pasta guarda cada resposta da API com os validadores (ETag/Last-Modified) e um hash do
+# conteúdo. A próxima consulta igual sai condicional: 304 = o corpo vem do disco. Vazio = desligado
+CACHE_DIR = os.environ.get("SICONFI_CACHE_HTTP", "")
+# Resposta verificada há menos de FRESCOR segundos sai direto do disco, sem requisição nenhuma (0 = sempre
+# revalida). O aquecimento noturno (aquecer_cache.py) grava em CACHE_PADRAO; o Streamlit lê de lá por um dia
+FRESCOR = float(os.environ.get("SICONFI_CACHE_FRESCOR", "0"))
+CACHE_PADRAO = "cache_http"
+FRESCOR_AQUECIDO = 26 * 3600  # um dia + folga para o job noturno atrasar
+ARQUIVO_AQUECIMENTO = "ultimo_aquecimento.json"
+
+
+def hash_conteudo(corpo):
+    return hashlib.blake2b(corpo, digest_size=16).hexdigest()
+
+
+# === CACHE DE RESPOSTAS COM REVALIDAÇÃO ===
+# Cada (URL, parâmetros) vira dois arquivos: <hash>.json (validadores, hash e tamanho do corpo) e <hash>.gz (o
+# corpo). O corpo é gravado antes dos metadados, para um .json nunca apontar para um corpo que não existe
+class CacheRespostas:
+    def __init__(self, diretorio=None, frescor=None):
+        self.diretorio = CACHE_DIR if diretorio is None else diretorio
+        self.frescor = FRESCOR if frescor is None else frescor
+
+    def ativo(self):
+        return bool(self.diretorio)
+
+    def _base(self, url, params):
+        chave = url + "?" + urlencode(sorted((k, str(v)) for k, v in (params or {}).items()))
+        nome = hashlib.sha1(chave.encode("utf-8")).hexdigest()
+        return os.path.join(self.diretorio, nome[:2], nome)
+
+    def _gravar(self, caminho, dados, abrir=open):
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with abrir(temporario, "wb") as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+
+    def ler(self, url, params):
+        if not self.ativo():
+            return None
+        try:
+            with open(self._base(url, params) + ".json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _corpo(self, url, params):
+        with gzip.open(self._base(url, params) + ".gz", "rb") as f:
+            return f.read()
+
+    def tem_fresca(self, url, params):
+        if not self.frescor:
+            return False
+        entrada = self.ler(url, params)
+        return bool(entrada) and time.time() - entrada.get("verificado", 0) <= self.frescor
+
+    def fresca(self, url, params):
+        # Corpo guardado, se foi verificado dentro da janela de frescor; None = precisa ir à API
+        if not self.tem_fresca(url, params):
+            return None
+        try:
+            return self._corpo(url, params)
+        except OSError:
+            return None
+
+    def validadores(self, entrada):
+        # Cabeçalhos da requisição condicional; sem entrada (ou servidor sem validadores), nenhum
+        cabecalhos = {}
+        if entrada and entrada.get("etag"):
+            cabecalhos["If-None-Match"] = entrada["etag"]
+        if entrada and entrada.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = entrada["last_modified"]
+        return cabecalhos
+
+    def do_cache(self, response, url, params, entrada):
+        # 304: a resposta passa a ser a guardada (status 200). None se o corpo sumiu do disco
+        try:
+            corpo = self._corpo(url, params)
+        except OSError:
+            return None
+        response.status_code = 200
+        response._content = corpo
+        response.origem_cache = "revalidada"
+        response.bytes_economizados = len(corpo)
+        entrada["verificado"] = round(time.time())
+        self._gravar(self._base(url, params) + ".json", json.dumps(entrada).encode("utf-8"))
+        return response
+
+    def guardar(self, response, url, params, entrada):
+        # 200: guarda corpo e validadores. Sem validadores, o hash diz se o conteúdo mudou desde a última vez
+        # (igual = não regrava o corpo e a resposta conta como acerto do cache)
+        corpo = response.content
+        hash_novo = hash_conteudo(corpo)
+        igual = entrada is not None and entrada.get("hash") == hash_novo
+        base = self._base(url, params)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        if not igual or not os.path.exists(base + ".gz"):
+            self._gravar(base + ".gz", corpo, lambda caminho, modo: gzip.open(caminho, modo, compresslevel=6))
+        metadados = {"url": url, "etag": response.headers.get("ETag"),
+                     "last_modified": response.headers.get("Last-Modified"), "hash": hash_novo,
+                     "bytes": len(corpo), "verificado": round(time.time())}
+        self._gravar(base + ".json", json.dumps(metadados).encode("utf-8"))
+        if igual:
+            response.origem_cache = "igual"
+        return response
+
+
+def ultimo_aquecimento(diretorio=CACHE_PADRAO):
+    # Resumo da última execução do aquecer_cache.py nesta pasta (None = nunca rodou)
+    try:
+        with open(os.path.join(diretorio, ARQUIVO_AQUECIMENTO), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+cache_respostas = CacheRespostas()
@@ -0,0 +1,453 @@
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+from cache_http import cache_respostas
+from decodificacao import dataframe_de_paginas, decodificar_colunar, loads
+from limitador import limitador
+from metricas import metricas, percentil
+from perfil import fase
+
+# === CONFIGURAÇÕES ===
+# SICONFI_GRAVAR=arquivo.jsonl.gz grava todo o tráfego; SICONFI_REPLAY=arquivo.jsonl.gz reproduz sem rede
+_estado = {"gravacao": None, "replay": None, "sessao": None}
+_lock = threading.Lock()
+_local = threading.local()  # por thread: houve requisição à API desde a última pausa?
+
+# Disjuntor: requisições diferentes com falha de rede/5xx, sem sucesso no meio, até abrir (as repetições de uma
+# mesma consulta contam uma vez só: um único ente com erro 500 não para a extração), espera inicial e máxima
+# entre sondas (segundos) e limite de uma parada (0 = espera a API voltar pelo tempo que for)
+DISJUNTOR_FALHAS = int(os.environ.get("SICONFI_DISJUNTOR_FALHAS", "5"))
+DISJUNTOR_ESPERA = float(os.environ.get("SICONFI_DISJUNTOR_ESPERA", "30"))
+DISJUNTOR_ESPERA_MAXIMA = float(os.environ.get("SICONFI_DISJUNTOR_ESPERA_MAXIMA", "300"))
+DISJUNTOR_LIMITE = float(os.environ.get("SICONFI_DISJUNTOR_LIMITE", "0"))
+TIMEOUT_SONDA = 15
+
+# Timeout adaptativo: FATOR_TIMEOUT x p99 recente do endpoint (nunca abaixo de TIMEOUT_MINIMO nem acima do
+# timeout pedido). Hedge (opcional): requisição duplicada quando a original passa do p95, limitada ao
+# ORCAMENTO_HEDGE das requisições
+TIMEOUT_ADAPTATIVO = os.environ.get("SICONFI_TIMEOUT_ADAPTATIVO", "1") == "1"
+HEDGE = os.environ.get("SICONFI_HEDGE") == "1"
+FATOR_TIMEOUT = 3
+TIMEOUT_MINIMO = 5
+AMOSTRAS_MINIMAS = 20
+ORCAMENTO_HEDGE = 0.1
+# Conexões mantidas abertas por host (entes, anos e anexos em paralelo + cópias do hedge)
+POOL_CONEXOES = int(os.environ.get("SICONFI_POOL_CONEXOES", "16"))
+
+
+class RespostaNaoGravada(Exception):
+    pass
+
+
+def _chave(url, params):
+    # Ignora o host: uma gravação feita contra a API real pode ser reproduzida em qualquer ambiente
+    endpoint = url.rstrip("/").rsplit("/", 1)[-1]
+    return endpoint + "?" + "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+
+
+# === GRAVAÇÃO E REPLAY ===
+def iniciar_gravacao(caminho):
+    with _lock:
+        _estado["gravacao"] = gzip.open(caminho, "at", encoding="utf-8", compresslevel=6)
+    print(f"⏺️ Gravando tráfego da API em {caminho}")
+
+
+def iniciar_replay(caminho):
+    respostas = defaultdict(deque)
+    with gzip.open(caminho, "rt", encoding="utf-8") as f:
+        for linha in f:
+            registro = json.loads(linha)
+            respostas[registro["chave"]].append(registro)
+    with _lock:
+        _estado["replay"] = respostas
+    print(f"⏯️ Reproduzindo {sum(len(r) for r in respostas.values())} respostas de {caminho}")
+
+
+def parar():
+    with _lock:
+        if _estado["gravacao"] is not None:
+            _estado["gravacao"].close()
+        _estado["gravacao"] = None
+        _estado["replay"] = None
+
+
+def em_replay():
+    return _estado["replay"] is not None
+
+
+def _gravar(chave, status, corpo, erro=None):
+    linha = json.dumps({"chave": chave, "status": status, "corpo": corpo, "erro": erro}, ensure_ascii=False)
+    with _lock:
+        if _estado["gravacao"] is not None:
+            _estado["gravacao"].write(linha + "\n")
+
+
+def _reproduzir(url, chave):
+    with _lock:
+        fila = _estado["replay"].get(chave)
+        # Requisições repetidas (tentativas) consomem as respostas na ordem em que foram gravadas
+        registro = fila.popleft() if fila and len(fila) > 1 else (fila[0] if fila else None)
+    if registro is None:
+        raise RespostaNaoGravada(f"Sem resposta gravada para {chave}")
+    if registro["status"] is None:
+        raise requests.exceptions.ConnectionError(f"Falha gravada: {registro['erro']}")
+    response = requests.Response()
+    response.status_code = registro["status"]
+    response._content = registro["corpo"].encode("utf-8")
+    response.url = url
+    return response
+
+
+def _sessao():
+    # Uma sessão (pool de conexões keep-alive) para o processo inteiro: anos, entes e anexos extraídos em
+    # paralelo reaproveitam as mesmas conexões em vez de abrir uma por requisição
+    with _lock:
+        if _estado.get("sessao") is None:
+            sessao = requests.Session()
+            adaptador = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=POOL_CONEXOES)
+            sessao.mount("http://", adaptador)
+            sessao.mount("https://", adaptador)
+            _estado["sessao"] = sessao
+        return _estado["sessao"]
+
+
+def _get(url, params, timeout, gravar=True):
+    chave = _chave(url, params)
+    if _estado["replay"] is not None:
+        return _reproduzir(url, chave)
+    # Com SICONFI_CACHE_HTTP, pergunta se a resposta guardada ainda vale (If-None-Match/If-Modified-Since)
+    entrada = cache_respostas.ler(url, params)
+    try:
+        response = _sessao().get(url, params=params, timeout=timeout, headers=cache_respostas.validadores(entrada))
+        if response.status_code == 304 and entrada:
+            # Não mudou: o corpo vem do disco (se ele tiver sumido, baixa de novo sem condição)
+            response = (cache_respostas.do_cache(response, url, params, entrada)
+                        or _sessao().get(url, params=params, timeout=timeout))
+        if response.status_code == 200 and cache_respostas.ativo() and not getattr(response, "origem_cache", None):
+            cache_respostas.guardar(response, url, params, entrada)
+    except requests.exceptions.RequestException as e:
+        if gravar:
+            _gravar(chave, None, None, type(e).__name__)
+        raise
+    if gravar:
+        _gravar(chave, response.status_code, response.text)
+    return response
+
+
+def _gravar_resultado(url, params, futuro):
+    # Com hedge, só a resposta que o extrator usou vai para a gravação: o replay não ganha entradas a mais
+    erro = futuro.exception()
+    if erro is None:
+        _gravar(_chave(url, params), futuro.result().status_code, futuro.result().text)
+    elif isinstance(erro, requests.exceptions.RequestException):
+        _gravar(_chave(url, params), None, None, type(erro).__name__)
+
+
+# === DISJUNTOR (API fora do ar) ===
+class ApiIndisponivel(Exception):
+    pass
+
+
+def _falha_da_api(erro, status):
+    # Só falhas que indicam API fora do ar; 4xx/429 e erro de decodificação vêm de um servidor saudável
+    if isinstance(erro, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    return status is not None and status >= 500
+
+
+def _url_sonda(url):
+    return url.rstrip("/").rsplit("/", 1)[0] + "/entes"
+
+
+class Disjuntor:
+    # Fechado: requisições passam. Aberto (após falhas seguidas): todas as threads esperam; de tempos em
+    # tempos uma delas sonda a API com uma requisição mínima e, se ela responder, o circuito fecha
+    def __init__(self, limite_falhas=DISJUNTOR_FALHAS, espera=DISJUNTOR_ESPERA,
+                 espera_maxima=DISJUNTOR_ESPERA_MAXIMA, limite_parada=DISJUNTOR_LIMITE):
+        self.limite_falhas = limite_falhas
+        self.espera = espera
+        self.espera_maxima = espera_maxima
+        self.limite_parada = limite_parada
+        self._cond = threading.Condition()
+        self.aberto = False
+        self.falhas = 0
+        self.falhando = set()  # requisições lógicas que falharam desde o último sucesso
+        self.aberto_em = None
+        self.proxima_sonda = 0.0
+        self.espera_atual = espera
+        self.sondando = False
+
+    def aguardar(self, url):
+        while True:
+            with self._cond:
+                while self.aberto:
+                    agora = time.monotonic()
+                    if self.limite_parada and agora - self.aberto_em > self.limite_parada:
+                        raise ApiIndisponivel(f"API fora do ar há mais de {self.limite_parada:.0f}s")
+                    if not self.sondando and agora >= self.proxima_sonda:
+                        self.sondando = True
+                        break
+                    self._cond.wait(timeout=1 if self.sondando else max(self.proxima_sonda - agora, 0.1))
+                else:
+                    return
+            # Meio-aberto: só esta thread sonda, fora do lock
+            try:
+                requests.get(_url_sonda(url), params={"limit": 1}, timeout=TIMEOUT_SONDA).raise_for_status()
+                respondeu = True
+            except requests.exceptions.RequestException:
+                respondeu = False
+            with self._cond:
+                self.sondando = False
+                if respondeu:
+                    self._fechar()
+                else:
+                    self.espera_atual = min(self.espera_atual * 2, self.espera_maxima)
+                    self.proxima_sonda = time.monotonic() + self.espera_atual
+                    print(f"🔌 API ainda fora do ar - nova sonda em {self.espera_atual:.0f}s")
+                self._cond.notify_all()
+
+    def falha(self, requisicao=None):
+        # Devolve True se o circuito está aberto: a requisição deve esperar e ser repetida. requisicao
+        # identifica a consulta lógica: as repetições dela não somam falhas novas
+        with self._cond:
+            if self.aberto:
+                return True
+            self.falhando.add(object() if requisicao is None else requisicao)
+            self.falhas = len(self.falhando)
+            if self.falhas < self.limite_falhas:
+                return False
+            self.aberto = True
+            self.aberto_em = time.monotonic()
+            self.espera_atual = self.espera
+            self.proxima_sonda = self.aberto_em + self.espera
+            print(f"🔌 API fora do ar ({self.falhas} consultas falhando seguidas) - extração pausada, sonda em "
+                  f"{self.espera:.0f}s")
+            return True
+
+    def sucesso(self):
+        with self._cond:
+            self.falhas = 0
+            self.falhando.clear()
+            if self.aberto:
+                self._fechar()
+                self._cond.notify_all()
+
+    def _fechar(self):
+        parada = time.monotonic() - self.aberto_em
+        self.aberto = False
+        self.falhas = 0
+        self.falhando.clear()
+        self.espera_atual = self.espera
+        metricas.registrar_parada(parada)
+        print(f"✅ API respondeu - extração retomada após {parada:.0f}s parada")
+
+
+disjuntor = Disjuntor()
+
+
+# === TIMEOUTS ADAPTATIVOS E HEDGE ===
+class Latencias:
+    # Latências recentes das requisições bem-sucedidas, por endpoint
+    def __init__(self, janela=200):
+        self._lock = threading.Lock()
+        self.recentes = defaultdict(lambda: deque(maxlen=janela))
+        self.requisicoes = 0
+        self.duplicadas = 0
+
+    def registrar(self, endpoint, duracao):
+        with self._lock:
+            self.recentes[endpoint].append(duracao)
+
+    def percentil(self, endpoint, quantil):
+        with self._lock:
+            valores = list(self.recentes.get(endpoint, ()))
+        return percentil(valores, quantil) if len(valores) >= AMOSTRAS_MINIMAS else None
+
+    def timeout(self, endpoint, teto):
+        p99 = self.percentil(endpoint, 0.99) if TIMEOUT_ADAPTATIVO else None
+        return teto if p99 is None else min(teto, max(TIMEOUT_MINIMO, p99 * FATOR_TIMEOUT))
+
+    def reservar_duplicada(self):
+        with self._lock:
+            if self.duplicadas >= ORCAMENTO_HEDGE * self.requisicoes:
+                return False
+            self.duplicadas += 1
+            return True
+
+    def contar(self):
+        with self._lock:
+            self.requisicoes += 1
+
+
+latencias = Latencias()
+_executor_hedge = {}
+
+
+def _executor():
+    with _lock:
+        if "executor" not in _executor_hedge:
+            # Uma thread por conexão do pool, para as originais e para as cópias: as threads só são criadas
+            # quando há requisições simultâneas de fato (planejador x anexos)
+            _executor_hedge["executor"] = ThreadPoolExecutor(max_workers=2 * POOL_CONEXOES, thread_name_prefix="hedge")
+        return _executor_hedge["executor"]
+
+
+def _get_com_hedge(url, params, timeout, endpoint):
+    latencias.contar()
+    p95 = latencias.percentil(endpoint, 0.95) if HEDGE and not em_replay() else None
+    if p95 is None:
+        return _get(url, params, timeout)
+
+    iniciou = threading.Event()
+
+    def obter_original():
+        iniciou.set()
+        return _get(url, params, timeout, gravar=False)
+
+    original = _executor().submit(obter_original)
+    # O p95 conta a partir de quando a original começa de fato: espera na fila do executor não é lentidão da
+    # API e não pode disparar cópias
+    iniciou.wait()
+    vencedora = original
+    # A cópia também é uma requisição à API: só sai se houver ficha do limite de taxa agora (SICONFI_TAXA)
+    if not wait([original], timeout=p95).done and latencias.reservar_duplicada() and limitador.tentar():
+        # Retardatária: dispara uma cópia e fica com a primeira resposta bem-sucedida
+        duplicada = _executor().submit(_get, url, params, timeout, False)
+        pendentes = {original, duplicada}
+        vencedora = None
+        while pendentes and vencedora is None:
+            feitas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            vencedora = next((f for f in feitas if f.exception() is None), None)
+        if vencedora is None:
+            vencedora = original  # as duas falharam: propaga o erro da original
+        elif vencedora is duplicada:
+            # Economia = quanto a original ainda levou (ou até falhar) depois da resposta da cópia
+            fim = time.perf_counter()
+            original.add_done_callback(lambda _: metricas.registrar_hedge(True, time.perf_counter() - fim))
+        else:
+            metricas.registrar_hedge(False, 0.0)
+    _gravar_resultado(url, params, vencedora)
+    return vencedora.result()
+
+
+def pausar(segundos):
+    # Em replay não há servidor para poupar: reproduz na velocidade máxima. Com o limite de taxa
+    # compartilhado ligado (SICONFI_TAXA), é ele quem espaça as requisições e a pausa fixa sai. Se tudo veio
+    # fresco do cache desde a última pausa, não houve requisição a espaçar
+    houve_requisicao = getattr(_local, "requisicao", False)
+    _local.requisicao = False
+    if segundos and houve_requisicao and not em_replay() and not limitador.ativo():
+        time.sleep(segundos)
+
+
+# === FUNÇÃO: GET de uma página na API Siconfi com registro de métricas ===
+def _obter_pagina(url, params, timeout, rotulos, decodificar=loads):
+    endpoint = url.rstrip("/").rsplit("/", 1)[-1]
+    if not em_replay():
+        # Resposta fresca no cache (aquecimento noturno): nem limite de taxa nem requisição
+        inicio = time.perf_counter()
+        corpo = cache_respostas.fresca(url, params)
+        if corpo is not None:
+            with fase("json"):
+                dados = decodificar(corpo)
+            resultado = "dados" if len(dados.get("items") or []) else "vazio"
+            metricas.registrar(endpoint, time.perf_counter() - inicio, 0, 200, resultado, 1, "fresca", **rotulos,
+                               bytes_economizados=len(corpo))
+            return dados
+    tentativas = 0
+    requisicao = object()  # identidade desta consulta no disjuntor, igual em todas as repetições
+    limite = latencias.timeout(endpoint, timeout)
+    _local.requisicao = True
+    while True:
+        tentativas += 1
+        # Em replay as falhas gravadas são reproduzidas como foram, sem disjuntor
+        if not em_replay():
+            disjuntor.aguardar(url)
+            # Ficha do limite de taxa da máquina (todos os extratores abertos); a cópia do hedge pede a dela
+            limitador.aguardar()
+        inicio = time.perf_counter()
+        status = None
+        tamanho = 0
+        try:
+            with fase("fetch"):
+                response = _get_com_hedge(url, params, limite, endpoint)
+            status = response.status_code
+            # Resposta revalidada (304): o corpo veio do disco, não da rede
+            tamanho = len(response.content) - getattr(response, "bytes_economizados", 0)
+            response.raise_for_status()
+            latencias.registrar(endpoint, time.perf_counter() - inicio)
+            with fase("json"):
+                dados = decodificar(response.content)
+        except Exception as e:
+            adaptativo = isinstance(e, requests.exceptions.ReadTimeout) and limite < timeout
+            metricas.registrar(endpoint, time.perf_counter() - inicio, tamanho, status, "erro",
+                               erro=type(e).__name__, timeout_adaptativo=adaptativo or None, **rotulos)
+            if adaptativo:
+                # Passou de 3x o p99 recente: repete uma vez com o timeout pedido, sem contar no disjuntor
+                limite = timeout
+                continue
+            if not em_replay() and _falha_da_api(e, status):
+                if disjuntor.falha(requisicao):
+                    # Circuito aberto: espera a API voltar e repete, em vez de virar "sem dados"
+                    continue
+                if tentativas < disjuntor.limite_falhas and not isinstance(e, requests.exceptions.ReadTimeout):
+                    # Falha rápida (conexão/5xx): repete; numa queda, as repetições é que abrem o circuito.
+                    # Timeout de leitura depende do tamanho da resposta e não é repetido aqui (ver anexos.py)
+                    time.sleep(0.5 * tentativas)
+                    continue
+            raise
+        if not em_replay():
+            disjuntor.sucesso()
+        break
+
+    resultado = "dados" if len(dados.get("items") or []) else "vazio"
+    metricas.registrar(endpoint, time.perf_counter() - inicio, tamanho, status, resultado, tentativas,
+                       getattr(response, "origem_cache", False), **rotulos,
+                       bytes_economizados=getattr(response, "bytes_economizados", None))
+    return dados
+
+
+# === FUNÇÃO: GET de uma página só (sondas), sem seguir a paginação ===
+def obter_pagina(url, params=None, timeout=60, **rotulos):
+    return _obter_pagina(url, params, timeout, rotulos)
+
+
+# === FUNÇÃO: GET na API Siconfi, seguindo a paginação ORDS (hasMore/offset) ===
+def obter_json(url, params=None, timeout=60, **rotulos):
+    dados = _obter_pagina(url, params, timeout, rotulos)
+    itens = dados.get("items") or []
+    while dados.get("hasMore") and dados.get("items"):
+        dados = _obter_pagina(url, dict(params or {}, offset=len(itens)), timeout, rotulos)
+        itens.extend(dados.get("items") or [])
+    dados["items"] = itens
+    return dados
+
+
+# === FUNÇÃO: GET direto para DataFrame, decodificando cada página em colunas tipadas ===
+def obter_dataframe(url, params=None, relatorio=None, timeout=60, **rotulos):
+    def decodificar(corpo):
+        return decodificar_colunar(corpo, relatorio)
+
+    dados = _obter_pagina(url, params, timeout, rotulos, decodificar)
+    paginas = [dados.get("items") or []]
+    lidos = len(paginas[0])
+    while dados.get("hasMore") and len(dados.get("items") or []):
+        dados = _obter_pagina(url, dict(params or {}, offset=lidos), timeout, rotulos, decodificar)
+        paginas.append(dados.get("items") or [])
+        lidos += len(paginas[-1])
+    with fase("dataframe"):
+        return dataframe_de_paginas(paginas, relatorio)
+
+
+atexit.register(parar)
+atexit.register(limitador.sair)
+if os.environ.get("SICONFI_REPLAY"):
+    iniciar_replay(os.environ["SICONFI_REPLAY"])
+elif os.environ.get("SICONFI_GRAVAR"):
+    iniciar_gravacao(os.environ["SICONFI_GRAVAR"])
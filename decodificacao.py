@@ -0,0 +1,108 @@
+import io
+import json
+import pandas as pd
+from esquema import CATEGORIA, DECIMAL, ESQUEMAS, INTEIRO32, INTEIRO64, ITENS_API, TEXTO, aplicar_esquema
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele usa o json da biblioteca padrão
+    orjson = None
+
+# pyarrow é opcional: sem ele cai no caminho lista de dicts -> DataFrame. Só é importado na primeira resposta
+# decodificada (_arrow), para `import motor` (Streamlit, fluxo.py) não pagar o import pesado antes de consultar
+pa = pa_json = None
+_arrow_carregado = False
+
+# Tipo usado pelo parser para cada tipo canônico (o texto categórico vira dicionário depois da leitura)
+TIPOS_LEITURA = {CATEGORIA: "string", TEXTO: "string", INTEIRO32: "int32", INTEIRO64: "int64", DECIMAL: "float64"}
+
+
+def _arrow():
+    global pa, pa_json, _arrow_carregado
+    if not _arrow_carregado:
+        try:
+            import pyarrow
+            import pyarrow.json
+            pa, pa_json = pyarrow, pyarrow.json
+        except ImportError:
+            pass
+        _arrow_carregado = True
+    return pa
+
+
+def loads(corpo):
+    if orjson is not None:
+        return orjson.loads(corpo)
+    return json.loads(corpo)
+
+
+def _schema_arrow(relatorio):
+    campos = [pa.field(nome, pa.type_for_alias(TIPOS_LEITURA[tipo])) for nome, tipo in ITENS_API[relatorio].items()]
+    return pa.schema([pa.field("items", pa.list_(pa.struct(campos))), pa.field("hasMore", pa.bool_())])
+
+
+def _ordem_das_chaves(corpo):
+    # Chaves do primeiro item, na ordem do JSON: o esquema explícito reordena as colunas e as
+    # saídas devem manter a ordem da API (como pd.DataFrame(itens)). Só ordena: campos que o primeiro item
+    # não traz entram depois (_colunas_na_ordem)
+    inicio = corpo.find(b"{", corpo.find(b'"items"'))
+    if inicio < 0:
+        return []
+    try:
+        primeiro, _ = json.JSONDecoder().raw_decode(corpo[inicio:inicio + 16384].decode("utf-8", errors="ignore"))
+    except ValueError:
+        return []
+    return list(primeiro) if isinstance(primeiro, dict) else []
+
+
+# === DECODIFICAÇÃO COLUNAR ===
+def decodificar_colunar(corpo, relatorio=None):
+    # O envelope ORDS inteiro é lido pelo parser C++ do pyarrow: o array "items" vira colunas tipadas
+    # direto, sem criar um dict Python por linha nem um objeto Python por célula
+    if _arrow() is None or relatorio not in ITENS_API:
+        return loads(corpo)
+    try:
+        tabela = pa_json.read_json(
+            io.BytesIO(corpo),
+            read_options=pa_json.ReadOptions(block_size=len(corpo) + 1),
+            parse_options=pa_json.ParseOptions(explicit_schema=_schema_arrow(relatorio),
+                                               unexpected_field_behavior="infer",
+                                               newlines_in_values=True),
+        )
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return loads(corpo)
+    itens = tabela.column("items").combine_chunks().flatten()
+    colunas = pa.Table.from_arrays(itens.flatten(), names=[campo.name for campo in itens.type])
+    colunas = colunas.select(_colunas_na_ordem(corpo, colunas.column_names, ITENS_API[relatorio]))
+    return {"items": colunas, "hasMore": bool(tabela.column("hasMore")[0].as_py())}
+
+
+def _colunas_na_ordem(corpo, nomes, esquema):
+    # Ordem do primeiro item e, depois dele, os demais campos da resposta. Campos do esquema que não aparecem
+    # em item nenhum não viram colunas nulas; os que faltam só no primeiro item (nulos omitidos) ficam
+    ordem = [nome for nome in _ordem_das_chaves(corpo) if nome in nomes]
+    resto = [nome for nome in nomes if nome not in ordem
+             and (nome not in esquema or b'"' + nome.encode("utf-8") + b'"' in corpo)]
+    return ordem + resto
+
+
+def dataframe_de_paginas(paginas, relatorio=None):
+    # paginas: "items" de cada página, como tabela Arrow (caminho colunar) ou lista de dicts
+    paginas = [p for p in paginas if len(p)]
+    if not paginas:
+        return pd.DataFrame()
+    if _arrow() is not None and all(isinstance(p, pa.Table) for p in paginas):
+        tabela = pa.concat_tables(paginas, promote_options="default")
+        esquema = ESQUEMAS.get(relatorio, {})
+        for i, nome in enumerate(tabela.column_names):
+            if esquema.get(nome) == CATEGORIA:
+                tabela = tabela.set_column(i, nome, tabela.column(i).dictionary_encode())
+        return aplicar_esquema(tabela.to_pandas(), relatorio)
+    itens = [item for p in paginas for item in (p.to_pylist() if pa is not None and isinstance(p, pa.Table) else p)]
+    return dataframe_de_itens(itens, relatorio)
+
+
+def dataframe_de_itens(itens, relatorio=None):
+    if not itens:
+        return pd.DataFrame()
+    return aplicar_esquema(pd.DataFrame(itens), relatorio)
@@ -0,0 +1,92 @@
+import sys
+import pandas as pd
+from metricas import metricas
+
+# === TIPOS CANÔNICOS ===
+CATEGORIA, INTEIRO32, INTEIRO64, DECIMAL, TEXTO = "category", "int32", "int64", "float64", "string"
+
+# Campos dos itens da API. Texto repetido milhões de vezes (instituição, anexo, rótulo, conta...)
+# fica como categórico: um código por linha + um dicionário
+_ITENS_COMUNS = {
+    "exercicio": INTEIRO32, "periodo": INTEIRO32, "periodicidade": CATEGORIA, "instituicao": CATEGORIA,
+    "cod_ibge": INTEIRO32, "uf": CATEGORIA, "populacao": INTEIRO64, "anexo": CATEGORIA, "esfera": CATEGORIA,
+    "rotulo": CATEGORIA, "coluna": CATEGORIA, "cod_conta": CATEGORIA, "conta": CATEGORIA, "valor": DECIMAL,
+}
+
+ITENS_API = {
+    "RREO": {**_ITENS_COMUNS, "demonstrativo": CATEGORIA},
+    "RGF": {**_ITENS_COMUNS, "co_poder": CATEGORIA},
+    # Catálogo de entes é pequeno: mantém texto simples, que é o que as telas filtram e ordenam
+    "ENTES": {
+        "cod_ibge": INTEIRO64, "ente": TEXTO, "capital": INTEIRO64, "regiao": TEXTO, "uf": TEXTO,
+        "esfera": TEXTO, "exercicio": INTEIRO64, "populacao": INTEIRO64, "cnpj": TEXTO,
+    },
+}
+
+# Colunas acrescentadas pela extração a cada lote
+METADADOS = {
+    "RREO": {"tipo_demonstrativo": CATEGORIA, "ente": CATEGORIA, "ano": INTEIRO32},
+    "RGF": {"ente": CATEGORIA, "ano": INTEIRO32, "tipo_demo": CATEGORIA, "poder": CATEGORIA},
+}
+
+ESQUEMAS = {relatorio: {**itens, **METADADOS.get(relatorio, {})} for relatorio, itens in ITENS_API.items()}
+
+_NULAVEIS = {INTEIRO32: "Int32", INTEIRO64: "Int64"}
+
+
+def aplicar_esquema(df, relatorio):
+    esquema = ESQUEMAS.get(relatorio, {})
+    for coluna, tipo in esquema.items():
+        if coluna not in df.columns or str(df[coluna].dtype) in (tipo, _NULAVEIS.get(tipo)):
+            continue
+        serie = df[coluna]
+        if tipo == CATEGORIA:
+            df[coluna] = serie.astype("category")
+        elif tipo in _NULAVEIS:
+            numeros = pd.to_numeric(serie, errors="coerce")
+            df[coluna] = numeros.astype(_NULAVEIS[tipo] if numeros.isna().any() else tipo)
+        elif tipo == DECIMAL:
+            df[coluna] = pd.to_numeric(serie, errors="coerce").astype(DECIMAL)
+        elif tipo == TEXTO and serie.dtype == object:
+            df[coluna] = serie.astype(TEXTO)
+    return df
+
+
+def unificar_categorias(frames):
+    # pd.concat só preserva um categórico se todos os pedaços tiverem as mesmas categorias
+    if len(frames) < 2:
+        return frames
+    colunas = [c for c, dtype in frames[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    for coluna in colunas:
+        categorias = pd.Index([])
+        for df in frames:
+            if coluna in df.columns and isinstance(df[coluna].dtype, pd.CategoricalDtype):
+                categorias = categorias.append(df[coluna].cat.categories)
+        categorias = categorias.unique()
+        for df in frames:
+            if coluna in df.columns:
+                df[coluna] = pd.Categorical(df[coluna], categories=categorias)
+    return frames
+
+
+# === RELATÓRIO DE MEMÓRIA ===
+def bytes_sem_esquema(df):
+    # Estimativa do mesmo DataFrame com texto em objetos Python e números em 64 bits, sem materializá-lo
+    total = 0
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            contagens = serie.value_counts(sort=False)
+            total += 8 * len(serie) + sum(sys.getsizeof(v) * n for v, n in contagens.items())
+        elif pd.api.types.is_numeric_dtype(serie.dtype):
+            total += 8 * len(serie)
+        else:
+            total += int(serie.memory_usage(deep=True, index=False))
+    return total
+
+
+def registrar_economia(df):
+    antes = bytes_sem_esquema(df)
+    depois = int(df.memory_usage(deep=True, index=False).sum())
+    metricas.registrar_memoria(len(df), antes, depois)
+    return antes, depois
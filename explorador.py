@@ -0,0 +1,85 @@
+import os
+import streamlit as st
+import armazem
+
+# === CONFIGURAÇÕES ===
+PASTAS_SAIDA = {"RREO": "csv_por_estado", "RGF": "csv_rgf_por_ente"}
+TAMANHOS_PAGINA = [50, 100, 500, 1000]
+
+
+# Só a coluna pedida é lida do armazém, com os filtros já aplicados
+@st.cache_data(show_spinner=False)
+def opcoes(relatorio, coluna, filtros_tupla):
+    return armazem.valores_distintos(relatorio, coluna, dict(filtros_tupla))
+
+
+# === INTERFACE STREAMLIT ===
+st.set_page_config(page_title="Explorador RREO/RGF", layout="wide")
+st.title("🔎 Explorador de dados extraídos - RREO/RGF")
+
+if not armazem.armazem_disponivel():
+    st.error("❌ pyarrow não instalado - o explorador depende do armazém local (pip install pyarrow).")
+    st.stop()
+
+with st.sidebar.expander("📦 Importar saídas já extraídas"):
+    for relatorio_pasta, pasta in PASTAS_SAIDA.items():
+        if st.button(f"Importar {pasta}", key=f"importar_{pasta}"):
+            with st.spinner(f"Importando {pasta}..."):
+                total = armazem.importar_diretorio(pasta, relatorio_pasta) if os.path.isdir(pasta) else 0
+            opcoes.clear()
+            st.success(f"✅ {total} arquivo(s) importado(s).")
+
+relatorios = armazem.relatorios_disponiveis()
+if not relatorios:
+    st.info("🗂 Armazém local vazio. Rode uma extração ou importe as saídas pela barra lateral.")
+    st.stop()
+
+st.sidebar.header("Filtros")
+relatorio = st.sidebar.selectbox("Relatório", relatorios)
+
+filtros = {}
+anos = opcoes(relatorio, "ano", ())
+filtros["ano"] = st.sidebar.selectbox("Exercício", anos, index=len(anos) - 1) if anos else None
+
+ufs = opcoes(relatorio, "uf", tuple(filtros.items()))
+uf = st.sidebar.selectbox("UF", ["Todas"] + ufs)
+filtros["uf"] = None if uf == "Todas" else uf
+
+filtros["ente"] = st.sidebar.text_input("Ente (contém)").strip() or None
+
+periodos = opcoes(relatorio, "periodo", tuple(filtros.items()))
+periodo = st.sidebar.selectbox("Período", ["Todos"] + periodos)
+filtros["periodo"] = None if periodo == "Todos" else periodo
+
+anexos = opcoes(relatorio, "anexo", tuple(filtros.items()))
+anexo = st.sidebar.selectbox("Anexo", ["Todos"] + anexos)
+filtros["anexo"] = None if anexo == "Todos" else anexo
+
+filtros["conta"] = st.sidebar.text_input("Conta (contém)").strip() or None
+
+tamanho_pagina = st.sidebar.selectbox("Linhas por página", TAMANHOS_PAGINA, index=1)
+
+# === PAGINAÇÃO ===
+chave_filtros = repr(sorted(filtros.items())) + str(tamanho_pagina)
+if st.session_state.get("chave_filtros") != chave_filtros:
+    st.session_state["chave_filtros"] = chave_filtros
+    st.session_state["pagina"] = 0
+
+pagina = st.session_state.get("pagina", 0)
+df, total = armazem.consultar_pagina(relatorio, filtros, pagina, tamanho_pagina)
+total_paginas = max((total + tamanho_pagina - 1) // tamanho_pagina, 1)
+
+st.markdown(f"**{total:,}** linhas encontradas · página **{pagina + 1}/{total_paginas}**".replace(",", "."))
+st.dataframe(df, use_container_width=True, hide_index=True)
+
+col_ant, col_pag, col_prox = st.columns([1, 2, 1])
+if col_ant.button("⬅️ Anterior", disabled=pagina == 0):
+    st.session_state["pagina"] = pagina - 1
+    st.rerun()
+nova_pagina = col_pag.number_input("Ir para página", min_value=1, max_value=total_paginas, value=pagina + 1)
+if nova_pagina - 1 != pagina:
+    st.session_state["pagina"] = nova_pagina - 1
+    st.rerun()
+if col_prox.button("Próxima ➡️", disabled=pagina + 1 >= total_paginas):
+    st.session_state["pagina"] = pagina + 1
+    st.rerun()
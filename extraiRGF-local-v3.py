@@ -1,158 +1,81 @@
 import os
+import sys
 import pandas as pd
-import requests
-import time
-import zipfile
 from tqdm import tqdm
-from datetime import datetime
+import motor
+from incremental import PlanoIncremental, modo_incremental
+from metricas import metricas
+import perfil
+from planejador import Planejador, trabalhadores_para_anos
+from prazo import configurar_prazo, prazo
+from refazer import retomar
+from saidas import salvar_manifesto_falhas, salvar_resultados
 
 # === CONFIGURAÇÕES ===
-URL_ENTES = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt/entes"
-URL_RGF = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt/rgf"
+# URLs, pausa entre requisições e consultas ficam em motor.py (núcleo comum dos extratores)
 OUTPUT_DIR = "csv_rgf_por_ente"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # === LISTAS DE VALORES FIXOS ===
-esferas = ["M", "E", "U", "C"]
-periodicidades = ["Q", "S"]
-tipos_demo = ["RGF", "RGF Simplificado"]
-poderes = ["E", "L", "J", "M", "D"]
+esferas = motor.ESFERAS_RGF
 
 def obter_entes_por_esfera(esfera):
     try:
-        response = requests.get(URL_ENTES, timeout=60)
-        response.raise_for_status()
-        dados = response.json()
-        df = pd.DataFrame(dados["items"])
+        df = motor.obter_entes()
         return df[df["esfera"] == esfera]
     except Exception as e:
         print(f"❌ Erro ao obter entes ({esfera}): {e}")
         return pd.DataFrame()
 
-def consultar_rgf(cod_ibge, ano, periodicidade, periodo, tipo_demo, poder, esfera, anexo=None):
-    params = {
-        "id_ente": cod_ibge,
-        "an_exercicio": ano,
-        "in_periodicidade": periodicidade,
-        "nr_periodo": periodo,
-        "co_tipo_demonstrativo": tipo_demo,
-        "co_poder": poder,
-        "co_esfera": esfera
-    }
-    if anexo:
-        params["no_anexo"] = anexo
-
-    try:
-        response = requests.get(URL_RGF, params=params, timeout=60)
-        response.raise_for_status()
-        dados = response.json()
-        return pd.DataFrame(dados["items"]) if "items" in dados and dados["items"] else pd.DataFrame()
-    except Exception:
-        return pd.DataFrame()
-
-def salvar_csv_zip(df, nome_base):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    nome_csv = f"{nome_base}_{timestamp}.csv"
-    caminho_csv = os.path.join(OUTPUT_DIR, nome_csv)
-    df.to_csv(caminho_csv, index=False, sep=";", encoding="utf-8")
-
-    nome_zip = nome_csv.replace(".csv", ".zip")
-    caminho_zip = os.path.join(OUTPUT_DIR, nome_zip)
-    with zipfile.ZipFile(caminho_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        zipf.write(caminho_csv, arcname=nome_csv)
-
-    os.remove(caminho_csv)
-    print(f"✅ Arquivo salvo: {caminho_zip}")
-
-def salvar_log_falhas(logs, esfera, uf=None):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    uf_part = f"_{uf}" if uf else ""
-    nome_log = f"log_falhas_RGF_{esfera}{uf_part}_{timestamp}.txt"
-    caminho_log = os.path.join(OUTPUT_DIR, nome_log)
-    with open(caminho_log, "w", encoding="utf-8") as f:
-        f.write("\n".join(logs))
-    print(f"📄 Log de falhas salvo: {caminho_log}")
-
-def poderes_por_esfera(esfera):
-    if esfera == "M":
-        return ["E", "L"]  # municípios geralmente têm só executivo e legislativo
-    elif esfera == "E":
-        return ["E", "L", "J", "M", "D"]
-    elif esfera == "U":
-        return ["E", "L", "J", "M", "D"]
-    elif esfera == "C":  # consórcios públicos normalmente só executivo
-        return ["E"]
-    else:
-        return ["E"]  # fallback
-
-def extrair_para_esfera(ano, esfera, uf_filtro=None):
+def extrair_para_esfera(anos, esfera, uf_filtro=None):
+    # anos: um exercício ou uma lista; todos os anos de um grupo entram juntos na fila do planejador
+    anos = [anos] if isinstance(anos, int) else list(anos)
     entes_df = obter_entes_por_esfera(esfera)
     if entes_df.empty:
         print(f"⚠️ Nenhum ente encontrado para esfera {esfera}")
         return
 
-    lista_poderes = poderes_por_esfera(esfera)
-
     if uf_filtro and esfera == "M":
         entes_df = entes_df[entes_df["uf"] == uf_filtro]
 
     agrupamento = entes_df.groupby("uf") if esfera == "M" else [("UNICO", entes_df)]
+    planos = {ano: PlanoIncremental("RGF", ano, ativo=modo_incremental()) for ano in anos}
+    divisor = motor.divisor_rgf()
+    planejador = Planejador("RGF", trabalhadores_para_anos(anos))
+    if esfera == "M":
+        agrupamento = planejador.ordenar_grupos(list(agrupamento), motor.consultas_rgf(esfera) * len(anos))
+    rotulo_anos = str(anos[0]) if len(anos) == 1 else f"{anos[0]}-{anos[-1]}"
 
     for uf, grupo in agrupamento:
-        resultados = []
-        log_falhas = []
-
-        total_consultas = len(grupo) * len(lista_poderes) * len(periodicidades) * 3
-        barra = tqdm(total=total_consultas, desc=f"Processando {esfera} - {uf}", unit="req")
-
-        for _, row in grupo.iterrows():
-            cod_ibge = row["cod_ibge"]
-            nome_ente = row["ente"]
-
-            for poder in lista_poderes:
-                for periodicidade in periodicidades:
-                    max_periodo = 3 if periodicidade == "Q" else 2
-                    for periodo in range(1, max_periodo + 1):
-                        tipo_encontrado = None
-                        for tipo_demo in tipos_demo:
-                            df = consultar_rgf(cod_ibge, ano, periodicidade, periodo, tipo_demo, poder, esfera)
-                            if not df.empty:
-                                tipo_encontrado = tipo_demo
-                                break
-
-                        if tipo_encontrado:
-                            df["cod_ibge"] = cod_ibge
-                            df["ente"] = nome_ente
-                            df["ano"] = ano
-                            df["esfera"] = esfera
-                            df["periodicidade"] = periodicidade
-                            df["periodo"] = periodo
-                            df["tipo_demo"] = tipo_encontrado
-                            df["poder"] = poder
-                            resultados.append(df)
-                        else:
-                            log_falhas.append(f"{cod_ibge} - {nome_ente} - {esfera} {poder} {periodicidade} P{periodo}")
-
-                        barra.update(1)
-                        time.sleep(0.2)
-
-        barra.close()
-
-        if resultados:
-            df_concat = pd.concat(resultados, ignore_index=True)
+        def salvar_ano(ano, resultados, falhas, uf=uf):
+            # Chamado assim que o exercício termina: grava e libera a memória antes dos outros anos do grupo
             nome_base = f"RGF_{esfera}_{uf}_{ano}_completo" if esfera == "M" else f"RGF_{esfera}_{ano}_completo"
-            salvar_csv_zip(df_concat, nome_base)
-        else:
-            print(f"⚠️ Nenhum dado encontrado para {uf} ({esfera})")
+            if planos[ano].ativo:
+                nome_base = nome_base.replace("_completo", "_incremental")
+            if not salvar_resultados(resultados, "RGF", nome_base, OUTPUT_DIR):
+                print(f"⚠️ Nenhum dado encontrado para {uf} ({esfera}) em {ano}")
+
+            # Unidades sem resposta: `python refazer.py <manifesto>` busca só elas e mescla no ZIP do grupo
+            salvar_manifesto_falhas(falhas, OUTPUT_DIR, nome_base, uf if esfera == "M" else None)
+
+        barra = tqdm(total=motor.total_rgf(grupo, esfera) * len(anos), desc=f"Processando {esfera} - {uf}", unit="req")
+        motor.extrair_rgf_anos(anos, esfera, grupo, planos, divisor, planejador,
+                               lambda avanco, mensagem=None: barra.update(avanco),
+                               f"RGF {esfera} {uf} {rotulo_anos}", ao_concluir_ano=salvar_ano)
+        barra.close()
 
-        if log_falhas:
-            salvar_log_falhas(log_falhas, esfera, uf if esfera == "M" else None)
+    for plano in planos.values():
+        if plano.ativo:
+            print(plano.resumo())
 
 def main():
     print("📊 Extração COMPLETA RGF - Todas as esferas/poderes/tipos")
 
+    # --anos 2020-2024 pula a pergunta; também aceita um intervalo ou lista na resposta
     try:
-        ano = int(input("Informe o ano de exercício (ex: 2024): ").strip())
+        anos = motor.anos_da_linha_de_comando([])
+        if not anos:
+            anos = motor.anos_do_texto(input("Informe o ano de exercício (ex: 2024 ou 2020-2024): ").strip())
     except ValueError:
         print("❌ Ano inválido.")
         return
@@ -171,9 +94,20 @@ def main():
 
     for esfera in esferas:
         print(f"\n🔍 Iniciando extração para esfera: {esfera}")
-        extrair_para_esfera(ano, esfera, uf_filtro if esfera == "M" else None)
+        extrair_para_esfera(anos, esfera, uf_filtro if esfera == "M" else None)
 
     print("✅ Extração RGF finalizada para todas as esferas.")
 
 if __name__ == "__main__":
-    main()
+    configurar_prazo()
+    if "--profile" in sys.argv:
+        perfil.iniciar()
+    try:
+        # --time-budget: a noite seguinte termina os pendentes da anterior e, se ainda sobrar orçamento, começa
+        # a extração nova na mesma janela
+        retomou = prazo.ativo() and retomar(OUTPUT_DIR)
+        if not retomou or not prazo.esgotado():
+            main()
+    finally:
+        metricas.salvar_execucao("RGF")
+        perfil.finalizar("RGF")
@@ -1,13 +1,11 @@
 import os
 import pandas as pd
-import requests
-import time
-import zipfile
-from datetime import datetime
+import motor
+from cliente_siconfi import pausar
+from saidas import salvar_csv_zip
 
 # === CONFIGURAÇÕES ===
-URL_ENTES = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt/entes"
-URL_RGF = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt/rgf"
+# URLs, pausa entre requisições e consultas ficam em motor.py (núcleo comum dos extratores)
 OUTPUT_DIR = "csv_rgf_por_estado"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -18,58 +16,14 @@ poderes = ["E", "L", "J", "M", "D"]
 
 def obter_entes_municipais_por_uf():
     try:
-        response = requests.get(URL_ENTES, timeout=60)
-        response.raise_for_status()
-        dados = response.json()
-        df = pd.DataFrame(dados["items"])
+        df = motor.obter_entes()
         return df[df["esfera"] == "M"].groupby("uf")
     except Exception as e:
         print(f"❌ Erro ao obter entes municipais: {e}")
         return []
 
 def consultar_rgf(cod_ibge, ano, periodicidade, periodo, tipo_demo, poder):
-    params = {
-        "id_ente": cod_ibge,
-        "an_exercicio": ano,
-        "in_periodicidade": periodicidade,
-        "nr_periodo": periodo,
-        "co_tipo_demonstrativo": tipo_demo,
-        "co_poder": poder,
-        "co_esfera": "M"
-    }
-    try:
-        response = requests.get(URL_RGF, params=params, timeout=60)
-        response.raise_for_status()
-        dados = response.json()
-        return pd.DataFrame(dados["items"]) if "items" in dados and dados["items"] else pd.DataFrame()
-    except:
-        return pd.DataFrame()
-
-def poderes_por_esfera(esfera):
-    if esfera == "M":
-        return ["E", "L"]  # municípios geralmente têm só executivo e legislativo
-    elif esfera == "E":
-        return ["E", "L", "J", "M", "D"]
-    elif esfera == "U":
-        return ["E", "L", "J", "M", "D"]
-    elif esfera == "C":  # consórcios públicos normalmente só executivo
-        return ["E"]
-    else:
-        return ["E"]  # fallback
-
-def salvar_csv_zip(df, nome_base):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    nome_csv = f"{nome_base}_{timestamp}.csv"
-    caminho_csv = os.path.join(OUTPUT_DIR, nome_csv)
-    df.to_csv(caminho_csv, index=False, sep=";", encoding="utf-8")
-
-    nome_zip = nome_csv.replace(".csv", ".zip")
-    caminho_zip = os.path.join(OUTPUT_DIR, nome_zip)
-    with zipfile.ZipFile(caminho_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        zipf.write(caminho_csv, arcname=nome_csv)
-
-    os.remove(caminho_csv)
-    print(f"✅ Arquivo salvo: {caminho_zip}")
+    return motor.consultar_rgf(cod_ibge, ano, periodicidade, periodo, tipo_demo, poder, "M")
 
 def extrair_por_estado(ano):
     grupos_uf = obter_entes_municipais_por_uf()
@@ -107,12 +61,12 @@ def extrair_por_estado(ano):
                             df["tipo_demo"] = tipo_encontrado
                             df["poder"] = poder
                             resultados.append(df)
-                        time.sleep(0.2)
+                        pausar(motor.PAUSA_ENTRE_REQUISICOES)
 
         if resultados:
             df_concat = pd.concat(resultados, ignore_index=True)
             nome_base = f"RGF_M_{uf}_{ano}_completo"
-            salvar_csv_zip(df_concat, nome_base)
+            salvar_csv_zip(df_concat, nome_base, OUTPUT_DIR)
         else:
             print(f"⚠️ Nenhum dado encontrado para UF {uf}")
 
@@ -1,103 +1,59 @@
 import os
+import sys
 import pandas as pd
-import requests
-import time
-from datetime import datetime
-import gc
-import zipfile
+import motor
+from incremental import PlanoIncremental, modo_incremental
+from metricas import metricas
+import perfil
+from planejador import Planejador, trabalhadores_para_anos
+from prazo import configurar_prazo, prazo
+from refazer import retomar
+from saidas import salvar_manifesto_falhas, salvar_resultados
 
 # === CONFIGURAÇÕES ===
-URL_ENTES = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt//entes"
-URL_RREO = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt//rreo"
+# URLs, pausa entre requisições e consultas ficam em motor.py (núcleo comum dos extratores)
 OUTPUT_DIR = "csv_por_estado"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
 def obter_entes():
     try:
-        response = requests.get(URL_ENTES, timeout=60)
-        response.raise_for_status()
-        dados = response.json()
-        return pd.DataFrame(dados["items"])
+        return motor.obter_entes()
     except Exception as e:
         print(f"❌ Erro ao obter entes: {e}")
         return pd.DataFrame()
 
 
-def consultar_rreo(cod_ibge, ano, periodo, tipo_demonstrativo):
-    params = {
-        "an_exercicio": ano,
-        "nr_periodo": periodo,
-        "co_tipo_demonstrativo": tipo_demonstrativo,
-        "id_ente": cod_ibge,
-    }
-    try:
-        response = requests.get(URL_RREO, params=params, timeout=60)
-        response.raise_for_status()
-        dados = response.json()
-        return pd.DataFrame(dados["items"]) if "items" in dados and dados["items"] else pd.DataFrame()
-    except:
-        return pd.DataFrame()
-
-
-def consultar_rreo_inteligente(cod_ibge, ano, periodo, esfera, populacao):
-    if esfera in ["U", "E", "D"]:
-        df = consultar_rreo(cod_ibge, ano, periodo, "RREO")
-        if not df.empty:
-            df["tipo_demonstrativo"] = "RREO"
-        return df
-    for tipo in ["RREO", "RREO Simplificado"]:
-        df = consultar_rreo(cod_ibge, ano, periodo, tipo)
-        if not df.empty:
-            df["tipo_demonstrativo"] = tipo
-            return df
-    return pd.DataFrame()
+def imprimir_progresso(avanco, mensagem=None):
+    if mensagem:
+        print(mensagem)
 
 
-def salvar_csv_zip(df_concat, nome_base):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    nome_csv = f"{nome_base}_{timestamp}.csv"
-    caminho_csv = os.path.join(OUTPUT_DIR, nome_csv)
-    df_concat.to_csv(caminho_csv, index=False, sep=";", encoding="utf-8")
+def executar_extracao(ano, entes_df, esfera, uf_nome=None):
+    executar_extracao_anos([ano], entes_df, esfera, uf_nome)
 
-    nome_zip = nome_csv.replace(".csv", ".zip")
-    caminho_zip = os.path.join(OUTPUT_DIR, nome_zip)
-    with zipfile.ZipFile(caminho_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        zipf.write(caminho_csv, arcname=nome_csv)
 
-    os.remove(caminho_csv)
-    print(f"✅ Arquivo ZIP salvo: {caminho_zip}")
+def executar_extracao_anos(anos, entes_df, esfera, uf_nome=None):
+    # Todos os exercícios do grupo na mesma fila do planejador (um arquivo por ano, como antes)
+    uf = "UNICO" if uf_nome is None else uf_nome
+    planos = {ano: PlanoIncremental("RREO", ano, ativo=modo_incremental()) for ano in anos}
+    planejador = Planejador("RREO", trabalhadores_para_anos(anos))
+    rotulo_anos = str(anos[0]) if len(anos) == 1 else f"{anos[0]}-{anos[-1]}"
+    print(f"\n🔄 UF: {uf} ({len(entes_df)} entes, {rotulo_anos})")
 
+    def salvar_ano(ano, resultados, falhas):
+        # Chamado assim que o exercício termina: grava e libera a memória antes dos outros anos do grupo
+        nome_base = f"RREO_{uf}_{esfera}_{ano}_P1a6"
+        if planos[ano].ativo:
+            nome_base += "_incremental"
+        if not salvar_resultados(resultados, "RREO", nome_base, OUTPUT_DIR):
+            print(f"⚠️ Nenhum dado encontrado para {uf} em {ano}")
+        salvar_manifesto_falhas(falhas, OUTPUT_DIR, nome_base, None if uf == "UNICO" else uf)
+        if planos[ano].ativo:
+            print(planos[ano].resumo())
 
-def executar_extracao(ano, entes_df, esfera, uf_nome=None):
-    grupos = [("UNICO", entes_df)] if uf_nome is None else [(uf_nome, entes_df)]
-    for i, (uf, grupo) in enumerate(grupos):
-        print(f"\n🔄 {i + 1}/{len(grupos)} - UF: {uf} ({len(grupo)} entes)")
-        resultados = []
-        for _, row in grupo.iterrows():
-            cod_ibge = row["cod_ibge"]
-            nome_ente = row["ente"]
-            esfera_ente = row["esfera"]
-            populacao = row.get("populacao", 0) or 0
-            for periodo in range(1, 7):
-                print(f"📥 {nome_ente} ({cod_ibge}) - {ano} P{periodo}")
-                df = consultar_rreo_inteligente(cod_ibge, ano, periodo, esfera_ente, populacao)
-                if not df.empty:
-                    df["cod_ibge"] = cod_ibge
-                    df["ente"] = nome_ente
-                    df["ano"] = ano
-                    df["periodo"] = periodo
-                    resultados.append(df)
-                time.sleep(0.2)
-
-        if resultados:
-            df_concat = pd.concat(resultados, ignore_index=True)
-            nome_base = f"RREO_{uf}_{esfera}_{ano}_P1a6"
-            salvar_csv_zip(df_concat, nome_base)
-            del df_concat
-            gc.collect()
-        else:
-            print(f"⚠️ Nenhum dado encontrado para {uf}")
+    motor.extrair_rreo_anos(anos, entes_df, planos, planejador, imprimir_progresso,
+                            f"RREO {uf} {esfera} {rotulo_anos}", ao_concluir_ano=salvar_ano)
 
 
 def mainold():
@@ -149,41 +105,56 @@ def mainold():
 def mainEsfera_E_U_D():
     #Main para extrair todos os anos. Com exceção de Municipal
     print("📊 Extrator de RREO - Tesouro Nacional")
-    anoinicial = 2016
-    anofinal = 2025
-    print("Rodando Estado, União, DF - Todos os anos.")
+    try:
+        anos = motor.anos_da_linha_de_comando(range(2016, 2025))
+    except ValueError:
+        print("❌ Ano inválido.")
+        return
+    print(f"Rodando Estado, União, DF - {anos[0]} a {anos[-1]}.")
 
     entes = obter_entes()
     if entes.empty or "esfera" not in entes.columns:
         print("❌ Não foi possível carregar os entes.")
         return
 
-    for ano in range(anoinicial, anofinal):
-        for tipo in ["E", "U", "D"]:
-            entes_filtrados = entes[entes["esfera"] == tipo]
-            executar_extracao(ano, entes_filtrados, tipo)
+    for tipo in ["E", "U", "D"]:
+        entes_filtrados = entes[entes["esfera"] == tipo]
+        executar_extracao_anos(anos, entes_filtrados, tipo)
 
 def main():
     print("📊 Extrator de RREO - Tesouro Nacional")
-    anoinicial = 2020
-    anofinal = 2022
-    print("Rodando Municipios, por estado - Todos os anos.")
+    # python extrairRREO-local.py --anos 2020-2024
+    try:
+        anos = motor.anos_da_linha_de_comando(range(2020, 2022))
+    except ValueError:
+        print("❌ Ano inválido.")
+        return
+    print(f"Rodando Municipios, por estado - {anos[0]} a {anos[-1]}.")
 
     entes = obter_entes()
     if entes.empty or "esfera" not in entes.columns:
         print("❌ Não foi possível carregar os entes.")
         return
-    tipo = "M"
-    for ano in range(anoinicial, anofinal):
-        print(f"\n🔄Ano {ano}")
-        ufs_disponiveis = sorted(entes[entes["esfera"] == "M"]["uf"].unique())
-        print("UFs disponíveis para municípios:")
-        print(", ".join(ufs_disponiveis))
-        for uf_escolhida in ufs_disponiveis:
-            entes_filtrados = entes[(entes["esfera"] == "M") & (entes["uf"] == uf_escolhida)]
-            executar_extracao(ano, entes_filtrados, "M", uf_escolhida)
+    ufs_disponiveis = sorted(entes[entes["esfera"] == "M"]["uf"].unique())
+    print("UFs disponíveis para municípios:")
+    print(", ".join(ufs_disponiveis))
+    municipios = entes[entes["esfera"] == "M"]
+    grupos = Planejador("RREO").ordenar_grupos(list(municipios.groupby("uf")), 6 * len(anos))
+    for uf_escolhida, entes_filtrados in grupos:
+        executar_extracao_anos(anos, entes_filtrados, "M", uf_escolhida)
 
 
 
 if __name__ == "__main__":
-    main()
+    configurar_prazo()
+    if "--profile" in sys.argv:
+        perfil.iniciar()
+    try:
+        # --time-budget: a noite seguinte termina os pendentes da anterior e, se ainda sobrar orçamento, começa
+        # a extração nova na mesma janela
+        retomou = prazo.ativo() and retomar(OUTPUT_DIR)
+        if not retomou or not prazo.esgotado():
+            main()
+    finally:
+        metricas.salvar_execucao("RREO")
+        perfil.finalizar("RREO")
@@ -1,62 +1,22 @@
 import streamlit as st
 import pandas as pd
-import requests
-import time
+import motor
+from cliente_siconfi import pausar
+from motor import consultar_rreo_inteligente
 
 # === CONFIGURAÇÕES DA API ===
-URL_ENTES = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt//entes"
-URL_RREO = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt//rreo"
+# URLs, pausa entre requisições e consultas ficam em motor.py (núcleo comum dos extratores)
 
 # === FUNÇÃO: Obter lista de entes ===
 @st.cache_data(show_spinner="🔍 Carregando entes...")
 def obter_entes():
     try:
-        response = requests.get(URL_ENTES, timeout=30)
-        response.raise_for_status()
-        dados = response.json()
-        return pd.DataFrame(dados["items"])
+        return motor.obter_entes(timeout=30)
     except Exception as e:
         st.error(f"Erro ao obter entes: {e}")
         return pd.DataFrame()
 
 
-# === FUNÇÃO: Consultar RREO específico ===
-def consultar_rreo(cod_ibge, ano, periodo, tipo_demonstrativo):
-    params = {
-        "an_exercicio": ano,
-        "nr_periodo": periodo,
-        "co_tipo_demonstrativo": tipo_demonstrativo,
-        "id_ente": cod_ibge,
-    }
-    try:
-        response = requests.get(URL_RREO, params=params, timeout=60)
-        response.raise_for_status()
-        dados = response.json()
-        if "items" in dados and dados["items"]:
-            return pd.DataFrame(dados["items"])
-        return pd.DataFrame()
-    except Exception as e:
-        return pd.DataFrame()
-
-
-# === FUNÇÃO: Consulta com fallback RREO Simplificado ===
-def consultar_rreo_inteligente(cod_ibge, ano, periodo, esfera, populacao):
-    if esfera in ["U", "E", "D"]:
-        tipo = "RREO"
-        df = consultar_rreo(cod_ibge, ano, periodo, tipo)
-        if not df.empty:
-            df["tipo_demonstrativo"] = tipo
-        return df
-
-    for tipo in ["RREO", "RREO Simplificado"]:
-        df = consultar_rreo(cod_ibge, ano, periodo, tipo)
-        if not df.empty:
-            df["tipo_demonstrativo"] = tipo
-            return df
-
-    return pd.DataFrame()
-
-
 # === FUNÇÃO PRINCIPAL COM AGRUPAMENTO POR UF ===
 def executar_extracao(ano, esfera=None, lista_cod_ibge=None):
     entes = obter_entes()
@@ -112,7 +72,7 @@ def executar_extracao(ano, esfera=None, lista_cod_ibge=None):
 
                 contador += 1
                 barra.progress(contador / total)
-                time.sleep(0.2)
+                pausar(motor.PAUSA_ENTRE_REQUISICOES)
 
         #log_area.text_area("📜 Log de execução", value=log_texto, height=200)
         log_area.text_area("📜 Log de execução", value=log_texto, height=200, key="log_area")
@@ -1,75 +1,55 @@
-import streamlit as st
-import pandas as pd
-import requests
-import time
 import os
-from datetime import datetime
-import base64
-import zipfile
-import gc
-
-# === CONFIGURAÇÕES DA API ===
-URL_ENTES = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt//entes"
-URL_RREO = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt//rreo"
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from cache_http import CACHE_PADRAO, FRESCOR_AQUECIDO, cache_respostas, ultimo_aquecimento
+from incremental import JANELA_REVISAO, modo_incremental
+from indice_entes import gravar_indice, ler_indice
+# motor (requests, pandas, pyarrow), saidas, métricas, perfil e base64 só são importados quando a extração
+# começa: a tela aparece sem pagar por eles a cada execução do script
+
+# === CONFIGURAÇÕES ===
+# URLs, pausa entre requisições e consultas ficam em motor.py (núcleo comum dos extratores)
 OUTPUT_DIR = ""
 #OUTPUT_DIR = "csv_por_estado"
-#os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+# Cache aquecido de madrugada (aquecer_cache.py): respostas verificadas no último dia saem do disco, sem API
+if not cache_respostas.ativo() and os.path.isdir(CACHE_PADRAO):
+    cache_respostas.diretorio = CACHE_PADRAO
+if cache_respostas.ativo() and not cache_respostas.frescor:
+    cache_respostas.frescor = FRESCOR_AQUECIDO
 
 # === FUNÇÃO: Obter lista de entes ===
-@st.cache_data(show_spinner="🔍 Carregando entes...")
+def _carregar_catalogo():
+    import motor
+    entes = motor.obter_entes(timeout=30)
+    gravar_indice(entes)  # a próxima abertura já monta a barra lateral com as UFs certas
+    return entes
+
+
+@st.cache_resource(show_spinner=False)
+def catalogo_em_segundo_plano():
+    # O catálogo completo começa a ser baixado numa thread na primeira execução do script, enquanto a tela
+    # aparece a partir do índice em disco. cache_resource devolve sempre o mesmo Future (o DataFrame não é
+    # copiado nem desserializado a cada clique)
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalogo").submit(_carregar_catalogo)
+
+
 def obter_entes():
     try:
-        response = requests.get(URL_ENTES, timeout=30)
-        response.raise_for_status()
-        dados = response.json()
-        return pd.DataFrame(dados["items"])
+        with st.spinner("🔍 Carregando entes..."):
+            return catalogo_em_segundo_plano().result()
     except Exception as e:
+        catalogo_em_segundo_plano.clear()  # a próxima execução tenta de novo
         st.error(f"Erro ao obter entes: {e}")
+        import pandas as pd
         return pd.DataFrame()
 
 
-# === FUNÇÃO: Consultar RREO específico ===
-def consultar_rreo(cod_ibge, ano, periodo, tipo_demonstrativo):
-    params = {
-        "an_exercicio": ano,
-        "nr_periodo": periodo,
-        "co_tipo_demonstrativo": tipo_demonstrativo,
-        "id_ente": cod_ibge,
-    }
-    try:
-        response = requests.get(URL_RREO, params=params, timeout=60)
-        response.raise_for_status()
-        dados = response.json()
-        if "items" in dados and dados["items"]:
-            return pd.DataFrame(dados["items"])
-        return pd.DataFrame()
-    except Exception:
-        return pd.DataFrame()
-
-
-# === FUNÇÃO: Consulta com fallback RREO Simplificado ===
-def consultar_rreo_inteligente(cod_ibge, ano, periodo, esfera, populacao):
-    if esfera in ["U", "E", "D"]:
-        tipo = "RREO"
-        df = consultar_rreo(cod_ibge, ano, periodo, tipo)
-        if not df.empty:
-            df["tipo_demonstrativo"] = tipo
-        return df
-
-    for tipo in ["RREO", "RREO Simplificado"]:
-        df = consultar_rreo(cod_ibge, ano, periodo, tipo)
-        if not df.empty:
-            df["tipo_demonstrativo"] = tipo
-            return df
-
-    return pd.DataFrame()
-
 # === GERAR DOWNLOAD AUTOMÁTICO ZIP ===
-def gerar_download_automatico_zip(caminho_csv, nome_zip):
-    zip_path = os.path.join(OUTPUT_DIR, nome_zip)
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        zipf.write(caminho_csv, arcname=os.path.basename(caminho_csv))
-
+def gerar_download_automatico_zip(zip_path):
+    import base64
+    nome_zip = os.path.basename(zip_path)
     with open(zip_path, "rb") as f:
         bytes_zip = f.read()
     b64 = base64.b64encode(bytes_zip).decode()
@@ -82,60 +62,60 @@ def gerar_download_automatico_zip(caminho_csv, nome_zip):
     """
     st.components.v1.html(href, height=0)
 
+
+# === PROGRESSO NA TELA ===
+def progresso_streamlit(total):
+    barra = st.progress(0)
+    status_area = st.empty()
+    contador = [0]
+
+    def progresso(avanco, mensagem=None):
+        if mensagem:
+            status_area.write(mensagem)
+        if avanco:
+            contador[0] += avanco
+            barra.progress(min(contador[0] / total, 1.0))
+
+    def fechar():
+        barra.empty()
+        status_area.empty()
+
+    return progresso, fechar
+
+
+def salvar_e_baixar(resultados, nome_base):
+    # Mantém o CSV na pasta (como sempre) e oferece o ZIP para download automático
+    from saidas import salvar_resultados
+    caminho_zip = salvar_resultados(resultados, "RREO", nome_base, OUTPUT_DIR, manter_csv=True)
+    if caminho_zip:
+        st.success(f"✅ Arquivo salvo: {caminho_zip[:-4]}.csv")
+        gerar_download_automatico_zip(caminho_zip)
+    return caminho_zip
+
+
 # === EXECUTAR EXTRAÇÃO MUNICIPAL (TODOS OS ESTADOS) COM SALVAMENTO IMEDIATO ===
-def executar_extracao_municipios_uf_estado_a_estado(ano, entes_df):
+def executar_extracao_municipios_uf_estado_a_estado(anos, entes_df, planos):
+    import motor
     grupos = list(entes_df.groupby("uf"))
 
     for i, (uf, grupo) in enumerate(grupos):
         with st.expander(f"🟦 {i+1}/{len(grupos)} - Extração para UF: {uf} ({len(grupo)} municípios)", expanded=True):
-            resultados = []
-            barra = st.progress(0)
-            status_area = st.empty()
-            total = len(grupo) * 6
-            contador = 0
-
-            for _, row in grupo.iterrows():
-                cod_ibge = row["cod_ibge"]
-                nome_ente = row["ente"]
-                esfera_ente = row["esfera"]
-                populacao = row.get("populacao", 0) or 0
-
-                for periodo in range(1, 7):
-                    status_area.write(f"📥 {nome_ente} ({cod_ibge}) - {ano} P{periodo}")
-                    df = consultar_rreo_inteligente(cod_ibge, ano, periodo, esfera_ente, populacao)
-
-                    if not df.empty:
-                        df["cod_ibge"] = cod_ibge
-                        df["ente"] = nome_ente
-                        df["ano"] = ano
-                        df["periodo"] = periodo
-                        resultados.append(df)
-
-                    contador += 1
-                    barra.progress(contador / total)
-                    time.sleep(0.2)
-
-            barra.empty()
-            status_area.empty()
-
-            if resultados:
-                df_concat = pd.concat(resultados, ignore_index=True)
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"RREO_{uf}_M_{ano}_P1a6_{timestamp}.csv"
-                caminho_csv = os.path.join(OUTPUT_DIR, filename)
-                df_concat.to_csv(caminho_csv, index=False, sep=";", encoding="utf-8")
-
-                st.success(f"✅ Arquivo salvo: {caminho_csv}")
-                gerar_download_automatico_zip(caminho_csv, f"{filename.replace('.csv', '.zip')}")
-
-                del df_concat  # libera memória
-                gc.collect()
-            else:
-                st.warning(f"⚠️ Nenhum dado encontrado para UF {uf}")
+            def salvar_ano(ano, resultados, falhas, uf=uf):
+                # Cada exercício é salvo assim que termina, sem segurar os outros anos da UF na memória
+                sufixo = "incremental" if planos[ano].ativo else "P1a6"
+                if not salvar_e_baixar(resultados, f"RREO_{uf}_M_{ano}_{sufixo}"):
+                    st.warning(f"⚠️ Nenhum dado encontrado para UF {uf} em {ano}")
+
+            progresso, fechar = progresso_streamlit(len(grupo) * len(motor.PERIODOS_RREO) * len(anos))
+            motor.extrair_rreo_anos(anos, grupo, planos, progresso=progresso, ao_concluir_ano=salvar_ano)
+            fechar()
 
 
 # === EXECUTAR EXTRAÇÃO STREAMLIT (TODOS OS MODOS) ===
-def executar_extracao_geral(ano, esfera=None, lista_cod_ibge=None, uf_filtro=None):
+def executar_extracao_geral(anos, esfera=None, lista_cod_ibge=None, uf_filtro=None, incremental=False,
+                            janela=JANELA_REVISAO):
+    import motor
+    from incremental import PlanoIncremental
     entes = obter_entes()
 
     if lista_cod_ibge:
@@ -155,63 +135,37 @@ def executar_extracao_geral(ano, esfera=None, lista_cod_ibge=None, uf_filtro=Non
     if esfera == "M" and uf_filtro:
         st.markdown(f"### 🟦 UF Selecionada: `{uf_filtro}` - {len(entes_filtrados)} municípios")
 
+    # Um plano por exercício; todos os anos numa passada só (catálogo de entes e conexões reaproveitados)
+    planos = {ano: PlanoIncremental("RREO", ano, ativo=incremental, janela=janela) for ano in anos}
     if esfera == "M" and uf_filtro is None:
-        executar_extracao_municipios_uf_estado_a_estado(ano, entes_filtrados)
+        executar_extracao_municipios_uf_estado_a_estado(anos, entes_filtrados, planos)
+        for plano in planos.values():
+            if plano.ativo:
+                st.info(plano.resumo())
         return {}
 
-    resultados = []
-    barra = st.progress(0)
-    status_area = st.empty()
-    log_texto = ""
+    if esfera in ("M", "E"):
+        nome_uf = uf_filtro or "Todos"
+    else:
+        nome_uf = esfera
+
+    def salvar_ano(ano, resultados, falhas):
+        # Cada exercício é salvo assim que termina, sem segurar os outros anos na memória
+        sufixo = "incremental" if planos[ano].ativo else "P1a6"
+        if not salvar_e_baixar(resultados, f"RREO_{nome_uf}_{esfera}_{ano}_{sufixo}"):
+            st.info(f"🗂 Nenhum dado encontrado para {ano}.")
+
+    progresso, fechar = progresso_streamlit(len(entes_filtrados) * len(motor.PERIODOS_RREO) * len(anos))
     log_area = st.empty()
-    total = len(entes_filtrados) * 6
-    contador = 0
-
-    for _, row in entes_filtrados.iterrows():
-        cod_ibge = row["cod_ibge"]
-        nome_ente = row["ente"]
-        esfera_ente = row["esfera"]
-        populacao = row.get("populacao", 0) or 0
-
-        for periodo in range(1, 7):
-            status_area.write(f"📥 {nome_ente} ({cod_ibge}) - {ano} P{periodo}")
-            df = consultar_rreo_inteligente(cod_ibge, ano, periodo, esfera_ente, populacao)
-
-            if not df.empty:
-                df["cod_ibge"] = cod_ibge
-                df["ente"] = nome_ente
-                df["ano"] = ano
-                df["periodo"] = periodo
-                resultados.append(df)
-            else:
-                log_texto += f"⚠️ Sem dados para {nome_ente} no período {periodo}\n"
-
-            contador += 1
-            barra.progress(contador / total)
-            time.sleep(0.2)
+    por_ano = motor.extrair_rreo_anos(anos, entes_filtrados, planos, progresso=progresso, ao_concluir_ano=salvar_ano)
+    log_texto = "".join(f"⚠️ Sem dados para {f['ente']} em {f['ano']} no período {f['periodo']}\n"
+                        for _, falhas in por_ano.values() for f in falhas)
 
     log_area.text_area("📜 Log de execução", value=log_texto, height=200, key="log_area_streamlit")
-    barra.empty()
-    status_area.empty()
-
-    if resultados:
-        df_final = pd.concat(resultados, ignore_index=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        if esfera == "M":
-            nome_uf = uf_filtro or "Todos"
-        elif esfera == "E":
-            nome_uf = uf_filtro or "Todos"
-        else:
-            nome_uf = esfera
-        filename = f"RREO_{nome_uf}_{esfera}_{ano}_P1a6_{timestamp}.csv"
-        caminho_csv = os.path.join(OUTPUT_DIR, filename)
-        df_final.to_csv(caminho_csv, index=False, sep=";", encoding="utf-8")
-        st.success(f"✅ Arquivo salvo: {caminho_csv}")
-        gerar_download_automatico_zip(caminho_csv, f"{filename.replace('.csv', '.zip')}")
-        del df_final
-        gc.collect()
-    else:
-        st.info("🗂 Nenhum dado encontrado.")
+    for plano in planos.values():
+        if plano.ativo:
+            st.info(plano.resumo())
+    fechar()
 
 
 # === INTERFACE STREAMLIT ===
@@ -219,7 +173,9 @@ st.set_page_config(page_title="Extrator RREO", layout="wide")
 st.title("📊 Extrator RREO - Tesouro Nacional")
 
 st.sidebar.header("Parâmetros da Extração")
-ano = st.sidebar.number_input("Ano", min_value=2010, max_value=2100, value=2024)
+ano_inicial = st.sidebar.number_input("Ano inicial", min_value=2010, max_value=2100, value=2024)
+ano_final = st.sidebar.number_input("Ano final", min_value=2010, max_value=2100, value=int(ano_inicial))
+anos = list(range(int(ano_inicial), max(int(ano_inicial), int(ano_final)) + 1))
 
 tipo = st.sidebar.radio(
     "Seleção de entes:",
@@ -227,10 +183,11 @@ tipo = st.sidebar.radio(
 )
 
 uf_escolhida = None
-entes_df_temp = obter_entes()
+indice = ler_indice()  # UFs por esfera, do disco; o catálogo completo chega em segundo plano
+catalogo_em_segundo_plano()
 if tipo in ("Municípios (M)", "Estados (E)"):
     esfera_tipo = "M" if "Municípios" in tipo else "E"
-    opcoes_uf = ["Todos"] + sorted(pd.unique(entes_df_temp.query(f"esfera == '{esfera_tipo}'")["uf"].dropna()))
+    opcoes_uf = ["Todos"] + indice["ufs"][esfera_tipo]
     escolha = st.sidebar.selectbox("UF para extração:", opcoes_uf)
     if escolha != "Todos":
         uf_escolhida = escolha
@@ -247,21 +204,47 @@ else:
     esfera = mapa[tipo]
     codigos_ibge = None
 
+st.sidebar.markdown("---")
+incremental = st.sidebar.checkbox("⏩ Somente o que é novo (incremental)", value=modo_incremental(),
+                                  help="Consulta o armazém local e busca apenas os períodos posteriores "
+                                       "ao último já guardado de cada ente")
+janela = st.sidebar.number_input("Janela de revisão (períodos)", min_value=0, max_value=6, value=JANELA_REVISAO,
+                                 disabled=not incremental)
+
+aquecimento = ultimo_aquecimento(cache_respostas.diretorio) if cache_respostas.ativo() else None
+if aquecimento:
+    st.sidebar.caption(f"🌙 Cache aquecido em {aquecimento['ts']} "
+                       f"({', '.join(aquecimento['relatorios'])} {aquecimento['anos'][0]}-{aquecimento['anos'][-1]})")
+
 # Rodapé de autoria
 st.sidebar.markdown("---")
 st.sidebar.markdown("👤 Construído por **André Merlo**")
 st.sidebar.markdown("** Versão - V-1.7 - 2025-07-01 **")
 
 if st.sidebar.button("▶️ Iniciar Extração"):
-    st.subheader(f"🔎 Consultando dados de {ano}...")
+    st.subheader(f"🔎 Consultando dados de {anos[0]}" + (f" a {anos[-1]}..." if len(anos) > 1 else "..."))
+    import perfil
+    from metricas import metricas
+    metricas.reiniciar()
+    # streamlit run extrairRREO-v6.py -- --profile
+    if "--profile" in sys.argv:
+        perfil.iniciar()
 
     resultados = executar_extracao_geral(
-        ano=ano,
+        anos=anos,
         esfera=esfera,
         lista_cod_ibge=codigos_ibge,
-        uf_filtro=uf_escolhida
+        uf_filtro=uf_escolhida,
+        incremental=incremental,
+        janela=int(janela),
     )
 
+    with st.expander("📈 Métricas da execução"):
+        st.json(metricas.salvar_execucao("RREO"))
+        resumo_perfil = perfil.finalizar("RREO")
+        if resumo_perfil:
+            st.json(resumo_perfil)
+
 #    if resultados:
 #        for nome_arquivo, df in resultados.items():
 #            st.success(f"✅ Dados extraídos - {len(df)} registros.")
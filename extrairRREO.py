@@ -1,11 +1,11 @@
-import requests
 import pandas as pd
 import os
-import time
+import motor
+from cliente_siconfi import pausar
+from motor import consultar_rreo
 
 # === CONFIGURAÇÃO ===
-URL_ENTES = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt//entes"
-URL_RREO = "https://apidatalake.tesouro.gov.br/ords/siconfi/tt//rreo"
+# URLs, pausa entre requisições e consultas ficam em motor.py (núcleo comum dos extratores)
 
 OUTPUT_DIR = "output"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -13,14 +13,12 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # === FUNÇÃO: Obter lista de entes ===
 def obter_entes():
     print("🔍 Obtendo lista de entes...")
-    response = requests.get(URL_ENTES)
-    if response.status_code == 200:
-        dados = response.json()
-        df = pd.DataFrame(dados['items'])
-        print(f"✅ {len(df)} entes obtidos.")
-        return df
-    else:
-        raise Exception(f"❌ Erro ao obter entes: {response.status_code}")
+    try:
+        df = motor.obter_entes()
+    except Exception as e:
+        raise Exception(f"❌ Erro ao obter entes: {e}")
+    print(f"✅ {len(df)} entes obtidos.")
+    return df
 
 # === FUNÇÃO: Filtrar entes ===
 def filtrar_entes(df_entes, esfera=None, lista_cod_ibge=None):
@@ -31,25 +29,6 @@ def filtrar_entes(df_entes, esfera=None, lista_cod_ibge=None):
     else:
         return df_entes
 
-# === FUNÇÃO: Consultar RREO ===
-def consultar_rreo(cod_ibge, ano=2024, periodo=1):
-    params = {
-        "an_exercicio": ano,
-        "nr_periodo": periodo,
-        "co_tipo_demonstrativo": "RREO",
-        "id_ente": cod_ibge
-    }
-    response = requests.get(URL_RREO, params=params)
-    if response.status_code == 200:
-        dados = response.json()
-        if 'items' in dados:
-            return pd.DataFrame(dados['items'])
-        else:
-            return pd.DataFrame()
-    else:
-        print(f"⚠️ Erro {response.status_code} para ente {cod_ibge}")
-        return pd.DataFrame()
-
 # === FUNÇÃO PRINCIPAL ===
 def executar_extracao(ano=2024, periodo=1, esfera=None, lista_cod_ibge=None):
     entes = obter_entes()
@@ -72,7 +51,7 @@ def executar_extracao(ano=2024, periodo=1, esfera=None, lista_cod_ibge=None):
         else:
             print(f"⚠️ Sem dados para {nome_ente} ({cod_ibge})")
 
-        time.sleep(0.5)  # evitar sobrecarga na API
+        pausar(motor.PAUSA_ENTRE_REQUISICOES)  # evitar sobrecarga na API
 
     if dfs:
         df_final = pd.concat(dfs, ignore_index=True)
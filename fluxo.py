@@ -0,0 +1,167 @@
+import asyncio
+import os
+import queue
+import threading
+import motor
+from esquema import aplicar_esquema
+from planejador import Planejador, trabalhadores_para_anos
+
+# === CONFIGURAÇÕES ===
+# Lotes prontos esperando o consumidor. Fila cheia = os trabalhadores param de consultar a API até o consumidor
+# (notebook, pipeline) pegar o próximo: a memória fica limitada mesmo com um consumidor lento
+FILA_MAXIMA = int(os.environ.get("SICONFI_FILA_FLUXO", "32"))
+ESPERA = 0.5  # segundos entre verificações de cancelamento enquanto a fila está cheia
+FORMATOS = ("pandas", "arrow")
+_FIM = object()
+
+
+class ExtracaoCancelada(Exception):
+    # O consumidor parou de ler (break, close(), cancelamento da tarefa async): os trabalhadores param
+    pass
+
+
+# === FILA DE LOTES ===
+# Mesmo adicionar(df, **metadados) do AcumuladorLotes (é o coletor do motor), mas cada lote sai na hora, já com
+# as colunas de metadados e os tipos do esquema, em vez de esperar a concatenação do fim
+class FilaLotes:
+    def __init__(self, relatorio, formato="pandas", tamanho=None):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: {formato} (use {' ou '.join(FORMATOS)})")
+        if formato == "arrow":
+            import pyarrow  # noqa: F401 - falha aqui, antes de a extração começar
+        self.relatorio = relatorio
+        self.formato = formato
+        self.fila = queue.Queue(maxsize=FILA_MAXIMA if tamanho is None else tamanho)
+        self.cancelado = threading.Event()
+
+    def adicionar(self, df, **metadados):
+        tabela = aplicar_esquema(df.assign(**metadados), self.relatorio)
+        if self.formato == "arrow":
+            import pyarrow as pa
+            tabela = pa.RecordBatch.from_pandas(tabela, preserve_index=False)
+        self.colocar((metadados, tabela))
+
+    def colocar(self, item):
+        while True:
+            if self.cancelado.is_set():
+                raise ExtracaoCancelada()
+            try:
+                self.fila.put(item, timeout=ESPERA)
+                return
+            except queue.Full:
+                continue
+
+    def __call__(self, relatorio):
+        return self  # todos os exercícios saem pela mesma fila
+
+
+# === FLUXO DE EXTRAÇÃO ===
+class FluxoExtracao:
+    # Iterável (for / async for) de (metadados, lote) por (ente, período), na ordem em que as respostas chegam.
+    # metadados é o dict da unidade (cod_ibge, ente, ano, periodo...); lote é um DataFrame ou um pyarrow
+    # RecordBatch. As falhas ficam em .falhas ao final, no formato do manifesto (saidas.salvar_manifesto_falhas)
+    def __init__(self, relatorio, extrair, formato="pandas", tamanho_fila=None):
+        self.relatorio = relatorio
+        self._extrair = extrair
+        self._lotes = FilaLotes(relatorio, formato, tamanho_fila)
+        self._thread = None
+        self._erro = None
+        self.falhas = []
+
+    def _produzir(self):
+        try:
+            por_ano = self._extrair(self._lotes, self._verificar)
+            self.falhas = [f for _, falhas in por_ano.values() for f in falhas]
+        except ExtracaoCancelada:
+            pass
+        except Exception as e:
+            self._erro = e
+        finally:
+            try:
+                self._lotes.colocar(_FIM)
+            except ExtracaoCancelada:
+                try:
+                    self._lotes.fila.put_nowait(_FIM)  # acorda um async for cancelado que ficou esperando no get
+                except queue.Full:
+                    pass
+
+    def _verificar(self, avanco, mensagem=None):
+        # Callback de progresso do motor: chamado a cada período, também nos que não trazem dados
+        if self._lotes.cancelado.is_set():
+            raise ExtracaoCancelada()
+
+    def _iniciar(self):
+        if self._thread is not None:
+            raise RuntimeError("Um FluxoExtracao só pode ser percorrido uma vez")
+        self._thread = threading.Thread(target=self._produzir, name=f"fluxo-{self.relatorio}", daemon=True)
+        self._thread.start()
+
+    def _fim(self, item):
+        if item is not _FIM:
+            return False
+        if self._erro is not None:
+            raise self._erro
+        return True
+
+    def cancelar(self):
+        self._lotes.cancelado.set()
+
+    def __iter__(self):
+        self._iniciar()
+        try:
+            while not self._fim(item := self._lotes.fila.get()):
+                yield item
+        finally:
+            self.cancelar()
+
+    async def __aiter__(self):
+        # A espera pelo próximo lote roda numa thread: o loop de eventos continua livre enquanto a API responde
+        self._iniciar()
+        try:
+            while not self._fim(item := await asyncio.to_thread(self._lotes.fila.get)):
+                yield item
+        finally:
+            self.cancelar()
+
+
+# === API ===
+def entes(esfera=None, uf=None, cod_ibge=None):
+    # Catálogo de entes filtrado, no formato que fluxo_rreo/fluxo_rgf recebem
+    df = motor.obter_entes()
+    if esfera:
+        df = df[df["esfera"] == esfera]
+    if uf:
+        df = df[df["uf"] == uf]
+    if cod_ibge is not None:
+        codigos = cod_ibge if isinstance(cod_ibge, (list, tuple, set)) else [cod_ibge]
+        df = df[df["cod_ibge"].isin([int(c) for c in codigos])]
+    return df.reset_index(drop=True)
+
+
+def _lista_anos(anos):
+    return [int(anos)] if isinstance(anos, (int, str)) else [int(a) for a in anos]
+
+
+def fluxo_rreo(anos, entes_df=None, formato="pandas", planos=None, planejador=None, tamanho_fila=None):
+    # for metadados, df in fluxo_rreo(2024, entes(esfera="E")): ...
+    anos = _lista_anos(anos)
+    entes_df = entes() if entes_df is None else entes_df
+    planejador = planejador or Planejador("RREO", trabalhadores_para_anos(anos))
+
+    def extrair(coletor, progresso):
+        return motor.extrair_rreo_anos(anos, entes_df, planos, planejador, progresso, "Fluxo RREO", coletor)
+
+    return FluxoExtracao("RREO", extrair, formato, tamanho_fila)
+
+
+def fluxo_rgf(anos, esfera, entes_df=None, formato="pandas", planos=None, planejador=None, tamanho_fila=None):
+    # async for metadados, lote in fluxo_rgf([2023, 2024], "M", entes(esfera="M", uf="AC"), formato="arrow"): ...
+    anos = _lista_anos(anos)
+    entes_df = entes(esfera=esfera) if entes_df is None else entes_df
+    planejador = planejador or Planejador("RGF", trabalhadores_para_anos(anos))
+
+    def extrair(coletor, progresso):
+        return motor.extrair_rgf_anos(anos, esfera, entes_df, planos, motor.divisor_rgf(), planejador, progresso,
+                                      f"Fluxo RGF {esfera}", coletor)
+
+    return FluxoExtracao("RGF", extrair, formato, tamanho_fila)
@@ -0,0 +1,49 @@
+import os
+import sys
+
+# === CONFIGURAÇÕES ===
+# Quantos períodos já guardados são buscados de novo, para pegar republicações/retificações recentes
+JANELA_REVISAO = int(os.environ.get("SICONFI_JANELA_REVISAO", "1"))
+
+# Combinação que identifica uma série de períodos de um ente no armazém
+CHAVES = {
+    "RREO": ["cod_ibge"],
+    "RGF": ["cod_ibge", "poder", "periodicidade"],
+}
+
+
+def modo_incremental():
+    return "--incremental" in sys.argv or os.environ.get("SICONFI_INCREMENTAL") == "1"
+
+
+# === PLANO INCREMENTAL ===
+# Consulta o armazém uma vez por exercício e diz, para cada ente, quais períodos ainda precisam ser
+# buscados: os posteriores ao último já guardado, mais a janela de revisão. Inativo, devolve tudo.
+class PlanoIncremental:
+    def __init__(self, relatorio, ano, ativo=True, janela=None):
+        self.ativo = ativo
+        self.janela = JANELA_REVISAO if janela is None else janela
+        from armazem import ultimos_periodos  # pandas/pyarrow só quando há plano (a tela do Streamlit não paga)
+        self.ultimos = ultimos_periodos(relatorio, ano, CHAVES[relatorio]) if ativo else {}
+        self.consultas = 0
+        self.puladas = 0
+
+    def periodos(self, chave, periodos):
+        periodos = list(periodos)
+        ultimo = self.ultimos.get(chave)
+        pendentes = periodos if ultimo is None else [p for p in periodos if p > ultimo - self.janela]
+        self.consultas += len(pendentes)
+        self.puladas += len(periodos) - len(pendentes)
+        return pendentes
+
+    def periodicidades(self, cod_ibge, poder, opcoes):
+        # RGF: no exercício o ente publica numa só periodicidade; se ela já é conhecida, não tenta as outras
+        guardadas = {c[2] for c in self.ultimos if c[0] == cod_ibge and c[1] == poder}
+        return [p for p in opcoes if p in guardadas] or list(opcoes)
+
+    def resumo(self):
+        if not self.ativo:
+            return ""
+        total = self.consultas + self.puladas
+        return (f"⏩ Incremental: {self.puladas} de {total} período(s) já estavam no armazém e foram pulados "
+                f"(janela de revisão: {self.janela})")
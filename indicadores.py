@@ -0,0 +1,305 @@
+import glob
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+import armazem
+
+# === CONFIGURAÇÕES ===
+# Indicadores da LRF calculados a partir do armazém (nunca da API), numa pasta ao lado dos relatórios. Cada
+# partição (ano, UF) só é recalculada quando a partição de origem (RREO ou RGF) foi regravada desde a última vez
+PASTA = "_indicadores"
+ARQUIVO_ESTADO = "_estado.json"
+VERSAO = 2  # mudou a definição de algum indicador: sobe aqui e tudo é recalculado na próxima atualização
+
+# Linhas dos demonstrativos que alimentam cada valor: anexo, conta e coluna (regex sem diferenciar maiúsculas;
+# as contas vêm com o número do item no fim, ex.: "RECEITA CORRENTE LÍQUIDA (III)"). No Anexo 2 do RGF cada
+# período tem a sua coluna ("Até o 2º Quadrimestre"): {periodo} e {nome_periodo} vêm da própria linha
+RCL_RREO = {"anexo": "RREO-Anexo 03", "conta": r"^RECEITA CORRENTE L[IÍ]QUIDA\b(?!.*AJUSTADA)",
+            "coluna": r"TOTAL \(?[UÚ]LTIMOS 12 MESES"}
+PESSOAL = {"anexo": "RGF-Anexo 01", "conta": r"^DESPESA TOTAL COM PESSOAL", "coluna": r"TOTAL \(?[UÚ]LTIMOS 12 MESES"}
+RCL_PESSOAL = {"anexo": "RGF-Anexo 01", "conta": r"^RECEITA CORRENTE L[IÍ]QUIDA.*AJUSTADA", "coluna": r"^VALOR"}
+COLUNA_PERIODO = r"^AT[EÉ] O {periodo}\s*[º°ªO]?\s*{nome_periodo}"
+DCL = {"anexo": "RGF-Anexo 02", "conta": r"^D[IÍ]VIDA CONSOLIDADA L[IÍ]QUIDA", "coluna": COLUNA_PERIODO}
+RCL_DCL = {"anexo": "RGF-Anexo 02", "conta": r"^RECEITA CORRENTE L[IÍ]QUIDA.*AJUSTADA", "coluna": COLUNA_PERIODO}
+NOMES_PERIODO = {"Q": "QUADRIMESTRE", "S": "SEMESTRE"}
+
+# Tabelas materializadas: chaves (ordem do índice) e colunas
+TABELAS = {
+    "rcl": ["cod_ibge", "ano", "periodo"],
+    "limites": ["cod_ibge", "ano", "poder", "periodicidade", "periodo"],
+}
+COLUNAS_LEITURA = ["cod_ibge", "ente", "esfera", "periodo", "periodicidade", "poder", "anexo", "conta", "coluna",
+                   "valor"]
+# Período do RGF -> bimestre do RREO com os mesmos 12 meses (RCL de reserva quando o RGF não traz a própria)
+BIMESTRE_EQUIVALENTE = {"Q": 2, "S": 3}
+
+
+def pasta_tabela(tabela):
+    return os.path.join(PASTA, tabela)  # relativo ao ARMAZEM_DIR, como o nome de um relatório
+
+
+def caminho_estado():
+    return os.path.join(armazem.ARMAZEM_DIR, PASTA, ARQUIVO_ESTADO)
+
+
+# === LEITURA DAS PARTIÇÕES DE ORIGEM ===
+def particoes_de_origem():
+    # {"ano=2024/uf=AC": {"RREO": [mtime_ns, bytes], "RGF": [...]}}: a assinatura muda a cada regravação
+    particoes = {}
+    for relatorio in ("RREO", "RGF"):
+        for caminho in glob.glob(os.path.join(armazem.ARMAZEM_DIR, relatorio, "ano=*", "uf=*", "dados.parquet")):
+            uf_dir = os.path.dirname(caminho)
+            chave = f"{os.path.basename(os.path.dirname(uf_dir))}/{os.path.basename(uf_dir)}"
+            info = os.stat(caminho)
+            particoes.setdefault(chave, {})[relatorio] = [info.st_mtime_ns, info.st_size]
+    return particoes
+
+
+def _ler(relatorio, ano, uf, anexos):
+    caminho = armazem.caminho_particao(relatorio, ano, uf)
+    if not os.path.exists(caminho):
+        return pd.DataFrame(columns=COLUNAS_LEITURA)
+    dataset = armazem.ds.dataset(caminho, format="parquet")
+    colunas = [c for c in COLUNAS_LEITURA if c in dataset.schema.names]
+    df = dataset.to_table(columns=colunas, filter=armazem.ds.field("anexo").isin(anexos)).to_pandas()
+    df["ano"] = int(ano)
+    return df
+
+
+def _casa(serie, padrao):
+    # Regex só nos valores distintos (poucas centenas de contas/colunas), depois espalhado pelas linhas
+    codigos, distintos = pd.factorize(serie.astype("string"), sort=False)
+    casou = pd.Series(distintos).str.contains(padrao, case=False, regex=True, na=False).to_numpy()
+    return np.append(casou, False)[codigos]  # código -1 (nulo) cai no False do fim
+
+
+def _casa_coluna(df, padrao):
+    if "{" not in padrao:
+        return _casa(df["coluna"], padrao)
+    # Coluna que depende do período: um regex por (período, periodicidade), só nas linhas daquele período
+    casou = np.zeros(len(df), dtype=bool)
+    grupos = df.groupby(["periodo", "periodicidade"], sort=False, dropna=True, observed=True).indices
+    for (periodo, periodicidade), posicoes in grupos.items():
+        nome_periodo = NOMES_PERIODO.get(str(periodicidade))
+        if nome_periodo:
+            casou[posicoes] = _casa(df["coluna"].iloc[posicoes],
+                                    padrao.format(periodo=int(periodo), nome_periodo=nome_periodo))
+    return casou
+
+
+def _valor(df, linha, chaves, nome):
+    # Primeira linha que casa com (anexo, conta, coluna) em cada chave, na ordem do demonstrativo
+    if df.empty:
+        return pd.DataFrame(columns=chaves + [nome])
+    df = df.reset_index(drop=True)
+    selecao = (df["anexo"] == linha["anexo"]).to_numpy() & _casa(df["conta"], linha["conta"]) \
+        & _casa_coluna(df, linha["coluna"])
+    valores = df.loc[selecao, chaves + ["valor"]].groupby(chaves, sort=False, dropna=False)["valor"].first()
+    return valores.rename(nome).reset_index()
+
+
+def _percentual(parte, total):
+    return (parte / total.where(total > 0) * 100).round(2)
+
+
+# === CÁLCULO (todos os entes da partição de uma vez) ===
+def _descricao(df, chaves):
+    # Uma linha por chave com o nome e a esfera do ente
+    return df.drop_duplicates(chaves)[chaves + [c for c in ("ente", "esfera") if c in df.columns]]
+
+
+def calcular_rcl(rreo):
+    chaves = TABELAS["rcl"]
+    if rreo.empty:
+        return pd.DataFrame(columns=chaves + ["rcl"])
+    return _descricao(rreo, chaves).merge(_valor(rreo, RCL_RREO, chaves, "rcl"), on=chaves).reset_index(drop=True)
+
+
+def calcular_limites(rgf, rcl):
+    chaves = TABELAS["limites"]
+    if rgf.empty:
+        return pd.DataFrame(columns=chaves)
+    limites = _descricao(rgf, chaves)
+    for linha, nome in ((PESSOAL, "despesa_pessoal"), (RCL_PESSOAL, "rcl_pessoal"), (DCL, "dcl"),
+                        (RCL_DCL, "rcl_dcl")):
+        limites = limites.merge(_valor(rgf, linha, chaves, nome), on=chaves, how="left")
+
+    # RCL ajustada do próprio RGF; sem ela, a RCL do RREO do bimestre que fecha os mesmos 12 meses
+    bimestre = limites["periodo"].astype("Int64") * limites["periodicidade"].map(BIMESTRE_EQUIVALENTE).astype("Int64")
+    chaves_rcl = TABELAS["rcl"]
+    reserva = limites[["cod_ibge", "ano"]].assign(periodo=bimestre).merge(
+        rcl.reindex(columns=chaves_rcl + ["rcl"]), on=chaves_rcl, how="left")["rcl"].to_numpy()
+    limites["rcl"] = limites["rcl_pessoal"].fillna(limites["rcl_dcl"]).fillna(pd.Series(reserva, index=limites.index))
+    limites["pessoal_pct_rcl"] = _percentual(limites["despesa_pessoal"], limites["rcl_pessoal"].fillna(limites["rcl"]))
+    limites["dcl_pct_rcl"] = _percentual(limites["dcl"], limites["rcl_dcl"].fillna(limites["rcl"]))
+    limites = limites.drop(columns=["rcl_pessoal", "rcl_dcl"])
+    return limites.dropna(subset=["despesa_pessoal", "dcl"], how="all")
+
+
+# === MATERIALIZAÇÃO ===
+def _gravar(tabela, ano, uf, df):
+    caminho = armazem.caminho_particao(pasta_tabela(tabela), ano, uf)
+    if df.empty:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        return
+    # Ordenada pelas chaves: cada arquivo é pequeno e a busca por ente é um filtro sobre dados ordenados
+    df = df.sort_values(TABELAS[tabela], kind="stable").reset_index(drop=True)
+    for coluna in ("cod_ibge", "ano", "periodo"):
+        df[coluna] = pd.to_numeric(df[coluna], errors="coerce").astype("Int64")
+    for coluna in [c for c in df.columns if df[c].dtype == object]:
+        df[coluna] = df[coluna].astype("string")
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = armazem.caminho_temporario(caminho)
+    df.drop(columns=["ano"]).to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def _remover(ano, uf):
+    for tabela in TABELAS:
+        caminho = armazem.caminho_particao(pasta_tabela(tabela), ano, uf)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def _ler_estado():
+    try:
+        with open(caminho_estado(), encoding="utf-8") as f:
+            estado = json.load(f)
+        return estado if estado.get("versao") == VERSAO else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def atualizar_indicadores(tudo=False):
+    if not armazem.armazem_disponivel():
+        print("⚠️ pyarrow não instalado - indicadores dependem do armazém local.")
+        return None
+    with armazem.trava("_indicadores"):
+        return _atualizar(tudo)
+
+
+def _atualizar(tudo):
+    origem = particoes_de_origem()
+    anteriores = {} if tudo else _ler_estado().get("particoes", {})
+    mudaram = [p for p, assinatura in origem.items() if anteriores.get(p) != assinatura]
+    sumiram = [p for p in anteriores if p not in origem]
+
+    for particao in mudaram:
+        ano, uf = (parte.split("=", 1)[1] for parte in particao.split("/"))
+        rcl = calcular_rcl(_ler("RREO", ano, uf, [RCL_RREO["anexo"]]))
+        limites = calcular_limites(_ler("RGF", ano, uf, sorted({PESSOAL["anexo"], DCL["anexo"]})), rcl)
+        _gravar("rcl", ano, uf, rcl)
+        _gravar("limites", ano, uf, limites)
+    for particao in sumiram:
+        _remover(*(parte.split("=", 1)[1] for parte in particao.split("/")))
+
+    os.makedirs(os.path.dirname(caminho_estado()), exist_ok=True)
+    temporario = armazem.caminho_temporario(caminho_estado())
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"versao": VERSAO, "particoes": origem}, f)
+    os.replace(temporario, caminho_estado())
+    resumo = {"recalculadas": len(mudaram), "mantidas": len(origem) - len(mudaram), "removidas": len(sumiram)}
+    print(f"📐 Indicadores LRF: {resumo['recalculadas']} partição(ões) recalculada(s), {resumo['mantidas']} sem "
+          f"mudança, {resumo['removidas']} removida(s)")
+    return resumo
+
+
+def consultar_indicadores(tabela, filtros=None):
+    # Ex.: consultar_indicadores("limites", {"ano": 2024, "uf": "AC", "poder": "E"})
+    if not os.path.isdir(os.path.join(armazem.ARMAZEM_DIR, pasta_tabela(tabela))):
+        return pd.DataFrame(columns=TABELAS[tabela])
+    return armazem.abrir_dataset(pasta_tabela(tabela)).to_table(filter=armazem.montar_filtro(filtros)).to_pandas()
+
+
+# === VERIFICAÇÃO ===
+# Linhas com os rótulos reais dos anexos (RREO 3, RGF 1 e 2), que os dados sintéticos do stub não têm: um estado
+# no 2º quadrimestre (colunas de todos os quadrimestres na mesma linha) e um município semestral sem RCL no RGF
+def _linhas_verificacao():
+    linhas = []
+
+    def linha(relatorio, cod_ibge, periodicidade, periodo, anexo, conta, coluna, valor, poder=None):
+        item = {"cod_ibge": cod_ibge, "ente": f"Ente {cod_ibge}", "esfera": "E" if cod_ibge < 100 else "M",
+                "uf": "AC", "ano": 2024, "exercicio": 2024, "periodo": periodo, "periodicidade": periodicidade,
+                "anexo": anexo, "rotulo": "Padrão", "cod_conta": "", "conta": conta, "coluna": coluna, "valor": valor}
+        if relatorio == "RGF":
+            item.update(poder=poder, co_poder=poder)
+        linhas.append((relatorio, item))
+
+    for bimestre in (4, 6):
+        linha("RREO", 12, "B", bimestre, "RREO-Anexo 03", "RECEITAS CORRENTES (I)", "TOTAL (ÚLTIMOS 12 MESES)", 5e3)
+        linha("RREO", 1200401, "B", bimestre, "RREO-Anexo 03", "RECEITA CORRENTE LÍQUIDA (III) = (I - II)",
+              "<MR-11>", 1.0)
+        linha("RREO", 1200401, "B", bimestre, "RREO-Anexo 03", "RECEITA CORRENTE LÍQUIDA (III) = (I - II)",
+              "TOTAL (ÚLTIMOS 12 MESES)", 100.0 * bimestre)
+        linha("RREO", 1200401, "B", bimestre, "RREO-Anexo 03",
+              "RECEITA CORRENTE LÍQUIDA AJUSTADA PARA CÁLCULO DOS LIMITES DE ENDIVIDAMENTO (V) = (III - IV)",
+              "TOTAL (ÚLTIMOS 12 MESES)", 1.0)
+
+    anexo1 = [("DESPESA BRUTA COM PESSOAL (I)", "TOTAL (ÚLTIMOS 12 MESES) (a)", 700.0),
+              ("DESPESA TOTAL COM PESSOAL - DTP (VIII) = (IIIa + IIIb)", "INSCRITAS EM RESTOS A PAGAR NÃO "
+               "PROCESSADOS (b)", 5.0),
+              ("DESPESA TOTAL COM PESSOAL - DTP (VIII) = (IIIa + IIIb)", "TOTAL (ÚLTIMOS 12 MESES) (a)", 540.0),
+              ("RECEITA CORRENTE LÍQUIDA - RCL (IX)", "VALOR", 1100.0),
+              ("RECEITA CORRENTE LÍQUIDA AJUSTADA (XI)", "VALOR", 1000.0),
+              ("DESPESA TOTAL COM PESSOAL - DTP (XII) = (VIIIa + VIIIb)", "% SOBRE A RCL AJUSTADA", 54.0)]
+    for conta, coluna, valor in anexo1:
+        linha("RGF", 12, "Q", 2, "RGF-Anexo 01", conta, coluna, valor, "E")
+    for conta, valores in (("DÍVIDA CONSOLIDADA - DC (I)", (50.0, 60.0, 70.0)),
+                           ("DÍVIDA CONSOLIDADA LÍQUIDA (DCL) (III) = (I - II)", (10.0, 20.0, 30.0)),
+                           ("RECEITA CORRENTE LÍQUIDA AJUSTADA PARA CÁLCULO DOS LIMITES DE ENDIVIDAMENTO (VI) = "
+                            "(IV - V)", (800.0, 900.0, 1000.0)),
+                           ("% da DCL sobre a RCL AJUSTADA (III/VI)", (1.25, 2.22, 3.0))):
+        for coluna, valor in zip(("SALDO DO EXERCÍCIO ANTERIOR", "Até o 1º Quadrimestre", "Até o 2º Quadrimestre"),
+                                 valores):
+            linha("RGF", 12, "Q", 2, "RGF-Anexo 02", conta, coluna, valor, "E")
+    # Município semestral: DTP sem RCL no Anexo 1 (RCL de reserva: RREO do 6º bimestre) e DCL do 2º semestre
+    linha("RGF", 1200401, "S", 2, "RGF-Anexo 01", "DESPESA TOTAL COM PESSOAL - DTP (VIII) = (IIIa + IIIb)",
+          "TOTAL (ÚLTIMOS 12 MESES) (a)", 300.0, "E")
+    for coluna, valor in (("Até o 1º Semestre", 90.0), ("Até o 2º Semestre", 60.0)):
+        linha("RGF", 1200401, "S", 2, "RGF-Anexo 02", "DÍVIDA CONSOLIDADA LÍQUIDA (DCL) (III) = (I - II)", coluna,
+              valor, "E")
+    return linhas
+
+
+def verificar():
+    # python indicadores.py --verificar: calcula os indicadores das linhas acima e compara com o esperado
+    import tempfile
+    esperado = {(12, 2): {"despesa_pessoal": 540.0, "rcl": 1000.0, "pessoal_pct_rcl": 54.0, "dcl": 30.0,
+                          "dcl_pct_rcl": 3.0},
+                (1200401, 2): {"despesa_pessoal": 300.0, "rcl": 600.0, "pessoal_pct_rcl": 50.0, "dcl": 60.0,
+                               "dcl_pct_rcl": 10.0}}
+    diretorio_original = armazem.ARMAZEM_DIR
+    with tempfile.TemporaryDirectory(prefix="indicadores_") as armazem.ARMAZEM_DIR:
+        try:
+            linhas = _linhas_verificacao()
+            for relatorio in ("RREO", "RGF"):
+                armazem.gravar_no_armazem(pd.DataFrame([item for r, item in linhas if r == relatorio]), relatorio)
+            atualizar_indicadores(tudo=True)
+            rcl = consultar_indicadores("rcl")
+            limites = consultar_indicadores("limites")
+        finally:
+            armazem.ARMAZEM_DIR = diretorio_original
+
+    erros = []
+    if sorted(zip(rcl["cod_ibge"], rcl["periodo"], rcl["rcl"])) != [(1200401, 4, 400.0), (1200401, 6, 600.0)]:
+        erros.append(f"rcl: {rcl[['cod_ibge', 'periodo', 'rcl']].values.tolist()}")
+    for (cod_ibge, periodo), valores in esperado.items():
+        linha = limites[(limites["cod_ibge"] == cod_ibge) & (limites["periodo"] == periodo)]
+        obtido = {k: (float(linha[k].iloc[0]) if len(linha) else None) for k in valores}
+        if obtido != valores:
+            erros.append(f"limites {cod_ibge} P{periodo}: {obtido} (esperado {valores})")
+    for erro in erros:
+        print(f"❌ {erro}")
+    if not erros:
+        print("✅ Indicadores conferem com os rótulos reais dos Anexos 1, 2 e 3")
+    return not erros
+
+
+if __name__ == "__main__":
+    # python indicadores.py [--tudo] [--verificar]
+    if "--verificar" in sys.argv:
+        sys.exit(0 if verificar() else 1)
+    atualizar_indicadores(tudo="--tudo" in sys.argv)
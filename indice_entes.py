@@ -0,0 +1,42 @@
+import json
+import os
+from datetime import datetime
+
+# === CONFIGURAÇÕES ===
+# Índice compacto (UFs por esfera) gravado a cada carga do catálogo de entes: a tela do Streamlit monta a barra
+# lateral a partir dele, sem esperar a API nem importar pandas
+INDICE_ENTES = os.environ.get("SICONFI_INDICE_ENTES", "indice_entes.json")
+UFS = ["AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG", "MS", "MT", "PA", "PB", "PE", "PI", "PR",
+       "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO"]
+ESFERAS_COM_UF = ["M", "E"]
+
+
+def indice_de_entes(entes_df):
+    return {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "entes": len(entes_df),
+        "ufs": {esfera: sorted(entes_df.loc[entes_df["esfera"] == esfera, "uf"].dropna().unique().tolist())
+                for esfera in ESFERAS_COM_UF},
+        "por_esfera": {str(k): int(v) for k, v in entes_df["esfera"].value_counts().items()},
+    }
+
+
+def gravar_indice(entes_df, caminho=None):
+    if entes_df.empty or "esfera" not in entes_df.columns:
+        return None
+    caminho = caminho or INDICE_ENTES
+    indice = indice_de_entes(entes_df)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(indice, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+    return indice
+
+
+def ler_indice(caminho=None):
+    # Sem índice gravado (primeira execução na máquina): as 27 UFs, até o catálogo chegar
+    try:
+        with open(caminho or INDICE_ENTES, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"ts": None, "entes": None, "ufs": {esfera: list(UFS) for esfera in ESFERAS_COM_UF}, "por_esfera": {}}
@@ -0,0 +1,136 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from metricas import metricas
+
+try:
+    import fcntl
+except ImportError:  # Windows: trava pelo msvcrt
+    fcntl = None
+    import msvcrt
+
+# === CONFIGURAÇÕES ===
+# Limite de requisições por segundo para a máquina toda, somando todos os extratores abertos (0 = desligado,
+# cada processo fica só com a pausa fixa SICONFI_PAUSA). O estado fica num arquivo com trava, em SICONFI_TAXA_DIR
+TAXA = float(os.environ.get("SICONFI_TAXA", "0"))
+RAJADA = float(os.environ.get("SICONFI_RAJADA", "0")) or None  # fichas acumuláveis (padrão: 1s de taxa)
+# Peso deste processo na divisão da taxa entre os que estão rodando (2 = o dobro da fatia de um peso 1)
+PRIORIDADE = float(os.environ.get("SICONFI_PRIORIDADE", "1"))
+TAXA_DIR = os.environ.get("SICONFI_TAXA_DIR", os.path.join(tempfile.gettempdir(), "siconfi_taxa"))
+INATIVO_APOS = 10  # segundos sem pedir ficha: o processo sai da divisão e libera a fatia
+
+
+# === TRAVA ENTRE PROCESSOS ===
+class Trava:
+    # Também usada por quem faz leitura-alteração-gravação num arquivo compartilhado (armazem, planejador)
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        self.arquivo = open(self.caminho, "a+b")
+        if fcntl:
+            fcntl.flock(self.arquivo, fcntl.LOCK_EX)
+        else:
+            self.arquivo.seek(0)
+            msvcrt.locking(self.arquivo.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.arquivo, fcntl.LOCK_UN)
+        else:
+            self.arquivo.seek(0)
+            msvcrt.locking(self.arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+        self.arquivo.close()
+
+
+# === BALDE DE FICHAS COMPARTILHADO ===
+# Cada processo ativo tem um balde próprio que enche a TAXA x peso / soma dos pesos ativos: a soma das
+# fatias nunca passa da TAXA, e a fatia de quem para de pedir volta para os outros depois de INATIVO_APOS
+class Limitador:
+    def __init__(self, taxa=None, prioridade=None, diretorio=None, rajada=None):
+        self.taxa = TAXA if taxa is None else taxa
+        self.prioridade = max(PRIORIDADE if prioridade is None else prioridade, 0.01)
+        self.rajada = rajada or RAJADA
+        diretorio = diretorio or TAXA_DIR
+        self.caminho_trava = os.path.join(diretorio, "siconfi_taxa.lock")
+        self.caminho_estado = os.path.join(diretorio, "siconfi_taxa.json")
+        self.job = f"{os.getpid()}@{id(self)}"
+        self._lock = threading.Lock()  # threads do mesmo processo pegam fichas uma de cada vez
+
+    def ativo(self):
+        return self.taxa > 0
+
+    def _ler(self):
+        try:
+            with open(self.caminho_estado, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _gravar(self, estado):
+        temporario = f"{self.caminho_estado}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(estado, f)
+        os.replace(temporario, self.caminho_estado)
+
+    def _tentar(self):
+        # Devolve 0 se pegou uma ficha, ou quantos segundos esperar pela próxima
+        agora = time.time()
+        with Trava(self.caminho_trava):
+            estado = self._ler()
+            jobs = {j: d for j, d in estado.items() if agora - d["visto"] < INATIVO_APOS or j == self.job}
+            meu = jobs.setdefault(self.job, {"peso": self.prioridade, "fichas": 1.0, "visto": agora})
+            meu["peso"] = self.prioridade
+            fatia = self.taxa * meu["peso"] / sum(d["peso"] for d in jobs.values())
+            capacidade = max((self.rajada or self.taxa) * meu["peso"] / sum(d["peso"] for d in jobs.values()), 1.0)
+            meu["fichas"] = min(capacidade, meu["fichas"] + (agora - meu["visto"]) * fatia)
+            meu["visto"] = agora
+            espera = 0.0
+            if meu["fichas"] >= 1:
+                meu["fichas"] -= 1
+            else:
+                espera = (1 - meu["fichas"]) / fatia
+            self._gravar(jobs)
+        return espera
+
+    def aguardar(self):
+        if not self.ativo():
+            return 0.0
+        esperado = 0.0
+        with self._lock:
+            while True:
+                espera = self._tentar()
+                if not espera:
+                    break
+                time.sleep(espera)
+                esperado += espera
+        if esperado:
+            metricas.registrar_espera_taxa(esperado)
+        return esperado
+
+    def tentar(self):
+        # Ficha só se houver uma agora, sem esperar (cópia do hedge): outra thread esperando = não há ficha
+        if not self.ativo():
+            return True
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            return not self._tentar()
+        finally:
+            self._lock.release()
+
+    def sair(self):
+        # Libera a fatia na hora (sem esperar INATIVO_APOS)
+        if not self.ativo():
+            return
+        with Trava(self.caminho_trava):
+            estado = self._ler()
+            estado.pop(self.job, None)
+            self._gravar(estado)
+
+
+limitador = Limitador()
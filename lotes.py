@@ -0,0 +1,54 @@
+import threading
+import numpy as np
+import pandas as pd
+from esquema import aplicar_esquema, registrar_economia, unificar_categorias
+from perfil import fase
+
+
+# === ACUMULADOR DE LOTES ===
+# Cada resposta da API entra como veio, com um registro pequeno de metadados (cod_ibge, ente, ano, período...).
+# As colunas de metadados só são criadas uma vez, na concatenação, repetindo cada valor pelo tamanho do lote.
+class AcumuladorLotes:
+    def __init__(self, relatorio=None):
+        self.relatorio = relatorio
+        self.lotes = []
+        self.metadados = []
+        self._lock = threading.Lock()  # entes extraídos em paralelo (ver planejador.py)
+
+    def adicionar(self, df, **metadados):
+        with self._lock:
+            self.lotes.append(df)
+            self.metadados.append(metadados)
+
+    def __len__(self):
+        return len(self.lotes)
+
+    def linhas(self):
+        return sum(len(df) for df in self.lotes)
+
+    def concatenar(self):
+        if not self.lotes:
+            return pd.DataFrame()
+        with fase("concat"):
+            df = pd.concat(unificar_categorias(self.lotes), ignore_index=True)
+        with fase("colunas"):
+            tamanhos = np.fromiter((len(lote) for lote in self.lotes), dtype=np.int64, count=len(self.lotes))
+            for coluna in self.metadados[0]:
+                valores = [m.get(coluna) for m in self.metadados]
+                df[coluna] = _repetir(valores, tamanhos)
+            if self.relatorio:
+                aplicar_esquema(df, self.relatorio)
+                registrar_economia(df)
+        return df
+
+    def limpar(self):
+        self.lotes = []
+        self.metadados = []
+
+
+def _repetir(valores, tamanhos):
+    if all(isinstance(v, str) for v in valores):
+        # Texto repetido (ente, esfera, poder...) vira categórico: um código por linha, não uma string
+        codigos, categorias = pd.factorize(pd.Series(valores, dtype=object), sort=False)
+        return pd.Categorical.from_codes(np.repeat(codigos, tamanhos), categories=categorias)
+    return np.repeat(np.asarray(valores), tamanhos)
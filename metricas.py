@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+# === CONFIGURAÇÕES ===
+METRICAS_DIR = os.environ.get("SICONFI_METRICAS", "metricas")
+QUANTIS = [0.5, 0.95, 0.99]
+
+
+def percentil(valores, quantil):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = quantil * (len(ordenados) - 1)
+    base = int(posicao)
+    fracao = posicao - base
+    if base + 1 < len(ordenados):
+        return ordenados[base] + (ordenados[base + 1] - ordenados[base]) * fracao
+    return ordenados[base]
+
+
+# === REGISTRO DE MÉTRICAS POR REQUISIÇÃO ===
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.registros = []
+        self.inicio = time.time()
+        self.memoria = Counter()
+        self.paradas = []
+        self.hedges = []
+        self.esperas_taxa = []
+
+    def registrar(self, endpoint, duracao, tamanho, status, resultado, tentativas=1, cache=False, **rotulos):
+        # resultado: "dados", "vazio" ou "erro"
+        registro = {
+            "ts": round(time.time(), 3),
+            "endpoint": endpoint,
+            "duracao": round(duracao, 4),
+            "bytes": tamanho,
+            "status": status,
+            "resultado": resultado,
+            "tentativas": tentativas,
+            "cache": cache,
+        }
+        registro.update({k: v for k, v in rotulos.items() if v is not None})
+        with self._lock:
+            self.registros.append(registro)
+        return registro
+
+    def registrar_memoria(self, linhas, bytes_sem_esquema, bytes_com_esquema):
+        # Memória dos DataFrames concatenados, com e sem o esquema tipado (ver esquema.py)
+        with self._lock:
+            self.memoria["linhas"] += linhas
+            self.memoria["bytes_sem_esquema"] += bytes_sem_esquema
+            self.memoria["bytes_com_esquema"] += bytes_com_esquema
+
+    def registrar_parada(self, segundos):
+        # Períodos com a API fora do ar em que o disjuntor segurou a extração (ver cliente_siconfi.py)
+        with self._lock:
+            self.paradas.append(round(segundos, 1))
+
+    def registrar_hedge(self, duplicada_venceu, segundos_economizados):
+        # Requisições duplicadas contra retardatárias (ver cliente_siconfi.py)
+        with self._lock:
+            self.hedges.append((duplicada_venceu, segundos_economizados))
+
+    def registrar_espera_taxa(self, segundos):
+        # Esperas pelo limite de taxa compartilhado entre os extratores da máquina (ver limitador.py)
+        with self._lock:
+            self.esperas_taxa.append(segundos)
+
+    def reiniciar(self):
+        with self._lock:
+            self.registros = []
+            self.inicio = time.time()
+            self.memoria = Counter()
+            self.paradas = []
+            self.hedges = []
+            self.esperas_taxa = []
+
+    def resumo(self):
+        with self._lock:
+            registros = list(self.registros)
+            memoria = dict(self.memoria)
+            paradas = list(self.paradas)
+            hedges = list(self.hedges)
+            esperas_taxa = list(self.esperas_taxa)
+        decorrido = max(time.time() - self.inicio, 1e-9)
+        duracoes = [r["duracao"] for r in registros]
+        resultados = Counter(r["resultado"] for r in registros)
+        total = len(registros)
+
+        por_endpoint = defaultdict(list)
+        for r in registros:
+            por_endpoint[r["endpoint"]].append(r["duracao"])
+
+        return {
+            "inicio": datetime.fromtimestamp(self.inicio).isoformat(timespec="seconds"),
+            "duracao_execucao": round(decorrido, 2),
+            "requisicoes": total,
+            "req_por_segundo": round(total / decorrido, 3),
+            "bytes": sum(r["bytes"] for r in registros),
+            "tentativas_extras": sum(r["tentativas"] - 1 for r in registros),
+            "resultados": dict(resultados),
+            "taxa_vazio": round(resultados["vazio"] / total, 4) if total else 0.0,
+            "taxa_cache": round(sum(1 for r in registros if r["cache"]) / total, 4) if total else 0.0,
+            "latencia": {f"p{int(q * 100)}": round(percentil(duracoes, q), 4) for q in QUANTIS},
+            "latencia_por_endpoint": {
+                endpoint: {f"p{int(q * 100)}": round(percentil(valores, q), 4) for q in QUANTIS}
+                for endpoint, valores in por_endpoint.items()
+            },
+            "memoria_esquema": {
+                "linhas": memoria.get("linhas", 0),
+                "mb_sem_esquema": round(memoria.get("bytes_sem_esquema", 0) / 1024 ** 2, 2),
+                "mb_com_esquema": round(memoria.get("bytes_com_esquema", 0) / 1024 ** 2, 2),
+                "economia": round(1 - memoria["bytes_com_esquema"] / memoria["bytes_sem_esquema"], 4)
+                if memoria.get("bytes_sem_esquema") else 0.0,
+            },
+            "paradas_api": {"quantidade": len(paradas), "segundos": round(sum(paradas), 1)},
+            "timeouts_adaptativos": sum(1 for r in registros if r.get("timeout_adaptativo")),
+            "hedge": {
+                "duplicadas": len(hedges),
+                "duplicada_venceu": sum(1 for venceu, _ in hedges if venceu),
+                "segundos_economizados": round(sum(s for _, s in hedges), 3),
+            },
+            "limite_taxa": {"esperas": len(esperas_taxa), "segundos": round(sum(esperas_taxa), 2)},
+            "cache_http": {
+                "frescas": sum(1 for r in registros if r["cache"] == "fresca"),
+                "revalidadas": sum(1 for r in registros if r["cache"] == "revalidada"),
+                "iguais": sum(1 for r in registros if r["cache"] == "igual"),
+                "bytes_economizados": sum(r.get("bytes_economizados", 0) for r in registros),
+            },
+        }
+
+    # === EXPORTAÇÃO ===
+    def exportar_jsonl(self, caminho):
+        with self._lock:
+            registros = list(self.registros)
+        with open(caminho, "w", encoding="utf-8") as f:
+            for r in registros:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    def exportar_prometheus(self, caminho=None):
+        with self._lock:
+            registros = list(self.registros)
+
+        contagens = Counter()
+        bytes_por_endpoint = Counter()
+        duracoes = defaultdict(list)
+        for r in registros:
+            contagens[(r["endpoint"], r.get("tipo", ""), r.get("esfera", ""), r["resultado"])] += 1
+            bytes_por_endpoint[r["endpoint"]] += r["bytes"]
+            duracoes[r["endpoint"]].append(r["duracao"])
+
+        linhas = [
+            "# HELP siconfi_requisicoes_total Requisições à API Siconfi por endpoint/tipo/esfera/resultado.",
+            "# TYPE siconfi_requisicoes_total counter",
+        ]
+        for (endpoint, tipo, esfera, resultado), n in sorted(contagens.items()):
+            linhas.append(f'siconfi_requisicoes_total{{endpoint="{endpoint}",tipo="{tipo}",'
+                          f'esfera="{esfera}",resultado="{resultado}"}} {n}')
+        linhas += [
+            "# HELP siconfi_bytes_total Bytes recebidos da API Siconfi.",
+            "# TYPE siconfi_bytes_total counter",
+        ]
+        for endpoint, n in sorted(bytes_por_endpoint.items()):
+            linhas.append(f'siconfi_bytes_total{{endpoint="{endpoint}"}} {n}')
+        linhas += [
+            "# HELP siconfi_latencia_segundos Latência das requisições à API Siconfi.",
+            "# TYPE siconfi_latencia_segundos summary",
+        ]
+        for endpoint, valores in sorted(duracoes.items()):
+            for q in QUANTIS:
+                linhas.append(f'siconfi_latencia_segundos{{endpoint="{endpoint}",quantile="{q}"}} '
+                              f'{percentil(valores, q):.4f}')
+            linhas.append(f'siconfi_latencia_segundos_sum{{endpoint="{endpoint}"}} {sum(valores):.4f}')
+            linhas.append(f'siconfi_latencia_segundos_count{{endpoint="{endpoint}"}} {len(valores)}')
+
+        texto = "\n".join(linhas) + "\n"
+        if caminho:
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(texto)
+        return texto
+
+    def salvar_execucao(self, nome):
+        # Grava resumo (JSON), registros (JSON lines) e texto Prometheus da execução
+        os.makedirs(METRICAS_DIR, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(METRICAS_DIR, f"{nome}_{timestamp}")
+        resumo = self.resumo()
+        with open(f"{base}_resumo.json", "w", encoding="utf-8") as f:
+            json.dump(resumo, f, ensure_ascii=False, indent=2)
+        self.exportar_jsonl(f"{base}_requisicoes.jsonl")
+        self.exportar_prometheus(f"{base}.prom")
+
+        lat = resumo["latencia"]
+        print(f"📈 {resumo['requisicoes']} requisições | {resumo['req_por_segundo']} req/s | "
+              f"p50 {lat['p50']}s p95 {lat['p95']}s p99 {lat['p99']}s | "
+              f"vazias {resumo['taxa_vazio']:.0%} | cache {resumo['taxa_cache']:.0%}")
+        mem = resumo["memoria_esquema"]
+        if mem["linhas"]:
+            print(f"🧮 Esquema tipado: {mem['linhas']} linhas em {mem['mb_com_esquema']} MB "
+                  f"(seriam {mem['mb_sem_esquema']} MB sem o esquema, economia de {mem['economia']:.0%})")
+        if resumo["hedge"]["duplicadas"]:
+            print(f"🪞 Hedge: {resumo['hedge']['duplicadas']} duplicada(s), {resumo['hedge']['duplicada_venceu']} "
+                  f"mais rápida(s) que a original, {resumo['hedge']['segundos_economizados']}s de cauda economizados")
+        cache_http = resumo["cache_http"]
+        if cache_http["frescas"] or cache_http["revalidadas"] or cache_http["iguais"]:
+            print(f"♻️ Cache HTTP: {cache_http['frescas']} fresca(s) do disco, "
+                  f"{cache_http['revalidadas']} revalidada(s) (304), "
+                  f"{cache_http['iguais']} igual(is) pelo hash | "
+                  f"{cache_http['bytes_economizados'] / 1024 ** 2:.2f} MB sem baixar de novo")
+        if resumo["limite_taxa"]["esperas"]:
+            print(f"🚦 Limite de taxa compartilhado: {resumo['limite_taxa']['esperas']} espera(s), "
+                  f"{resumo['limite_taxa']['segundos']}s aguardando fichas")
+        if resumo["paradas_api"]["quantidade"]:
+            print(f"⏸️ API fora do ar: {resumo['paradas_api']['quantidade']} parada(s), "
+                  f"{resumo['paradas_api']['segundos']}s com a extração suspensa")
+        print(f"📄 Métricas salvas: {base}_*")
+        return resumo
+
+
+metricas = Metricas()
@@ -0,0 +1,412 @@
+import os
+import sys
+import threading
+import pandas as pd
+from cliente_siconfi import obter_dataframe, pausar
+from incremental import PlanoIncremental
+from lotes import AcumuladorLotes
+from multientes import ConsultaMultiEntes
+from prazo import PrazoEsgotado, prazo
+
+# === CONFIGURAÇÕES ===
+# Núcleo comum dos extratores (linha de comando e Streamlit): consultas, laços de extração e pausa entre
+# requisições ficam só aqui. Não importa streamlit nem tqdm: cada front-end acompanha o andamento pelo
+# callback progresso(avanco, mensagem=None)
+URL_API = os.environ.get("SICONFI_URL", "https://apidatalake.tesouro.gov.br/ords/siconfi/tt").rstrip("/")
+URL_ENTES = f"{URL_API}/entes"
+URL_RREO = f"{URL_API}/rreo"
+URL_RGF = f"{URL_API}/rgf"
+PAUSA_ENTRE_REQUISICOES = float(os.environ.get("SICONFI_PAUSA", "0.2"))
+TIMEOUT = 60
+
+# === LISTAS DE VALORES FIXOS ===
+PERIODOS_RREO = list(range(1, 7))  # bimestres
+ESFERAS_RGF = ["M", "E", "U", "C"]
+PERIODICIDADES_RGF = ["Q", "S"]
+TIPOS_RGF = ["RGF", "RGF Simplificado"]
+PODERES = ["E", "L", "J", "M", "D"]
+
+
+# === EXERCÍCIOS ===
+def anos_do_texto(texto):
+    # "2020-2024" (intervalo, inclusive), "2020,2022" ou "2024". ValueError se não for ano nenhum ("abc",
+    # "2024-2020", ""): cada front-end avisa "❌ Ano inválido."
+    anos = []
+    for parte in str(texto).replace(" ", "").split(","):
+        if "-" in parte:
+            inicio, fim = (int(a) for a in parte.split("-", 1))
+            if inicio > fim:
+                raise ValueError(f"Intervalo de anos invertido: {parte}")
+            anos.extend(range(inicio, fim + 1))
+        elif parte:
+            anos.append(int(parte))
+    if not anos:
+        raise ValueError(f"Nenhum ano em {texto!r}")
+    return sorted(set(anos))
+
+
+def anos_da_linha_de_comando(padrao):
+    # --anos 2016-2024 (ou --anos=2016-2024, ou SICONFI_ANOS); sem nada, os anos padrão do script
+    for i, argumento in enumerate(sys.argv):
+        if argumento.startswith("--anos="):
+            return anos_do_texto(argumento.split("=", 1)[1])
+        if argumento == "--anos" and i + 1 < len(sys.argv):
+            return anos_do_texto(sys.argv[i + 1])
+    if os.environ.get("SICONFI_ANOS"):
+        return anos_do_texto(os.environ["SICONFI_ANOS"])
+    return list(padrao)
+
+
+# === CLIENTE ===
+_catalogo = {}
+
+
+def obter_entes(timeout=TIMEOUT, atualizar=False):
+    # Catálogo de entes baixado uma vez por processo e compartilhado entre anos e esferas. Levanta exceção em
+    # falha: cada front-end decide como avisar (print, st.error...)
+    if atualizar or URL_ENTES not in _catalogo:
+        _catalogo[URL_ENTES] = obter_dataframe(URL_ENTES, relatorio="ENTES", timeout=timeout)
+    return _catalogo[URL_ENTES].copy()
+
+
+def params_rreo(cod_ibge, ano, periodo, tipo_demonstrativo="RREO"):
+    return {
+        "an_exercicio": ano,
+        "nr_periodo": periodo,
+        "co_tipo_demonstrativo": tipo_demonstrativo,
+        "id_ente": cod_ibge,
+    }
+
+
+def params_rgf(cod_ibge, ano, periodicidade, periodo, tipo_demo, poder, esfera, anexo=None):
+    params = {
+        "id_ente": cod_ibge,
+        "an_exercicio": ano,
+        "in_periodicidade": periodicidade,
+        "nr_periodo": periodo,
+        "co_tipo_demonstrativo": tipo_demo,
+        "co_poder": poder,
+        "co_esfera": esfera
+    }
+    if anexo:
+        params["no_anexo"] = anexo
+    return params
+
+
+def _consultar_rreo(cod_ibge, ano, periodo, tipo_demonstrativo="RREO", esfera=None):
+    return obter_dataframe(URL_RREO, params_rreo(cod_ibge, ano, periodo, tipo_demonstrativo), "RREO",
+                           timeout=TIMEOUT, tipo=tipo_demonstrativo, esfera=esfera)
+
+
+def consultar_rreo(cod_ibge, ano, periodo, tipo_demonstrativo="RREO", esfera=None):
+    try:
+        return _consultar_rreo(cod_ibge, ano, periodo, tipo_demonstrativo, esfera)
+    except Exception:
+        return pd.DataFrame()
+
+
+def tipos_rreo(esfera):
+    # União, estados e DF só publicam o RREO completo; municípios pequenos podem publicar o simplificado
+    return ["RREO"] if esfera in ["U", "E", "D"] else ["RREO", "RREO Simplificado"]
+
+
+def consultar_rreo_inteligente(cod_ibge, ano, periodo, esfera, populacao=0):
+    df, tipo, _ = _tentar_tipos(lambda t: _consultar_rreo(cod_ibge, ano, periodo, t, esfera), tipos_rreo(esfera))
+    if tipo:
+        df["tipo_demonstrativo"] = tipo
+    return df
+
+
+def _consultar_rgf(cod_ibge, ano, periodicidade, periodo, tipo_demo, poder, esfera, anexo=None):
+    params = params_rgf(cod_ibge, ano, periodicidade, periodo, tipo_demo, poder, esfera, anexo)
+    return obter_dataframe(URL_RGF, params, "RGF", timeout=TIMEOUT, tipo=tipo_demo, esfera=esfera, poder=poder,
+                           anexo=anexo)
+
+
+def consultar_rgf(cod_ibge, ano, periodicidade, periodo, tipo_demo, poder, esfera, anexo=None, divisor=None):
+    try:
+        if divisor is not None and anexo is None:
+            # Entes grandes (União, estados...) passam a ser consultados por anexo, em paralelo
+            return divisor.obter(cod_ibge, cod_ibge, ano, periodicidade, periodo, tipo_demo, poder, esfera)
+        return _consultar_rgf(cod_ibge, ano, periodicidade, periodo, tipo_demo, poder, esfera, anexo)
+    except Exception:
+        return pd.DataFrame()
+
+
+def _tentar_tipos(consultar, tipos):
+    # Primeiro tipo de demonstrativo com dados -> (df, tipo, None); nenhum -> (vazio, None, última exceção)
+    erro = None
+    for tipo in tipos:
+        try:
+            df = consultar(tipo)
+        except Exception as e:
+            erro = e
+            continue
+        if not df.empty:
+            return df, tipo, None
+    return pd.DataFrame(), None, erro
+
+
+# === UNIDADES ===
+# Uma unidade é a menor consulta refazível: (ente, período) no RREO, (ente, poder, periodicidade, período) no
+# RGF. É um dict simples, para poder ir e voltar do manifesto de falhas (JSON lines)
+def unidade_rreo(ano, cod_ibge, ente, esfera, periodo, populacao=0):
+    return {"relatorio": "RREO", "ano": int(ano), "cod_ibge": int(cod_ibge), "ente": ente, "esfera": esfera,
+            "periodo": int(periodo), "populacao": int(populacao or 0)}
+
+
+def unidade_rgf(ano, cod_ibge, ente, esfera, poder, periodicidade, periodo):
+    return {"relatorio": "RGF", "ano": int(ano), "cod_ibge": int(cod_ibge), "ente": ente, "esfera": esfera,
+            "poder": poder, "periodicidade": periodicidade, "periodo": int(periodo)}
+
+
+def consultas_da_unidade(u):
+    # Parâmetros exatos de cada requisição que a unidade faz, na ordem em que são tentadas
+    if u["relatorio"] == "RREO":
+        return [params_rreo(u["cod_ibge"], u["ano"], u["periodo"], t) for t in tipos_rreo(u["esfera"])]
+    return [params_rgf(u["cod_ibge"], u["ano"], u["periodicidade"], u["periodo"], t, u["poder"], u["esfera"])
+            for t in TIPOS_RGF]
+
+
+def obter_unidade(u, divisor=None, multientes=None):
+    # Devolve (df, metadados para o AcumuladorLotes, erro); df vazio com erro None = API respondeu sem dados.
+    # multientes: municípios pequenos vêm da resposta do grupo (vários entes numa requisição)
+    em_grupo = multientes is not None and multientes.agrupa(u["cod_ibge"])
+    if u["relatorio"] == "RREO":
+        def consultar_rreo_unidade(tipo):
+            if em_grupo:
+                params = params_rreo(u["cod_ibge"], u["ano"], u["periodo"], tipo)
+                return multientes.obter(u["cod_ibge"], params, tipo=tipo, esfera=u["esfera"])
+            return _consultar_rreo(u["cod_ibge"], u["ano"], u["periodo"], tipo, u["esfera"])
+
+        df, tipo, erro = _tentar_tipos(consultar_rreo_unidade, tipos_rreo(u["esfera"]))
+        if tipo is None:
+            return df, None, erro
+        df["tipo_demonstrativo"] = tipo
+        return df, {"cod_ibge": u["cod_ibge"], "ente": u["ente"], "ano": u["ano"], "periodo": u["periodo"]}, None
+
+    args = (u["cod_ibge"], u["ano"], u["periodicidade"], u["periodo"])
+
+    def consultar(tipo):
+        if em_grupo:
+            return multientes.obter(u["cod_ibge"], params_rgf(*args, tipo, u["poder"], u["esfera"]), tipo=tipo,
+                                    esfera=u["esfera"], poder=u["poder"])
+        if divisor is not None:
+            # Entes grandes (União, estados...) passam a ser consultados por anexo, em paralelo
+            return divisor.obter(u["cod_ibge"], *args, tipo, u["poder"], u["esfera"])
+        return _consultar_rgf(*args, tipo, u["poder"], u["esfera"])
+
+    df, tipo, erro = _tentar_tipos(consultar, TIPOS_RGF)
+    if tipo is None:
+        return df, None, erro
+    return df, {"cod_ibge": u["cod_ibge"], "ente": u["ente"], "ano": u["ano"], "esfera": u["esfera"],
+                "periodicidade": u["periodicidade"], "periodo": u["periodo"], "tipo_demo": tipo,
+                "poder": u["poder"]}, None
+
+
+def registro_falha(u, erro):
+    # Linha do manifesto: a unidade, as consultas exatas e a classe do erro ("SemDados" = resposta vazia)
+    return {**u, "consultas": consultas_da_unidade(u), "erro": type(erro).__name__ if erro else "SemDados",
+            "mensagem": str(erro)[:300] if erro else ""}
+
+
+def divisor_rgf():
+    from anexos import DivisorAnexos
+    # Família = (tipo, periodicidade, poder) do mesmo exercício: a que veio vazia não é dividida por anexo
+    return DivisorAnexos(_consultar_rgf, familia=lambda cod_ibge, ano, periodicidade, periodo, tipo_demo, poder,
+                         esfera: (ano, periodicidade, tipo_demo, poder))
+
+
+def poderes_por_esfera(esfera):
+    if esfera == "M":
+        return ["E", "L"]  # municípios geralmente têm só executivo e legislativo
+    elif esfera in ["E", "U"]:
+        return list(PODERES)
+    else:
+        return ["E"]  # consórcios públicos (C) normalmente só executivo; fallback
+
+
+def consultas_rgf(esfera):
+    return len(poderes_por_esfera(esfera)) * 5  # 3 quadrimestres + 2 semestres por poder
+
+
+def total_rgf(entes_df, esfera):
+    # Unidades de progresso de um grupo: 3 por poder e periodicidade (o semestral avança 1 a mais ao final)
+    return len(entes_df) * len(poderes_por_esfera(esfera)) * len(PERIODICIDADES_RGF) * 3
+
+
+# === MOTOR ===
+def _sem_progresso(avanco, mensagem=None):
+    pass
+
+
+def _executar(planejador, unidades_df, consultas, funcao, descricao, saidas=None, ao_concluir_ano=None):
+    if ao_concluir_ano is not None:
+        funcao, concluir_restantes = _entregando_anos(unidades_df, funcao, saidas, ao_concluir_ano)
+    if planejador is None:
+        # Ordem original, uma unidade por vez (Streamlit: widgets só podem ser atualizados da thread principal)
+        for _, row in unidades_df.iterrows():
+            funcao(row)
+    else:
+        # Entes mais caros primeiro (União, estados, capitais), para não ficarem na cauda da execução
+        planejador.executar(unidades_df, consultas, funcao, descricao)
+    if ao_concluir_ano is not None:
+        concluir_restantes()
+
+
+def _entregando_anos(unidades_df, funcao, saidas, ao_concluir_ano):
+    # Cada exercício é entregue (gravado pelo front-end) assim que a sua última unidade termina, e o acumulador
+    # é solto em seguida: a memória fica em um exercício por vez, e não em todos os do grupo até o fim
+    restantes = {int(ano): n for ano, n in unidades_df["_ano"].value_counts().items()}
+    lock = threading.Lock()
+    gravacao = threading.Lock()  # as gravações não se cruzam (índice de hashes do armazém, zip...)
+
+    def entregar(ano):
+        with gravacao:
+            resultados, falhas = saidas[ano]
+            ao_concluir_ano(ano, resultados, falhas)
+            saidas[ano] = (None, falhas)
+
+    def funcao_e_entrega(row):
+        n = funcao(row)
+        ano = int(row["_ano"])
+        with lock:
+            restantes[ano] -= 1
+            terminou = restantes[ano] == 0
+        if terminou:
+            entregar(ano)
+        return n
+
+    def concluir_restantes():
+        # Exercícios sem nenhuma unidade (grupo vazio) também são entregues, para o front-end avisar
+        for ano in list(saidas):
+            if restantes.get(ano, 0) == 0 and saidas[ano][0] is not None:
+                entregar(ano)
+
+    return funcao_e_entrega, concluir_restantes
+
+
+def _concluindo(funcao, multientes):
+    # Unidade (ente, ano) terminada: as fatias de respostas em grupo que ela não pediu saem da memória
+    def funcao_e_conclusao(row):
+        try:
+            return funcao(row)
+        finally:
+            multientes.concluir(row["cod_ibge"], row["_ano"])
+    return funcao_e_conclusao
+
+
+def _por_ano(anos, entes_df):
+    # Uma linha por (ente, ano), com índice único: todos os exercícios entram juntos na fila do planejador
+    return pd.concat([entes_df.assign(_ano=int(ano)) for ano in anos], ignore_index=True)
+
+
+def _por_valor(periodos):
+    # Com orçamento de tempo (--time-budget), os períodos mais novos saem primeiro
+    return sorted(periodos, reverse=True) if prazo.ativo() else list(periodos)
+
+
+def extrair_rreo(ano, entes_df, plano=None, planejador=None, progresso=None, descricao=""):
+    # Devolve (AcumuladorLotes, falhas no formato do manifesto)
+    planos = {ano: plano} if plano is not None else None
+    return extrair_rreo_anos([ano], entes_df, planos, planejador, progresso, descricao)[ano]
+
+
+def extrair_rreo_anos(anos, entes_df, planos=None, planejador=None, progresso=None, descricao="", coletor=None,
+                      ao_concluir_ano=None):
+    # Devolve {ano: (AcumuladorLotes, falhas)}; progresso recebe 0 com a mensagem antes de cada consulta e o
+    # avanço depois de cada período consultado ou pulado pelo plano incremental. coletor(relatorio) troca o
+    # AcumuladorLotes por outro objeto com adicionar(df, **metadados) (ex.: a fila de fluxo.py).
+    # ao_concluir_ano(ano, resultados, falhas) grava cada exercício assim que ele termina; depois disso o
+    # acumulador do exercício sai do dicionário devolvido (fica None)
+    planos = planos or {ano: PlanoIncremental("RREO", ano, ativo=False) for ano in anos}
+    progresso = progresso or _sem_progresso
+    coletor = coletor or AcumuladorLotes
+    saidas = {ano: (coletor("RREO"), []) for ano in anos}
+    multientes = ConsultaMultiEntes(URL_RREO, "RREO", entes_df, TIMEOUT)
+
+    def extrair_ente(row):
+        ano = row["_ano"]
+        resultados, falhas = saidas[ano]
+        cod_ibge = row["cod_ibge"]
+        nome_ente = row["ente"]
+        esfera_ente = row["esfera"]
+        populacao = row.get("populacao", 0) or 0
+        pendentes = planos[ano].periodos(cod_ibge, PERIODOS_RREO)
+        progresso(len(PERIODOS_RREO) - len(pendentes))
+        feitas = 0
+        for periodo in _por_valor(pendentes):
+            unidade = unidade_rreo(ano, cod_ibge, nome_ente, esfera_ente, periodo, populacao)
+            if prazo.esgotado():
+                # Fim da janela: a unidade vai para o manifesto de pendentes, sem consulta
+                falhas.append(registro_falha(unidade, PrazoEsgotado()))
+                progresso(1)
+                continue
+            progresso(0, f"📥 {nome_ente} ({cod_ibge}) - {ano} P{periodo}")
+            df, metadados, erro = obter_unidade(unidade, multientes=multientes)
+            if metadados:
+                resultados.adicionar(df, **metadados)
+            else:
+                falhas.append(registro_falha(unidade, erro))
+            feitas += 1
+            progresso(1)
+            pausar(PAUSA_ENTRE_REQUISICOES)
+        return feitas
+
+    _executar(planejador, _por_ano(anos, entes_df), len(PERIODOS_RREO), _concluindo(extrair_ente, multientes),
+              descricao, saidas, ao_concluir_ano)
+    return saidas
+
+
+def extrair_rgf(ano, esfera, entes_df, plano=None, divisor=None, planejador=None, progresso=None, descricao=""):
+    # Devolve (AcumuladorLotes, falhas no formato do manifesto)
+    planos = {ano: plano} if plano is not None else None
+    return extrair_rgf_anos([ano], esfera, entes_df, planos, divisor, planejador, progresso, descricao)[ano]
+
+
+def extrair_rgf_anos(anos, esfera, entes_df, planos=None, divisor=None, planejador=None, progresso=None,
+                     descricao="", coletor=None, ao_concluir_ano=None):
+    # Devolve {ano: (AcumuladorLotes, falhas)}; cada unidade tenta o RGF completo e depois o simplificado.
+    # ao_concluir_ano como em extrair_rreo_anos
+    planos = planos or {ano: PlanoIncremental("RGF", ano, ativo=False) for ano in anos}
+    progresso = progresso or _sem_progresso
+    coletor = coletor or AcumuladorLotes
+    lista_poderes = poderes_por_esfera(esfera)
+    saidas = {ano: (coletor("RGF"), []) for ano in anos}
+    multientes = ConsultaMultiEntes(URL_RGF, "RGF", entes_df, TIMEOUT)
+
+    def extrair_ente(row):
+        ano = row["_ano"]
+        plano = planos[ano]
+        resultados, falhas = saidas[ano]
+        cod_ibge = row["cod_ibge"]
+        nome_ente = row["ente"]
+        feitas = 0
+
+        for poder in lista_poderes:
+            periodicidades_ente = plano.periodicidades(cod_ibge, poder, PERIODICIDADES_RGF)
+            progresso(3 * (len(PERIODICIDADES_RGF) - len(periodicidades_ente)))
+            for periodicidade in periodicidades_ente:
+                max_periodo = 3 if periodicidade == "Q" else 2
+                pendentes = plano.periodos((cod_ibge, poder, periodicidade), range(1, max_periodo + 1))
+                progresso(3 - len(pendentes))
+                for periodo in _por_valor(pendentes):
+                    unidade = unidade_rgf(ano, cod_ibge, nome_ente, esfera, poder, periodicidade, periodo)
+                    if prazo.esgotado():
+                        falhas.append(registro_falha(unidade, PrazoEsgotado()))
+                        progresso(1)
+                        continue
+                    df, metadados, erro = obter_unidade(unidade, divisor, multientes)
+                    if metadados:
+                        resultados.adicionar(df, **metadados)
+                    else:
+                        falhas.append(registro_falha(unidade, erro))
+
+                    feitas += 1
+                    progresso(1)
+                    pausar(PAUSA_ENTRE_REQUISICOES)
+        return feitas
+
+    _executar(planejador, _por_ano(anos, entes_df), consultas_rgf(esfera), _concluindo(extrair_ente, multientes),
+              descricao, saidas, ao_concluir_ano)
+    return saidas
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from concurrent.futures import Future
+import pandas as pd
+import requests
+from cache_http import cache_respostas
+from cliente_siconfi import obter_dataframe, obter_pagina
+
+# === CONFIGURAÇÕES ===
+# Municípios pequenos (poucas dezenas de linhas por consulta) vão em grupos de até LOTE_ENTES numa requisição
+# só, com o filtro ORDS q={"cod_ibge":{"$in":[...]}}. 0 ou 1 = um ente por requisição, como sempre
+LOTE_ENTES = int(os.environ.get("SICONFI_LOTE_ENTES", "20"))
+LOTE_POPULACAO = int(os.environ.get("SICONFI_LOTE_POPULACAO", "50000"))
+ITENS_SONDA = 25  # primeira requisição em grupo de cada endpoint: uma página pequena, para ver se o q= vale
+
+# URL do endpoint -> True (aceita o filtro) / False (ignora ou recusa: volta a um ente por requisição)
+_suporte = {}
+_lock = threading.Lock()
+
+
+def filtro_entes(cod_ibges):
+    return json.dumps({"cod_ibge": {"$in": [int(c) for c in cod_ibges]}}, separators=(",", ":"))
+
+
+def _marcar_suporte(url, aceita, motivo=""):
+    with _lock:
+        if url in _suporte:
+            return
+        _suporte[url] = aceita
+    endpoint = url.rstrip("/").rsplit("/", 1)[-1]
+    if aceita:
+        print(f"📦 /{endpoint}: filtro q= aceito - municípios pequenos consultados em grupos de até {LOTE_ENTES}")
+    else:
+        print(f"📦 /{endpoint}: filtro q= não suportado ({motivo}) - consultas voltam a ser por ente")
+
+
+def _ano(chave):
+    return dict(chave[1]).get("an_exercicio")
+
+
+# === CONSULTA DE VÁRIOS ENTES POR REQUISIÇÃO ===
+class ConsultaMultiEntes:
+    # Quem pede primeiro um (grupo, parâmetros) faz a requisição do grupo inteiro; os outros entes do grupo
+    # recebem a própria fatia da resposta quando chegarem aos mesmos parâmetros (ou esperam a que está em voo).
+    # Fatias que ninguém mais vai pedir (ente pulado pelo incremental, ou que já achou dados num tipo anterior)
+    # saem da memória quando o motor avisa que a unidade do ente terminou (concluir)
+    def __init__(self, url, relatorio, entes_df, timeout=60, tamanho=None, populacao=None):
+        self.url = url
+        self.relatorio = relatorio
+        self.timeout = timeout
+        tamanho = LOTE_ENTES if tamanho is None else tamanho
+        populacao = LOTE_POPULACAO if populacao is None else populacao
+        self.grupos = {}
+        if tamanho > 1 and not entes_df.empty and {"esfera", "populacao"} <= set(entes_df.columns):
+            pequenos = entes_df[(entes_df["esfera"] == "M") & (entes_df["populacao"].fillna(0) < populacao)]
+            # Populações parecidas ficam juntas: o planejador também as executa perto uma da outra
+            codigos = list(pequenos.sort_values("populacao", ascending=False, kind="stable")["cod_ibge"].astype(int))
+            for i in range(0, len(codigos), tamanho):
+                grupo = tuple(codigos[i:i + tamanho])
+                if len(grupo) > 1:
+                    self.grupos.update({c: grupo for c in grupo})
+        self.respostas = {}
+        self.concluidos = set()  # (cod_ibge, ano) cujas unidades já terminaram
+        self._lock = threading.Lock()
+
+    def agrupa(self, cod_ibge):
+        return int(cod_ibge) in self.grupos and _suporte.get(self.url) is not False
+
+    def obter(self, cod_ibge, params, **rotulos):
+        # Mesmo resultado de obter_dataframe(url, params) para o ente sozinho; levanta exceção em falha
+        cod_ibge = int(cod_ibge)
+        if cache_respostas.tem_fresca(self.url, params):
+            # Já está fresca no cache sozinha (o aquecimento fez este ente por requisição própria)
+            return obter_dataframe(self.url, params, self.relatorio, timeout=self.timeout, **rotulos)
+        grupo = self.grupos[cod_ibge]
+        chave = (grupo, tuple(sorted((k, str(v)) for k, v in params.items() if k != "id_ente")))
+        with self._lock:
+            futuro = self.respostas.get(chave)
+            dono = futuro is None
+            if dono:
+                futuro = self.respostas[chave] = Future()
+        if dono:
+            try:
+                partes = self._consultar_grupo(grupo, params, rotulos)
+            except Exception:
+                partes = None
+            if partes is None:
+                # Grupo sem resposta (filtro não suportado, sonda sem dados ou falha): cada ente fica com None e
+                # faz a própria requisição; a chave sai quando todos passarem por aqui, como com dados
+                partes = dict.fromkeys(grupo)
+            with self._lock:
+                # Entes do grupo que terminaram enquanto a resposta estava em voo não vão buscar a fatia
+                ano = _ano(chave)
+                for c in grupo:
+                    if (c, ano) in self.concluidos and c != cod_ibge:
+                        partes.pop(c, None)
+                futuro.set_result(partes)
+
+        partes = futuro.result()
+        with self._lock:
+            df = partes.pop(cod_ibge, pd.DataFrame())
+            if not partes and self.respostas.get(chave) is futuro:
+                del self.respostas[chave]
+        if df is None:
+            return obter_dataframe(self.url, params, self.relatorio, timeout=self.timeout, **rotulos)
+        return df
+
+    def concluir(self, cod_ibge, ano):
+        # A unidade (ente, ano) terminou: as fatias dela que sobraram não vão ser pedidas por mais ninguém
+        cod_ibge = int(cod_ibge)
+        if cod_ibge not in self.grupos:
+            return
+        ano = str(ano)
+        with self._lock:
+            self.concluidos.add((cod_ibge, ano))
+            for chave, futuro in list(self.respostas.items()):
+                if cod_ibge not in chave[0] or _ano(chave) != ano or not futuro.done():
+                    continue
+                partes = futuro.result()
+                partes.pop(cod_ibge, None)
+                if not partes:
+                    del self.respostas[chave]
+
+    def _consultar_grupo(self, grupo, params, rotulos):
+        base = {k: v for k, v in params.items() if k != "id_ente"}
+        base["q"] = filtro_entes(grupo)
+        if cache_respostas.tem_fresca(self.url, base):
+            _marcar_suporte(self.url, True)  # a resposta do grupo guardada no cache já passou pela sonda
+        if _suporte.get(self.url) is None and not self._sondar(grupo, base, rotulos):
+            return None
+        if not _suporte.get(self.url):
+            return None
+        df = obter_dataframe(self.url, base, self.relatorio, timeout=self.timeout, lote=len(grupo), **rotulos)
+        return self._separar(df, grupo)
+
+    def _sondar(self, grupo, base, rotulos):
+        # Uma página pequena: um endpoint que ignorasse o q= devolveria entes de fora do grupo (ou o exercício
+        # inteiro), e isso não pode virar uma extração completa
+        try:
+            dados = obter_pagina(self.url, dict(base, limit=ITENS_SONDA), self.timeout, lote=len(grupo), **rotulos)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status is not None and 400 <= status < 500 and status != 429:
+                _marcar_suporte(self.url, False, f"HTTP {status}")
+            return False
+        except Exception:
+            return False
+        itens = dados.get("items") or []
+        if not itens:
+            return False  # sem dados não dá para saber se o filtro foi aplicado: tenta de novo no próximo grupo
+        fora = {int(item.get("cod_ibge") or 0) for item in itens} - set(grupo)
+        if fora:
+            _marcar_suporte(self.url, False, f"resposta com {len(fora)} ente(s) fora do grupo")
+            return False
+        _marcar_suporte(self.url, True)
+        return True
+
+    def _separar(self, df, grupo):
+        # Resposta do grupo -> fatia de cada ente, na ordem em que vieram (ente sem linhas = DataFrame vazio)
+        if df.empty:
+            return {c: pd.DataFrame() for c in grupo}
+        partes = {int(c): parte.reset_index(drop=True)
+                  for c, parte in df.groupby("cod_ibge", sort=False, observed=True)}
+        if set(partes) - set(grupo):
+            raise ValueError("Resposta em grupo com entes de fora do grupo")
+        return {c: partes.get(c, pd.DataFrame()) for c in grupo}
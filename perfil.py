@@ -0,0 +1,201 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# === CONFIGURAÇÕES ===
+PERFIL_DIR = os.environ.get("SICONFI_PERFIL", "perfil")
+INTERVALO_AMOSTRAGEM = 0.005  # segundos entre amostras de pilha
+
+_ativo = False
+_lock = threading.Lock()
+_fases_por_thread = {}  # id da thread -> pilha de fases abertas
+_estatisticas = defaultdict(lambda: {"chamadas": 0, "tempo": 0.0, "cpu": 0.0, "memoria_delta": 0, "memoria_pico": 0,
+                                     "medicoes_memoria": 0})
+_snapshots = {}
+# abertas: fases abertas em todas as threads; aberturas: contador que diz se outra fase abriu durante esta
+_estado = {"cprofile": None, "amostrador": None, "inicio": None, "abertas": 0, "aberturas": 0}
+_perfis_threads = []  # cProfile de cada thread criada depois de iniciar() (Python até 3.11)
+
+
+def ativo():
+    return _ativo
+
+
+# === FASES ===
+@contextmanager
+def _medir_fase(nome):
+    pilha = _fases_por_thread.setdefault(threading.get_ident(), [])
+    pilha.append(nome)
+    # O tracemalloc conta a memória do processo inteiro e reset_peak() zera o pico de todas as threads: a memória
+    # só é atribuída à fase quando ela roda sozinha (nenhuma outra fase aberta do início ao fim, em thread nenhuma)
+    with _lock:
+        sozinha = _estado["abertas"] == 0
+        _estado["abertas"] += 1
+        _estado["aberturas"] += 1
+        abertura = _estado["aberturas"]
+        if sozinha:
+            memoria_ini = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+    inicio, cpu_ini = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        duracao, cpu = time.perf_counter() - inicio, time.thread_time() - cpu_ini
+        pilha.pop()
+        with _lock:
+            _estado["abertas"] -= 1
+            sozinha = sozinha and _estado["aberturas"] == abertura
+            est = _estatisticas[nome]
+            est["chamadas"] += 1
+            est["tempo"] += duracao
+            est["cpu"] += cpu
+            novo_pico = False
+            if sozinha:
+                atual, pico = tracemalloc.get_traced_memory()
+                est["medicoes_memoria"] += 1
+                est["memoria_delta"] += atual - memoria_ini
+                novo_pico = pico - memoria_ini > est["memoria_pico"]
+                if novo_pico:
+                    est["memoria_pico"] = pico - memoria_ini
+        if novo_pico:
+            # Snapshot só quando a fase bate o próprio pico: poucas capturas por execução
+            _snapshots[nome] = tracemalloc.take_snapshot()
+
+
+def fase(nome):
+    return _medir_fase(nome) if _ativo else nullcontext()
+
+
+# === AMOSTRAGEM DE PILHAS (formato "folded" de flame graph) ===
+class Amostrador(threading.Thread):
+    def __init__(self, intervalo=INTERVALO_AMOSTRAGEM):
+        super().__init__(daemon=True, name="amostrador-perfil")
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        proprio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                funcoes = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    funcoes.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                    frame = frame.f_back
+                fases = _fases_por_thread.get(ident) or ["sem_fase"]
+                self.pilhas[";".join([f"[{fases[-1]}]"] + funcoes[::-1])] += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+
+# === CPU DAS THREADS ===
+# A partir do 3.12 o cProfile usa sys.monitoring e um perfil só já vê todas as threads. Até o 3.11 ele só vê
+# a thread que o ligou: cada thread nova (planejador, hedge, anexos, grupos de entes) liga o próprio perfil no
+# primeiro evento, e os perfis são somados no relatório
+def _perfilar_thread(frame, evento, argumento):
+    perfil_thread = cProfile.Profile()
+    with _lock:
+        _perfis_threads.append(perfil_thread)
+    perfil_thread.enable()  # substitui este gancho pelo do cProfile, só nesta thread
+
+
+def _estatisticas_cpu():
+    estatisticas = pstats.Stats(_estado["cprofile"])
+    for perfil_thread in _perfis_threads:
+        perfil_thread.create_stats()
+        if perfil_thread.stats:
+            estatisticas.add(perfil_thread)
+    return estatisticas
+
+
+# === INÍCIO E RELATÓRIO ===
+def iniciar():
+    global _ativo
+    tracemalloc.start(25)
+    _estado["cprofile"] = cProfile.Profile()
+    _estado["cprofile"].enable()
+    _estado["amostrador"] = Amostrador()
+    _estado["amostrador"].start()
+    if sys.version_info < (3, 12):
+        threading.setprofile(_perfilar_thread)
+    _estado["inicio"] = time.perf_counter()
+    _ativo = True
+    print("⏱️ Perfil de execução ativado")
+
+
+def finalizar(nome):
+    global _ativo
+    if not _ativo:
+        return None
+    _ativo = False
+    duracao_total = time.perf_counter() - _estado["inicio"]
+    _estado["cprofile"].disable()
+    threading.setprofile(None)
+    _estado["amostrador"].parar()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    destino = os.path.join(PERFIL_DIR, f"{nome}_{timestamp}")
+    os.makedirs(destino, exist_ok=True)
+
+    estatisticas = _estatisticas_cpu()
+    estatisticas.dump_stats(os.path.join(destino, "cpu.prof"))
+    texto = io.StringIO()
+    estatisticas.stream = texto
+    estatisticas.sort_stats("cumulative").print_stats(40)
+    with open(os.path.join(destino, "cpu_top.txt"), "w", encoding="utf-8") as f:
+        f.write(texto.getvalue())
+
+    with open(os.path.join(destino, "pilhas.folded"), "w", encoding="utf-8") as f:
+        for pilha, n in _estado["amostrador"].pilhas.most_common():
+            f.write(f"{pilha} {n}\n")
+
+    for nome_fase, snapshot in _snapshots.items():
+        with open(os.path.join(destino, f"memoria_{nome_fase}.txt"), "w", encoding="utf-8") as f:
+            for estatistica in snapshot.statistics("lineno")[:20]:
+                f.write(f"{estatistica}\n")
+    tracemalloc.stop()
+
+    resumo = {"duracao_total": round(duracao_total, 3), "fases": {}}
+    for nome_fase, est in sorted(_estatisticas.items(), key=lambda item: -item[1]["tempo"]):
+        resumo["fases"][nome_fase] = {
+            "chamadas": est["chamadas"],
+            "tempo_s": round(est["tempo"], 4),
+            "cpu_s": round(est["cpu"], 4),
+            "percentual": round(100 * est["tempo"] / duracao_total, 1) if duracao_total else 0,
+            "memoria_delta_mb": round(est["memoria_delta"] / 1024 ** 2, 2),
+            "memoria_pico_mb": round(est["memoria_pico"] / 1024 ** 2, 2),
+            "medicoes_memoria": est["medicoes_memoria"],  # chamadas que rodaram sozinhas (as da memória)
+        }
+    with open(os.path.join(destino, "fases.json"), "w", encoding="utf-8") as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=2)
+
+    print(f"\n⏱️ Perfil por fase ({duracao_total:.1f}s no total)")
+    for nome_fase, est in resumo["fases"].items():
+        if est["medicoes_memoria"]:
+            memoria = f"pico {est['memoria_pico_mb']} MB ({est['medicoes_memoria']}/{est['chamadas']} sozinha)"
+        else:
+            memoria = "pico n/d (sempre em paralelo)"
+        print(f"  {nome_fase:<10} {est['tempo_s']:>9.3f}s ({est['percentual']:>5.1f}%) | cpu {est['cpu_s']:.3f}s | "
+              f"{est['chamadas']} chamadas | {memoria}")
+    print(f"📄 Perfil salvo em {destino} (pilhas.folded: flamegraph.pl / speedscope; cpu.prof: snakeviz, "
+          f"{'todas as threads' if sys.version_info >= (3, 12) else f'{len(_perfis_threads) + 1} thread(s)'})")
+
+    _estatisticas.clear()
+    _snapshots.clear()
+    _perfis_threads.clear()
+    _estado.update(abertas=0, aberturas=0)
+    return resumo
@@ -0,0 +1,172 @@
+import heapq
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import armazem
+from limitador import Trava, limitador
+from metricas import METRICAS_DIR
+
+# === CONFIGURAÇÕES ===
+# Entes processados ao mesmo tempo. 1 mantém o ritmo de sempre (uma requisição por vez + pausa)
+TRABALHADORES = int(os.environ.get("SICONFI_TRABALHADORES", "1"))
+LATENCIA_BASE = 0.5  # segundos por consulta, sem histórico nenhum
+LINHAS_POR_PAGINA = 5000  # cada página ORDS extra é mais uma ida e volta
+POPULACAO_REFERENCIA = 1_000_000
+MAXIMO_ANOS_EM_PARALELO = 4
+
+
+def caminho_historico(relatorio):
+    return os.path.join(METRICAS_DIR, f"custos_{relatorio}.json")
+
+
+def makespan_lpt(custos, trabalhadores):
+    # Simula a fila "maior primeiro": cada unidade vai para o trabalhador que fica livre antes
+    cargas = [0.0] * max(trabalhadores, 1)
+    for custo in sorted(custos, reverse=True):
+        heapq.heapreplace(cargas, cargas[0] + custo)
+    return max(cargas)
+
+
+def trabalhadores_para_anos(anos):
+    # Vários exercícios na mesma fila: com o limite de taxa compartilhado ligado (SICONFI_TAXA), mais trabalhadores
+    # rodam sob ele; sem o limite, fica o SICONFI_TRABALHADORES de sempre
+    if limitador.ativo():
+        return max(TRABALHADORES, min(len(anos), MAXIMO_ANOS_EM_PARALELO))
+    return TRABALHADORES
+
+
+# === PLANEJADOR (caminho crítico: maiores primeiro) ===
+class Planejador:
+    def __init__(self, relatorio, trabalhadores=None):
+        self.relatorio = relatorio
+        self.trabalhadores = TRABALHADORES if trabalhadores is None else trabalhadores
+        self._lock = threading.Lock()
+        self.segundos_por_consulta = self._carregar_historico()
+        self.linhas_por_ano = self._linhas_no_armazem()
+        self.latencia_base = LATENCIA_BASE
+        if self.segundos_por_consulta:
+            valores = sorted(self.segundos_por_consulta.values())
+            self.latencia_base = valores[len(valores) // 2]
+        self.execucoes = []
+
+    def _carregar_historico(self):
+        # Segundos por consulta de cada ente, medidos nas execuções anteriores
+        try:
+            with open(caminho_historico(self.relatorio), encoding="utf-8") as f:
+                return {int(k): v for k, v in json.load(f).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def _linhas_no_armazem(self):
+        # Tamanho do demonstrativo de cada ente (linhas por exercício), pelo índice de hashes do armazém
+        if not armazem.armazem_disponivel():
+            return {}
+        try:
+            hashes = armazem.hashes_guardados(self.relatorio)
+        except Exception:
+            return {}
+        if hashes.empty:
+            return {}
+        por_ano = hashes.groupby(["cod_ibge", "ano"])["linhas"].sum().groupby(level=0).mean()
+        return {int(k): float(v) for k, v in por_ano.items()}
+
+    # === ESTIMATIVA ===
+    def custo(self, cod_ibge, populacao=0, consultas=1):
+        cod_ibge = int(cod_ibge)
+        if cod_ibge in self.segundos_por_consulta:
+            return self.segundos_por_consulta[cod_ibge] * consultas
+        linhas = self.linhas_por_ano.get(cod_ibge)
+        if linhas is not None:
+            # Payload conhecido: páginas extras por consulta
+            return consultas * self.latencia_base * (1 + linhas / consultas / LINHAS_POR_PAGINA)
+        # Sem histórico nem armazém: ente mais populoso, demonstrativo maior e mais lento
+        populacao = float(populacao or 0)
+        return consultas * self.latencia_base * (1 + min(populacao / POPULACAO_REFERENCIA, 9))
+
+    def ordenar(self, entes_df, consultas):
+        custos = [self.custo(row["cod_ibge"], row.get("populacao", 0), consultas) for _, row in entes_df.iterrows()]
+        colunas = ["_custo"]
+        if "_ano" in entes_df.columns and entes_df["_ano"].nunique() > 1:
+            # Vários exercícios: um de cada vez (o mais novo primeiro, depois os maiores), para cada exercício
+            # terminar cedo e ser gravado e liberado da memória antes do próximo (motor.ao_concluir_ano)
+            colunas = ["_ano", "_custo"]
+        return entes_df.assign(_custo=custos).sort_values(colunas, ascending=False, kind="stable")
+
+    def ordenar_grupos(self, grupos, consultas):
+        # grupos: [(uf, entes_df)] -> UFs mais caras primeiro
+        custos = {uf: sum(self.custo(r["cod_ibge"], r.get("populacao", 0), consultas) for _, r in g.iterrows())
+                  for uf, g in grupos}
+        return sorted(grupos, key=lambda item: custos[item[0]], reverse=True)
+
+    # === EXECUÇÃO ===
+    def executar(self, entes_df, consultas, funcao, descricao=""):
+        # funcao(row) processa uma unidade (um ente, ou um ente num ano) e devolve quantas consultas fez de
+        # fato. As unidades são identificadas pelo índice de entes_df, que precisa ser único
+        ordenados = self.ordenar(entes_df, consultas)
+        estimados = dict(zip(ordenados.index, ordenados["_custo"]))
+        entes = dict(zip(ordenados.index, ordenados["cod_ibge"].astype(int)))
+        reais = {}
+        feitas = {}
+
+        def rodar(chave, row):
+            inicio = time.perf_counter()
+            n = funcao(row)
+            with self._lock:
+                reais[chave] = time.perf_counter() - inicio
+                feitas[chave] = consultas if n is None else n
+
+        inicio = time.perf_counter()
+        linhas = list(ordenados.iterrows())
+        if self.trabalhadores <= 1:
+            for chave, row in linhas:
+                rodar(chave, row)
+        else:
+            # Fila em ordem decrescente de custo: cada trabalhador livre pega o próximo maior (LPT)
+            with ThreadPoolExecutor(max_workers=self.trabalhadores) as executor:
+                for futuro in [executor.submit(rodar, chave, row) for chave, row in linhas]:
+                    futuro.result()
+        decorrido = time.perf_counter() - inicio
+
+        execucao = {
+            "relatorio": self.relatorio,
+            "grupo": descricao,
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "trabalhadores": self.trabalhadores,
+            "unidades": len(linhas),
+            "makespan_estimado": round(makespan_lpt(list(estimados.values()), self.trabalhadores), 3),
+            "makespan_real": round(decorrido, 3),
+            "maiores_erros": sorted(
+                ({"cod_ibge": int(entes[c]), "estimado": round(estimados[c], 3), "real": round(reais[c], 3)}
+                 for c in reais),
+                key=lambda e: abs(e["real"] - e["estimado"]), reverse=True)[:5],
+        }
+        self.execucoes.append(execucao)
+        self._salvar(reais, feitas, entes, execucao)
+        print(f"🗓️ {descricao or self.relatorio}: makespan estimado {execucao['makespan_estimado']}s | "
+              f"real {execucao['makespan_real']}s ({self.trabalhadores} trabalhador(es), {len(linhas)} unidades)")
+        return execucao
+
+    def _salvar(self, reais, feitas, entes, execucao):
+        # Histórico por ente: soma os anos do mesmo ente antes de dividir pelas consultas
+        segundos_ente = {}
+        feitas_ente = {}
+        for chave, segundos in reais.items():
+            cod_ibge = entes[chave]
+            segundos_ente[cod_ibge] = segundos_ente.get(cod_ibge, 0.0) + segundos
+            feitas_ente[cod_ibge] = feitas_ente.get(cod_ibge, 0) + feitas[chave]
+        medidos = {cod_ibge: round(segundos / feitas_ente[cod_ibge], 4)
+                   for cod_ibge, segundos in segundos_ente.items() if feitas_ente[cod_ibge]}
+        os.makedirs(METRICAS_DIR, exist_ok=True)
+        caminho = caminho_historico(self.relatorio)
+        with Trava(caminho + ".trava"):
+            # Outro extrator pode ter gravado o histórico desde que este foi lido: relê e só troca os entes medidos
+            self.segundos_por_consulta = {**self.segundos_por_consulta, **self._carregar_historico(), **medidos}
+            temporario = f"{caminho}.{os.getpid()}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump({str(k): v for k, v in self.segundos_por_consulta.items()}, f)
+            os.replace(temporario, caminho)
+        with open(os.path.join(METRICAS_DIR, f"planejamento_{self.relatorio}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(execucao, ensure_ascii=False) + "\n")
@@ -0,0 +1,80 @@
+import os
+import re
+import sys
+import time
+
+# === CONFIGURAÇÕES ===
+# --time-budget 6h (ou SICONFI_ORCAMENTO_TEMPO): a extração para de lançar consultas antes do fim da janela,
+# grava o que já tem e deixa o resto num manifesto pendentes_*.jsonl, retomado na próxima execução
+MARGEM_FRACAO = 0.05  # parte do orçamento reservada para gravar ZIPs, armazém e manifestos
+MARGEM = os.environ.get("SICONFI_MARGEM_PRAZO")  # segundos; substitui a fração
+
+
+class PrazoEsgotado(Exception):
+    # Não é erro da API: a unidade ficou para a próxima execução (vai para o manifesto de pendentes)
+    pass
+
+
+def segundos_do_texto(texto):
+    # "5400", "90m", "6h", "1h30m"
+    texto = str(texto).strip().lower()
+    if re.fullmatch(r"\d+(\.\d+)?", texto):
+        return float(texto)
+    partes = re.findall(r"(\d+(?:\.\d+)?)([hms])", texto)
+    if not partes or "".join(n + u for n, u in partes) != texto:
+        raise ValueError(f"Orçamento de tempo inválido: {texto}")
+    return sum(float(n) * {"h": 3600, "m": 60, "s": 1}[u] for n, u in partes)
+
+
+def orcamento_da_linha_de_comando():
+    for i, argumento in enumerate(sys.argv):
+        if argumento.startswith("--time-budget="):
+            return segundos_do_texto(argumento.split("=", 1)[1])
+        if argumento == "--time-budget" and i + 1 < len(sys.argv):
+            return segundos_do_texto(sys.argv[i + 1])
+    if os.environ.get("SICONFI_ORCAMENTO_TEMPO"):
+        return segundos_do_texto(os.environ["SICONFI_ORCAMENTO_TEMPO"])
+    return None
+
+
+# === PRAZO DA EXECUÇÃO ===
+class Prazo:
+    def __init__(self, segundos=None, margem=None):
+        self.iniciar(segundos, margem)
+
+    def iniciar(self, segundos=None, margem=None):
+        self.segundos = segundos
+        self.inicio = time.monotonic()
+        if margem is None and segundos:
+            margem = float(MARGEM) if MARGEM else segundos * MARGEM_FRACAO
+        self.margem = margem or 0.0
+        self.avisado = False
+
+    def ativo(self):
+        return bool(self.segundos)
+
+    def restante(self):
+        return self.segundos - (time.monotonic() - self.inicio) if self.ativo() else float("inf")
+
+    def esgotado(self):
+        # True = não lançar mais consultas (o que está em voo termina normalmente)
+        if not self.ativo() or self.restante() > self.margem:
+            return False
+        if not self.avisado:
+            self.avisado = True
+            print(f"⏰ Orçamento de tempo ({self.segundos:.0f}s) quase no fim - novas consultas ficam para a "
+                  f"próxima execução")
+        return True
+
+
+# Sem orçamento até um CLI chamar configurar_prazo(): --time-budget não é lido no import (import motor não falha)
+prazo = Prazo()
+
+
+def configurar_prazo():
+    # Chamado pelos CLIs antes do main(): valor inválido vira aviso e saída, sem traceback
+    try:
+        prazo.iniciar(orcamento_da_linha_de_comando())
+    except ValueError as e:
+        print(f"❌ {e}.")
+        sys.exit(1)
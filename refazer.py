@@ -0,0 +1,134 @@
+import glob
+import json
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import motor
+from armazem import CHAVES, gravar_no_armazem
+from cliente_siconfi import pausar
+from lotes import AcumuladorLotes
+from metricas import metricas
+from perfil import fase
+from prazo import PrazoEsgotado, configurar_prazo, prazo
+from saidas import mesclar_no_zip, salvar_manifesto_falhas
+
+# === CONFIGURAÇÕES ===
+# Unidades refeitas ao mesmo tempo
+PARALELISMO = int(os.environ.get("SICONFI_REFAZER_PARALELISMO", "4"))
+
+# Campos do manifesto que não fazem parte da unidade em si
+CAMPOS_DO_MANIFESTO = ["consultas", "erro", "mensagem", "uf", "nome_base"]
+
+
+def ler_manifesto(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+def agrupar_falhas(caminhos, so_erros=False):
+    # (pasta do manifesto, nome_base, uf) -> unidades; a pasta do manifesto é a do ZIP do grupo
+    grupos = defaultdict(dict)
+    for caminho in caminhos:
+        pasta = os.path.dirname(os.path.abspath(caminho))
+        for falha in ler_manifesto(caminho):
+            if so_erros and falha["erro"] == "SemDados":
+                continue
+            unidade = {k: v for k, v in falha.items() if k not in CAMPOS_DO_MANIFESTO}
+            chave = tuple(unidade[c] for c in ["ano"] + CHAVES[unidade["relatorio"]])
+            grupos[(pasta, falha["nome_base"], falha.get("uf"))][chave] = unidade
+    return {grupo: list(unidades.values()) for grupo, unidades in grupos.items()}
+
+
+# === REEXECUÇÃO ===
+def refazer_grupo(pasta, nome_base, uf, unidades, paralelismo=None):
+    relatorio = unidades[0]["relatorio"]
+    divisor = motor.divisor_rgf() if relatorio == "RGF" else None
+    resultados = AcumuladorLotes(relatorio)
+    restantes = []
+
+    def refazer_unidade(unidade):
+        if prazo.esgotado():
+            restantes.append(motor.registro_falha(unidade, PrazoEsgotado()))
+            return
+        df, metadados, erro = motor.obter_unidade(unidade, divisor)
+        if metadados:
+            resultados.adicionar(df, **metadados)
+        else:
+            restantes.append(motor.registro_falha(unidade, erro))
+        pausar(motor.PAUSA_ENTRE_REQUISICOES)
+
+    if prazo.ativo():
+        # Orçamento de tempo: exercícios e períodos mais novos primeiro
+        unidades = sorted(unidades, key=lambda u: (u["ano"], u["periodo"]), reverse=True)
+    with ThreadPoolExecutor(max_workers=max(paralelismo or PARALELISMO, 1)) as executor:
+        list(executor.map(refazer_unidade, unidades))
+    print(f"🔁 {nome_base}: {len(unidades) - len(restantes)} de {len(unidades)} unidade(s) recuperada(s)")
+
+    if resultados:
+        df = resultados.concatenar()
+        resultados.limpar()
+        with fase("escrita"):
+            mesclar_no_zip(df, pasta, nome_base, CHAVES[relatorio])
+        gravar_no_armazem(df, relatorio)
+    salvar_manifesto_falhas(restantes, pasta, nome_base, uf)
+    return {"unidades": len(unidades), "recuperadas": len(unidades) - len(restantes), "restantes": len(restantes)}
+
+
+def _grupos_por_manifesto(caminhos, so_erros=False):
+    # manifesto -> grupos (pasta, nome_base, uf) que ele alimenta
+    grupos = {}
+    for caminho in caminhos:
+        pasta = os.path.dirname(os.path.abspath(caminho))
+        grupos[caminho] = {(pasta, falha["nome_base"], falha.get("uf")) for falha in ler_manifesto(caminho)
+                           if not (so_erros and falha["erro"] == "SemDados")}
+    return grupos
+
+
+def refazer(caminhos, so_erros=False, paralelismo=None):
+    # Busca só as unidades dos manifestos e mescla nos ZIPs dos grupos; o que continuar falhando sai num
+    # manifesto novo. Cada manifesto só vira .refeito depois que todos os seus grupos foram mesclados e os
+    # manifestos novos gravados: uma queda no meio (Ctrl-C, API fora do ar) não perde as unidades
+    grupos = agrupar_falhas(caminhos, so_erros)
+    pendentes = _grupos_por_manifesto(caminhos, so_erros)
+    # Manifesto novo com o mesmo nome (mesmo segundo) substitui o antigo: esse não pode virar .refeito
+    versoes = {caminho: os.stat(caminho).st_mtime_ns for caminho in caminhos}
+
+    def concluir(grupo=None):
+        for caminho, restantes in pendentes.items():
+            restantes.discard(grupo)
+            if not restantes and caminho in versoes:
+                if os.path.exists(caminho) and os.stat(caminho).st_mtime_ns == versoes[caminho]:
+                    os.replace(caminho, caminho + ".refeito")
+                del versoes[caminho]
+
+    concluir()  # manifestos sem nada a refazer (ex.: só SemDados com --so-erros)
+    resumo = {}
+    for (pasta, nome_base, uf), unidades in grupos.items():
+        if unidades:
+            resumo[nome_base] = refazer_grupo(pasta, nome_base, uf, unidades, paralelismo)
+        concluir((pasta, nome_base, uf))
+    return resumo
+
+
+def retomar(saida):
+    # Execução noturna com --time-budget: se a anterior deixou pendentes na pasta, termina elas antes de
+    # começar uma extração nova. Devolve True se havia o que retomar
+    pendentes = sorted(glob.glob(os.path.join(saida or ".", "pendentes_*.jsonl")))
+    if not pendentes:
+        return False
+    print(f"⏯️ Retomando {len(pendentes)} manifesto(s) de pendentes da execução anterior em {saida}")
+    refazer(pendentes)
+    return True
+
+
+if __name__ == "__main__":
+    configurar_prazo()
+    manifestos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not manifestos:
+        print("Uso: python refazer.py <falhas_*.jsonl> [...] [--so-erros]")
+    else:
+        try:
+            refazer(manifestos, so_erros="--so-erros" in sys.argv)
+        finally:
+            metricas.salvar_execucao("REFAZER")
@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+import zipfile
+from datetime import datetime
+import pandas as pd
+import armazem
+import motor
+from cliente_siconfi import pausar
+from lotes import AcumuladorLotes
+from metricas import metricas
+from perfil import fase
+
+# === CONFIGURAÇÕES ===
+# URLs e pausa entre requisições ficam em motor.py (núcleo comum dos extratores)
+OUTPUT_DIR = "retificacoes"
+
+# Colunas guardadas que identificam a consulta original de cada série (ente, período...)
+SERIES = {
+    "RREO": ["cod_ibge", "ente", "periodo", "tipo_demonstrativo"],
+    "RGF": ["cod_ibge", "ente", "esfera", "periodicidade", "periodo", "tipo_demo", "poder"],
+}
+
+
+def series_guardadas(relatorio, ano, uf=None):
+    dataset = armazem.abrir_dataset(relatorio)
+    colunas = [c for c in SERIES[relatorio] if c in dataset.schema.names]
+    tabela = dataset.to_table(columns=colunas, filter=armazem.montar_filtro({"ano": ano, "uf": uf}))
+    return tabela.to_pandas().drop_duplicates().reset_index(drop=True)
+
+
+def consultar_serie(relatorio, ano, serie):
+    # Mesma consulta dos extratores, mas levantando exceção em falha (vazio não é retificação)
+    if relatorio == "RREO":
+        return motor._consultar_rreo(serie["cod_ibge"], ano, serie["periodo"], serie["tipo_demonstrativo"])
+    return motor._consultar_rgf(serie["cod_ibge"], ano, serie["periodicidade"], serie["periodo"], serie["tipo_demo"],
+                                serie["poder"], serie["esfera"])
+
+
+# === COMPARAÇÃO ===
+def comparar_hashes(guardados, novos, chaves):
+    # situacao: "alterado" (hash diferente), "novo" (anexo que não existia) ou "removido" (anexo que sumiu)
+    juntos = guardados.merge(novos, on=chaves, how="outer", suffixes=("_guardado", "_novo"), indicator=True)
+    juntos["situacao"] = "igual"
+    juntos.loc[juntos["_merge"] == "right_only", "situacao"] = "novo"
+    juntos.loc[juntos["_merge"] == "left_only", "situacao"] = "removido"
+    alterados = (juntos["_merge"] == "both") & (juntos["hash_guardado"] != juntos["hash_novo"])
+    juntos.loc[alterados, "situacao"] = "alterado"
+    return juntos[juntos["situacao"] != "igual"].drop(columns="_merge").reset_index(drop=True)
+
+
+def salvar_delta(delta, nome_base):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    nome_csv = f"{nome_base}_{timestamp}.csv"
+    caminho_zip = os.path.join(OUTPUT_DIR, nome_csv.replace(".csv", ".zip"))
+    with zipfile.ZipFile(caminho_zip, "w", zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr(nome_csv, delta.to_csv(index=False, sep=";", encoding="utf-8"))
+    print(f"✅ Delta salvo: {caminho_zip}")
+    return caminho_zip
+
+
+# === REVALIDAÇÃO ===
+def revalidar(relatorio, ano, uf=None, atualizar=False):
+    # Baixa de novo cada série guardada e compara os hashes por (ente, período, anexo) com os do armazém
+    if not armazem.armazem_disponivel() or relatorio not in armazem.relatorios_disponiveis():
+        print(f"⚠️ Nada guardado no armazém para {relatorio}.")
+        return {}
+    series = series_guardadas(relatorio, ano, uf)
+    print(f"🔁 Revalidando {len(series)} série(s) de {relatorio} {ano}{f' ({uf})' if uf else ''}")
+
+    resultados = AcumuladorLotes(relatorio)
+    falhas = []
+    for serie in series.to_dict("records"):
+        try:
+            df = consultar_serie(relatorio, ano, serie)
+        except Exception as e:
+            df = None
+            falhas.append({**serie, "erro": str(e)})
+        if df is not None and not df.empty:
+            resultados.adicionar(df, ano=ano, **{c: serie[c] for c in SERIES[relatorio] if c in serie})
+        elif df is not None:
+            # Resposta vazia não prova que o demonstrativo foi retirado: fica fora da comparação
+            falhas.append({**serie, "erro": "sem dados"})
+        pausar(motor.PAUSA_ENTRE_REQUISICOES)
+
+    if not resultados:
+        print("⚠️ Nenhuma série pôde ser baixada de novo.")
+        return {"series": len(series), "falhas": len(falhas), "alteracoes": []}
+
+    novo = resultados.concatenar()
+    resultados.limpar()
+    chaves = armazem.chaves_hash(relatorio)
+    serie_chaves = chaves[:-1]
+    with fase("hash"):
+        novos_hashes = armazem.hashes_de_conteudo(armazem._normalizar(novo), relatorio)
+        guardados = armazem.hashes_guardados(relatorio, ano)
+        # Só compara as séries que foram de fato baixadas agora
+        baixadas = pd.MultiIndex.from_frame(novos_hashes[serie_chaves].drop_duplicates())
+        guardados = guardados[pd.MultiIndex.from_frame(guardados[serie_chaves]).isin(baixadas)]
+        alteracoes = comparar_hashes(guardados, novos_hashes, chaves)
+
+    resumo = {
+        "relatorio": relatorio,
+        "ano": ano,
+        "uf": uf,
+        "series": len(series),
+        "falhas": len(falhas),
+        "alteracoes": alteracoes.astype(object).where(alteracoes.notna(), None).to_dict("records"),
+    }
+    contagem = alteracoes["situacao"].value_counts().to_dict()
+    print(f"📋 {len(alteracoes)} anexo(s) com diferença: {contagem or 'nenhuma'} | {len(falhas)} série(s) sem resposta")
+
+    if not alteracoes.empty:
+        nome_base = f"{relatorio}_{uf or 'TODAS'}_{ano}_retificacoes"
+        normalizado = armazem._normalizar(novo)
+        mudou = pd.MultiIndex.from_frame(alteracoes.loc[alteracoes["situacao"] != "removido", chaves])
+        delta = novo[pd.MultiIndex.from_frame(normalizado[chaves]).isin(mudou)]
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        with fase("escrita"):
+            if not delta.empty:
+                salvar_delta(delta, nome_base)
+            with open(os.path.join(OUTPUT_DIR, f"{nome_base}.json"), "w", encoding="utf-8") as f:
+                json.dump(resumo, f, ensure_ascii=False, indent=2, default=str)
+        if atualizar:
+            # Regrava as séries inteiras que mudaram: o armazém substitui por (ente, período...)
+            afetadas = pd.MultiIndex.from_frame(alteracoes[serie_chaves].drop_duplicates())
+            gravar = novo[pd.MultiIndex.from_frame(normalizado[serie_chaves]).isin(afetadas)]
+            armazem.gravar_no_armazem(gravar, relatorio)
+    return resumo
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(argumentos) < 2:
+        print("Uso: python retificacao.py <RREO|RGF> <ano> [UF] [--atualizar]")
+    else:
+        try:
+            revalidar(argumentos[0].upper(), int(argumentos[1]),
+                      argumentos[2].upper() if len(argumentos) > 2 else None,
+                      atualizar="--atualizar" in sys.argv)
+        finally:
+            metricas.salvar_execucao(f"RETIFICACAO_{argumentos[0].upper()}")
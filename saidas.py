@@ -0,0 +1,110 @@
+import gc
+import io
+import json
+import os
+import re
+import zipfile
+from datetime import datetime
+import pandas as pd
+from perfil import fase
+
+
+# === SAÍDAS DOS EXTRATORES ===
+def salvar_csv_zip(df, nome_base, saida, manter_csv=False):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    nome_csv = f"{nome_base}_{timestamp}.csv"
+    caminho_csv = os.path.join(saida, nome_csv)
+    df.to_csv(caminho_csv, index=False, sep=";", encoding="utf-8")
+
+    nome_zip = nome_csv.replace(".csv", ".zip")
+    caminho_zip = os.path.join(saida, nome_zip)
+    with zipfile.ZipFile(caminho_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        zipf.write(caminho_csv, arcname=nome_csv)
+
+    if not manter_csv:
+        os.remove(caminho_csv)
+    print(f"✅ Arquivo salvo: {caminho_zip}")
+    return caminho_zip
+
+
+def salvar_log_falhas(logs, saida, esfera, uf=None, relatorio="RGF"):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    uf_part = f"_{uf}" if uf else ""
+    nome_log = f"log_falhas_{relatorio}_{esfera}{uf_part}_{timestamp}.txt"
+    caminho_log = os.path.join(saida, nome_log)
+    with open(caminho_log, "w", encoding="utf-8") as f:
+        f.write("\n".join(logs))
+    print(f"📄 Log de falhas salvo: {caminho_log}")
+    return caminho_log
+
+
+def salvar_manifesto_falhas(falhas, saida, nome_base, uf=None):
+    # Uma linha JSON por unidade que falhou (parâmetros exatos e classe do erro), na mesma pasta do ZIP do
+    # grupo: `python refazer.py <manifesto>` busca só essas unidades e as mescla no ZIP. As que ficaram de fora
+    # por causa do orçamento de tempo vão para pendentes_*.jsonl, retomado na próxima execução com --time-budget
+    pendentes = [falha for falha in falhas if falha["erro"] == "PrazoEsgotado"]
+    if pendentes:
+        _gravar_manifesto(pendentes, saida, nome_base, uf, "pendentes")
+    return _gravar_manifesto([falha for falha in falhas if falha["erro"] != "PrazoEsgotado"], saida, nome_base, uf)
+
+
+def _gravar_manifesto(falhas, saida, nome_base, uf, prefixo="falhas"):
+    if not falhas:
+        return None
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    caminho = os.path.join(saida, f"{prefixo}_{nome_base}_{timestamp}.jsonl")
+    with open(caminho, "w", encoding="utf-8") as f:
+        for falha in falhas:
+            f.write(json.dumps({**falha, "uf": uf, "nome_base": nome_base}, ensure_ascii=False, default=str) + "\n")
+    if prefixo == "pendentes":
+        print(f"⏸️ Pendentes para a próxima execução: {caminho} ({len(falhas)} unidade(s))")
+        return caminho
+    erros = pd.Series([falha["erro"] for falha in falhas]).value_counts().to_dict()
+    print(f"📄 Manifesto de falhas salvo: {caminho} ({len(falhas)} unidade(s): {erros})")
+    return caminho
+
+
+def ultimo_zip(saida, nome_base):
+    padrao = re.compile(re.escape(nome_base) + r"_\d{8}_\d{6}\.zip$")
+    candidatos = sorted(nome for nome in os.listdir(saida or ".") if padrao.match(nome))
+    return os.path.join(saida, candidatos[-1]) if candidatos else None
+
+
+def _como_texto(df):
+    # Mesma formatação do to_csv das saídas, para juntar com um ZIP já gravado sem mudar nenhum valor
+    return pd.read_csv(io.StringIO(df.to_csv(index=False, sep=";")), sep=";", dtype=str, keep_default_na=False)
+
+
+def mesclar_no_zip(df, saida, nome_base, chaves):
+    # Junta as linhas novas ao último ZIP do grupo, substituindo as de mesma chave, e troca o ZIP antigo
+    antigo = ultimo_zip(saida, nome_base)
+    novo = _como_texto(df)
+    if antigo:
+        with zipfile.ZipFile(antigo) as zipf:
+            with zipf.open(zipf.namelist()[0]) as f:
+                existente = pd.read_csv(f, sep=";", dtype=str, keep_default_na=False)
+        substituidas = pd.MultiIndex.from_frame(novo[chaves])
+        existente = existente[~pd.MultiIndex.from_frame(existente[chaves]).isin(substituidas)]
+        colunas = list(existente.columns) + [c for c in novo.columns if c not in existente.columns]
+        novo = pd.concat([existente, novo], ignore_index=True)[colunas].fillna("")
+    caminho = salvar_csv_zip(novo, nome_base, saida)
+    if antigo and os.path.abspath(antigo) != os.path.abspath(caminho):
+        os.remove(antigo)
+    return caminho
+
+
+def salvar_resultados(resultados, relatorio, nome_base, saida, manter_csv=False):
+    # Concatena os lotes de um grupo (UF/esfera), grava o ZIP e o armazém e libera a memória do grupo
+    if not resultados:
+        return None
+    import armazem  # pyarrow só é carregado quando há algo a gravar
+
+    df_concat = resultados.concatenar()
+    resultados.limpar()
+    os.makedirs(saida or ".", exist_ok=True)
+    with fase("escrita"):
+        caminho = salvar_csv_zip(df_concat, nome_base, saida, manter_csv)
+    armazem.gravar_no_armazem(df_concat, relatorio)
+    del df_concat
+    gc.collect()
+    return caminho
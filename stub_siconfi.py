@@ -0,0 +1,285 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# === CONFIGURAÇÕES ===
+FIXTURES_DIR = "fixtures"
+LIMITE_PAGINA = 5000  # mesmo limite de linhas por página da API ORDS do Tesouro
+
+# Parâmetro da API -> coluna dos itens retornados
+PARAMETROS = {
+    "id_ente": "cod_ibge",
+    "an_exercicio": "exercicio",
+    "nr_periodo": "periodo",
+    "co_tipo_demonstrativo": "demonstrativo",
+    "in_periodicidade": "periodicidade",
+    "co_poder": "co_poder",
+    "co_esfera": "esfera",
+    "no_anexo": "anexo",
+}
+CHAVE_INDICE = ("cod_ibge", "exercicio", "periodo")
+
+
+# === FIXTURES ===
+def carregar_fixtures(diretorio=FIXTURES_DIR):
+    # entes.json: lista de entes; rreo.jsonl / rgf.jsonl: uma linha (item da API) por registro
+    with open(os.path.join(diretorio, "entes.json"), encoding="utf-8") as f:
+        entes = json.load(f)
+    relatorios = {}
+    for endpoint in ("rreo", "rgf"):
+        indice = defaultdict(list)
+        caminho = os.path.join(diretorio, f"{endpoint}.jsonl")
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                for linha in f:
+                    item = json.loads(linha)
+                    indice[tuple(str(item.get(c)) for c in CHAVE_INDICE)].append(item)
+        relatorios[endpoint] = indice
+    return entes, relatorios
+
+
+def gerar_fixtures(diretorio=FIXTURES_DIR, ano=2024, ufs=("AC", "RJ", "SP"), municipios_por_uf=5,
+                   linhas_por_anexo=40, semente=42):
+    # Gera fixtures sintéticas com o formato da API: entes de todas as esferas, entes sem dados,
+    # municípios pequenos só com "RREO Simplificado" e relatórios grandes para estados e União
+    rnd = random.Random(semente)
+    entes = [{"cod_ibge": 1, "ente": "Brasil", "capital": 0, "regiao": "BR", "uf": "BR",
+              "esfera": "U", "exercicio": ano, "populacao": 203000000, "cnpj": "00000000000000"},
+             {"cod_ibge": 53, "ente": "Distrito Federal", "capital": 1, "regiao": "CO", "uf": "DF",
+              "esfera": "D", "exercicio": ano, "populacao": 2800000, "cnpj": "00000000000001"}]
+    for i, uf in enumerate(ufs):
+        cod_uf = 11 + i
+        entes.append({"cod_ibge": cod_uf, "ente": f"Estado {uf}", "capital": 0, "regiao": "XX", "uf": uf,
+                      "esfera": "E", "exercicio": ano, "populacao": rnd.randint(800000, 40000000),
+                      "cnpj": f"{cod_uf:014d}"})
+        for m in range(municipios_por_uf):
+            cod = cod_uf * 100000 + m
+            entes.append({"cod_ibge": cod, "ente": f"Município {uf} {m}", "capital": int(m == 0),
+                          "regiao": "XX", "uf": uf, "esfera": "M", "exercicio": ano,
+                          "populacao": rnd.randint(2000, 12000000 if m == 0 else 200000), "cnpj": f"{cod:014d}"})
+
+    def linhas(ente, demonstrativo, periodo, periodicidade, anexos, extra):
+        for anexo in anexos:
+            for n in range(linhas_por_anexo):
+                item = {"exercicio": ano, "demonstrativo": demonstrativo, "periodo": periodo,
+                        "periodicidade": periodicidade, "instituicao": f"Prefeitura de {ente['ente']}",
+                        "cod_ibge": ente["cod_ibge"], "uf": ente["uf"], "populacao": ente["populacao"],
+                        "anexo": anexo, "esfera": ente["esfera"], "rotulo": "Padrão",
+                        "coluna": rnd.choice(["PREVISÃO INICIAL", "RECEITAS REALIZADAS", "DESPESAS EMPENHADAS"]),
+                        "cod_conta": f"Conta{n:04d}", "conta": f"Descrição da conta {n}",
+                        "valor": round(rnd.uniform(-1e6, 1e9), 2)}
+                item.update(extra)
+                yield item
+
+    os.makedirs(diretorio, exist_ok=True)
+    with open(os.path.join(diretorio, "entes.json"), "w", encoding="utf-8") as f:
+        json.dump(entes, f, ensure_ascii=False)
+
+    with open(os.path.join(diretorio, "rreo.jsonl"), "w", encoding="utf-8") as f:
+        for ente in entes:
+            if rnd.random() < 0.1:
+                continue  # ente que não entregou nenhum RREO
+            grande = ente["esfera"] in ("U", "E", "D")
+            demonstrativo = "RREO" if grande or ente["populacao"] > 50000 else "RREO Simplificado"
+            anexos = [f"RREO-Anexo {a:02d}" for a in range(1, 15 if grande else 6)]
+            for periodo in range(1, 7):
+                for item in linhas(ente, demonstrativo, periodo, "B", anexos, {}):
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    with open(os.path.join(diretorio, "rgf.jsonl"), "w", encoding="utf-8") as f:
+        for ente in entes:
+            poderes = ["E", "L"] if ente["esfera"] == "M" else ["E", "L", "J", "M", "D"]
+            periodicidade, periodos = ("Q", 3) if ente["populacao"] > 50000 else ("S", 2)
+            demonstrativo = "RGF" if periodicidade == "Q" else "RGF Simplificado"
+            anexos = [f"RGF-Anexo {a:02d}" for a in range(1, 7 if ente["esfera"] != "M" else 5)]
+            for poder in poderes:
+                for periodo in range(1, periodos + 1):
+                    for item in linhas(ente, demonstrativo, periodo, periodicidade, anexos, {"co_poder": poder}):
+                        f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    print(f"✅ Fixtures sintéticas geradas em {diretorio}")
+
+
+def fixtures_de_gravacao(caminho_gravacao, diretorio=FIXTURES_DIR):
+    # Converte uma gravação real do cliente (SICONFI_GRAVAR) em fixtures para o stub
+    entes = {}
+    itens = {"rreo": {}, "rgf": {}}
+    with gzip.open(caminho_gravacao, "rt", encoding="utf-8") as f:
+        for linha in f:
+            registro = json.loads(linha)
+            if registro["status"] != 200:
+                continue
+            endpoint = registro["chave"].split("?", 1)[0]
+            for item in json.loads(registro["corpo"]).get("items", []):
+                if endpoint == "entes":
+                    entes[item["cod_ibge"]] = item
+                elif endpoint in itens:
+                    itens[endpoint][json.dumps(item, sort_keys=True, ensure_ascii=False)] = None
+
+    os.makedirs(diretorio, exist_ok=True)
+    with open(os.path.join(diretorio, "entes.json"), "w", encoding="utf-8") as f:
+        json.dump(list(entes.values()), f, ensure_ascii=False)
+    for endpoint, linhas in itens.items():
+        with open(os.path.join(diretorio, f"{endpoint}.jsonl"), "w", encoding="utf-8") as f:
+            f.writelines(linha + "\n" for linha in linhas)
+    print(f"✅ Fixtures geradas a partir de {caminho_gravacao}: {len(entes)} entes, "
+          f"{len(itens['rreo'])} linhas RREO, {len(itens['rgf'])} linhas RGF")
+
+
+# === SERVIDOR ===
+class ManipuladorSiconfi(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Keep-alive com cabeçalhos e corpo em escritas separadas: com o Nagle ligado, cada resposta espera o ACK
+    # atrasado do cliente (~40ms), e o benchmark mediria o stub e não o extrator
+    disable_nagle_algorithm = True
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+    def _responder(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        if status == 200 and self.server.validadores:
+            # ETag do corpo e Last-Modified da subida do servidor; requisição condicional que bate = 304 sem corpo
+            etag = '"' + hashlib.md5(dados).hexdigest() + '"'
+            cabecalhos = {**(cabecalhos or {}), "ETag": etag, "Last-Modified": self.server.modificado_em}
+            condicao = self.headers.get("If-None-Match")
+            if condicao == etag or (condicao is None and
+                                    self.headers.get("If-Modified-Since") == self.server.modificado_em):
+                with self.server.lock:
+                    self.server.contagem["304"] += 1
+                status, dados = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        if dados:
+            self.wfile.write(dados)
+
+    def do_GET(self):
+        servidor = self.server
+        url = urlparse(self.path)
+        endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with servidor.lock:
+            servidor.contagem[endpoint] += 1
+
+        if servidor.latencia:
+            time.sleep(max(servidor.rnd.gauss(servidor.latencia, servidor.latencia / 4), 0))
+        if servidor.taxa_lenta and servidor.rnd.random() < servidor.taxa_lenta:
+            time.sleep(servidor.latencia_lenta)  # retardatária: cauda de latência
+        sorteio = servidor.rnd.random()
+        if sorteio < servidor.taxa_429:
+            return self._responder(429, {"message": "Too Many Requests"}, {"Retry-After": "1"})
+        if sorteio < servidor.taxa_429 + servidor.taxa_erro:
+            return self._responder(500, {"message": "Erro interno simulado"})
+
+        if endpoint == "entes":
+            itens = servidor.entes
+        elif endpoint in servidor.relatorios:
+            itens = self._filtrar(servidor.relatorios[endpoint], params, servidor.filtro_q)
+            if itens is None:
+                return self._responder(400, {"message": "Parâmetro id_ente obrigatório"})
+        else:
+            return self._responder(404, {"message": f"Endpoint desconhecido: {endpoint}"})
+
+        offset = int(params.get("offset", 0))
+        limite = min(int(params.get("limit", servidor.limite_pagina)), servidor.limite_pagina)
+        pagina = itens[offset:offset + limite]
+        self._responder(200, {"items": pagina, "hasMore": offset + limite < len(itens),
+                              "limit": limite, "offset": offset, "count": len(pagina), "links": []})
+
+    @staticmethod
+    def _filtrar(indice, params, filtro_q=True):
+        # Filtro ORDS (q={"cod_ibge":{"$in":[...]}}) sobre as colunas dos itens: vários entes por requisição.
+        # Sem filtro_q o q é ignorado, como num endpoint que só aceita os parâmetros (None = 400)
+        filtro = json.loads(params["q"]) if filtro_q and params.get("q") else {}
+        condicoes = {c: [str(x) for x in (v["$in"] if isinstance(v, dict) else [v])] for c, v in filtro.items()}
+        if "id_ente" in params:
+            entes = [params["id_ente"]]
+        elif "cod_ibge" in condicoes:
+            entes = condicoes["cod_ibge"]
+        else:
+            return None
+        candidatos = [item for ente in entes
+                      for item in indice.get((ente, params.get("an_exercicio"), params.get("nr_periodo")), [])]
+        restantes = [(PARAMETROS[p], [v]) for p, v in params.items()
+                     if p in PARAMETROS and PARAMETROS[p] not in CHAVE_INDICE]
+        restantes += [(c, v) for c, v in condicoes.items() if c != "cod_ibge"]
+        return [item for item in candidatos if all(str(item.get(c)) in v for c, v in restantes)]
+
+
+def criar_servidor(diretorio=FIXTURES_DIR, porta=0, latencia=0.0, taxa_erro=0.0, taxa_429=0.0,
+                   limite_pagina=LIMITE_PAGINA, semente=0, verboso=False, taxa_lenta=0.0, latencia_lenta=5.0,
+                   filtro_q=True, validadores=True):
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), ManipuladorSiconfi)
+    servidor.daemon_threads = True
+    servidor.entes, servidor.relatorios = carregar_fixtures(diretorio)
+    servidor.latencia = latencia
+    servidor.taxa_erro = taxa_erro
+    servidor.taxa_429 = taxa_429
+    servidor.taxa_lenta = taxa_lenta
+    servidor.latencia_lenta = latencia_lenta
+    servidor.limite_pagina = limite_pagina
+    servidor.filtro_q = filtro_q
+    servidor.validadores = validadores
+    servidor.modificado_em = formatdate(usegmt=True)
+    servidor.rnd = random.Random(semente)
+    servidor.verboso = verboso
+    servidor.lock = threading.Lock()
+    servidor.contagem = defaultdict(int)
+    return servidor
+
+
+def iniciar_em_segundo_plano(**kwargs):
+    servidor = criar_servidor(**kwargs)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/ords/siconfi/tt"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita os endpoints /entes, /rreo e /rgf do Siconfi")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.0, help="latência média por requisição (s)")
+    parser.add_argument("--erro", type=float, default=0.0, help="fração de respostas 500")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="fração de respostas 429")
+    parser.add_argument("--taxa-lenta", type=float, default=0.0, help="fração de respostas retardatárias")
+    parser.add_argument("--latencia-lenta", type=float, default=5.0, help="atraso extra das retardatárias (s)")
+    parser.add_argument("--limite-pagina", type=int, default=LIMITE_PAGINA)
+    parser.add_argument("--gerar", action="store_true", help="gera fixtures sintéticas antes de subir")
+    parser.add_argument("--gravacao", help="gera as fixtures a partir de uma gravação do cliente (.jsonl.gz)")
+    parser.add_argument("--sem-filtro-q", action="store_true",
+                        help="ignora o filtro q= (só um ente por requisição, via id_ente)")
+    parser.add_argument("--sem-validadores", action="store_true",
+                        help="respostas sem ETag/Last-Modified (o cliente compara pelo hash do conteúdo)")
+    parser.add_argument("--verboso", action="store_true")
+    args = parser.parse_args()
+
+    if args.gravacao:
+        fixtures_de_gravacao(args.gravacao, args.fixtures)
+    elif args.gerar or not os.path.exists(os.path.join(args.fixtures, "entes.json")):
+        gerar_fixtures(args.fixtures)
+    servidor = criar_servidor(args.fixtures, args.porta, args.latencia, args.erro, args.taxa_429,
+                              args.limite_pagina, verboso=args.verboso, taxa_lenta=args.taxa_lenta,
+                              latencia_lenta=args.latencia_lenta, filtro_q=not args.sem_filtro_q,
+                              validadores=not args.sem_validadores)
+    print(f"🧪 Stub Siconfi em http://127.0.0.1:{args.porta}/ords/siconfi/tt/(entes|rreo|rgf)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
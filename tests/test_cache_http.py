@@ -0,0 +1,71 @@
+import glob
+import os
+
+import pytest
+
+import stub_siconfi
+from cache_http import cache_respostas
+from cliente_siconfi import _get
+
+
+@pytest.fixture(scope="module")
+def fixtures(tmp_path_factory):
+    diretorio = str(tmp_path_factory.mktemp("fixtures"))
+    stub_siconfi.gerar_fixtures(diretorio, municipios_por_uf=1, linhas_por_anexo=5)
+    return diretorio
+
+
+def servidor(fixtures, validadores=True):
+    servidor, base = stub_siconfi.iniciar_em_segundo_plano(diretorio=fixtures, validadores=validadores)
+    return servidor, base + "/entes"
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    # O mesmo objeto que o cliente usa, apontado para uma pasta vazia e sempre revalidando
+    monkeypatch.setattr(cache_respostas, "diretorio", str(tmp_path))
+    monkeypatch.setattr(cache_respostas, "frescor", 0)
+    return cache_respostas
+
+
+def test_segunda_consulta_vem_do_disco_com_304(fixtures, cache):
+    stub, url = servidor(fixtures)
+    primeira = _get(url, {}, 10, gravar=False)
+    entrada = cache.ler(url, {})
+    assert primeira.status_code == 200 and entrada["etag"] and entrada["last_modified"]
+    segunda = _get(url, {}, 10, gravar=False)
+    assert stub.contagem["304"] == 1
+    assert segunda.status_code == 200 and segunda.origem_cache == "revalidada"
+    assert segunda.content == primeira.content and segunda.json() == primeira.json()
+    stub.shutdown()
+
+
+def test_corpo_sumido_baixa_de_novo(fixtures, cache, tmp_path):
+    stub, url = servidor(fixtures)
+    primeira = _get(url, {}, 10, gravar=False)
+    for corpo in glob.glob(os.path.join(str(tmp_path), "*", "*.gz")):
+        os.remove(corpo)
+    segunda = _get(url, {}, 10, gravar=False)
+    assert stub.contagem["304"] == 1 and stub.contagem["entes"] == 3
+    assert segunda.content == primeira.content
+    assert glob.glob(os.path.join(str(tmp_path), "*", "*.gz"))  # mesmo hash, mas o corpo volta ao disco
+    stub.shutdown()
+
+
+def test_sem_validadores_compara_pelo_hash(fixtures, cache):
+    stub, url = servidor(fixtures, validadores=False)
+    primeira = _get(url, {}, 10, gravar=False)
+    assert cache.validadores(cache.ler(url, {})) == {}
+    segunda = _get(url, {}, 10, gravar=False)
+    assert stub.contagem["304"] == 0
+    assert segunda.origem_cache == "igual" and segunda.content == primeira.content
+    stub.shutdown()
+
+
+def test_frescor_dispensa_a_requisicao(fixtures, cache, monkeypatch):
+    stub, url = servidor(fixtures)
+    primeira = _get(url, {}, 10, gravar=False)
+    assert cache.fresca(url, {}) is None  # frescor 0: sempre revalida
+    monkeypatch.setattr(cache, "frescor", 60)
+    assert cache.fresca(url, {}) == primeira.content
+    stub.shutdown()
@@ -0,0 +1,51 @@
+import json
+import pandas as pd
+import pytest
+import decodificacao
+from decodificacao import dataframe_de_itens, dataframe_de_paginas, decodificar_colunar
+
+pytest.importorskip("pyarrow")
+
+
+def item(**extra):
+    base = {"exercicio": 2024, "periodo": 1, "cod_ibge": 12, "uf": "AC", "anexo": "RREO-Anexo 01",
+            "coluna": "ATÉ O BIMESTRE", "conta": "Receitas", "valor": 10.5}
+    return {**base, **extra}
+
+
+def corpo(itens):
+    return json.dumps({"items": itens, "hasMore": False}).encode("utf-8")
+
+
+def colunar(itens):
+    return dataframe_de_paginas([decodificar_colunar(corpo(itens), "RREO")["items"]], "RREO")
+
+
+def test_ordem_segue_o_primeiro_item():
+    itens = [item(), item(periodo=2)]
+    assert list(colunar(itens).columns) == list(item())
+
+
+def test_campo_ausente_so_no_primeiro_item_nao_e_descartado():
+    itens = [item(), item(periodo=2, populacao=900000)]
+    df = colunar(itens)
+    assert list(df.columns) == list(item()) + ["populacao"]
+    assert df["populacao"].isna().tolist() == [True, False]
+    pd.testing.assert_frame_equal(df, dataframe_de_itens(itens, "RREO"))
+
+
+def test_campo_do_esquema_ausente_em_todos_os_itens_nao_vira_coluna():
+    assert "populacao" not in colunar([item(), item(periodo=2)]).columns
+
+
+def test_primeiro_item_maior_que_a_janela_mantem_as_colunas():
+    # O primeiro item não cabe nos 16 KiB lidos para a ordem: as colunas presentes continuam todas lá
+    itens = [item(conta="x" * 20000), item(periodo=2, populacao=5)]
+    df = colunar(itens)
+    assert set(df.columns) == set(item()) | {"populacao"}
+    assert df["conta"].iloc[0] == "x" * 20000
+
+
+def test_sem_pyarrow_cai_no_json(monkeypatch):
+    monkeypatch.setattr(decodificacao, "_arrow", lambda: None)
+    assert decodificar_colunar(corpo([item()]), "RREO")["items"] == [item()]
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+import requests
+
+import cliente_siconfi
+from cliente_siconfi import ApiIndisponivel, Disjuntor
+
+URL = "http://stub/ords/siconfi/tt/rreo"
+
+
+def test_repeticoes_da_mesma_consulta_nao_abrem():
+    disjuntor = Disjuntor(limite_falhas=3)
+    for _ in range(5):
+        assert not disjuntor.falha(("rreo", 1))
+    assert disjuntor.falhas == 1 and not disjuntor.aberto
+
+
+def test_consultas_distintas_falhando_abrem():
+    disjuntor = Disjuntor(limite_falhas=3)
+    assert not disjuntor.falha(("rreo", 1))
+    assert not disjuntor.falha(("rreo", 2))
+    assert disjuntor.falha(("rreo", 3))
+    assert disjuntor.aberto
+    assert disjuntor.falha(("rreo", 4))  # aberto: tudo espera
+
+
+def test_sucesso_zera_as_falhas():
+    disjuntor = Disjuntor(limite_falhas=2)
+    disjuntor.falha(("rreo", 1))
+    disjuntor.sucesso()
+    assert not disjuntor.falha(("rreo", 2))
+    assert disjuntor.falhas == 1
+
+
+class Resposta:
+    def __init__(self, ok):
+        self.ok = ok
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError("503")
+
+
+def test_sonda_dobra_a_espera_e_fecha_quando_responde(monkeypatch):
+    disjuntor = Disjuntor(limite_falhas=1, espera=0.01, espera_maxima=0.03)
+    sondas = []
+
+    def get(url, params, timeout):
+        sondas.append(disjuntor.espera_atual)
+        return Resposta(len(sondas) > 3)
+
+    monkeypatch.setattr(cliente_siconfi.requests, "get", get)
+    disjuntor.falha()
+    disjuntor.aguardar(URL)
+    # Cada sonda que falha dobra a espera até a máxima; a que responde fecha e volta à espera inicial
+    assert sondas == [0.01, 0.02, 0.03, 0.03]
+    assert not disjuntor.aberto and disjuntor.espera_atual == 0.01
+
+
+def test_fechado_nao_sonda(monkeypatch):
+    monkeypatch.setattr(cliente_siconfi.requests, "get", lambda *a, **k: pytest.fail("sondou fechado"))
+    Disjuntor().aguardar(URL)
+
+
+def test_limite_de_parada(monkeypatch):
+    monkeypatch.setattr(cliente_siconfi.requests, "get", lambda *a, **k: Resposta(False))
+    disjuntor = Disjuntor(limite_falhas=1, espera=0, limite_parada=0.05)
+    disjuntor.falha()
+    time.sleep(0.06)
+    with pytest.raises(ApiIndisponivel):
+        disjuntor.aguardar(URL)
@@ -0,0 +1,35 @@
+from incremental import PlanoIncremental
+
+
+def plano(janela, ultimos):
+    plano = PlanoIncremental("RREO", 2024, ativo=False, janela=janela)
+    plano.ultimos = ultimos
+    plano.ativo = True
+    return plano
+
+
+def test_janela_de_revisao():
+    # Último bimestre guardado = 3: janela 0 só busca os novos, janela 1 refaz o 3, janela 2 refaz o 2 e o 3
+    assert plano(0, {1: 3}).periodos(1, range(1, 7)) == [4, 5, 6]
+    assert plano(1, {1: 3}).periodos(1, range(1, 7)) == [3, 4, 5, 6]
+    assert plano(2, {1: 3}).periodos(1, range(1, 7)) == [2, 3, 4, 5, 6]
+
+
+def test_ente_fora_do_armazem_busca_tudo():
+    assert plano(1, {1: 3}).periodos(2, range(1, 7)) == [1, 2, 3, 4, 5, 6]
+
+
+def test_contadores_e_resumo():
+    incremental = plano(1, {1: 6})
+    incremental.periodos(1, range(1, 7))
+    incremental.periodos(2, range(1, 7))
+    assert (incremental.consultas, incremental.puladas) == (7, 5)
+    assert "5 de 12" in incremental.resumo()
+    assert PlanoIncremental("RREO", 2024, ativo=False).resumo() == ""
+
+
+def test_periodicidade_conhecida_do_rgf():
+    incremental = plano(1, {(1, "E", "Q"): 2, (2, "E", "S"): 1})
+    assert incremental.periodicidades(1, "E", ["Q", "S"]) == ["Q"]
+    assert incremental.periodicidades(2, "E", ["Q", "S"]) == ["S"]
+    assert incremental.periodicidades(1, "L", ["Q", "S"]) == ["Q", "S"]
@@ -0,0 +1,54 @@
+import pytest
+
+import limitador
+from limitador import INATIVO_APOS, Limitador
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(limitador.time, "time", lambda: agora[0])
+    return agora
+
+
+def test_fatia_proporcional_ao_peso(tmp_path, relogio):
+    alto = Limitador(taxa=4, prioridade=3, diretorio=str(tmp_path))
+    baixo = Limitador(taxa=4, prioridade=1, diretorio=str(tmp_path))
+    assert alto._tentar() == 0  # cada um entra com uma ficha
+    assert baixo._tentar() == 0
+    # Sem fichas: peso 3 enche a 3/s e peso 1 a 1/s (a soma fica na taxa de 4/s)
+    assert alto._tentar() == pytest.approx(1 / 3)
+    assert baixo._tentar() == pytest.approx(1.0)
+    relogio[0] += 0.5
+    assert alto._tentar() == 0
+    assert baixo._tentar() == pytest.approx(0.5)
+
+
+def test_fatia_de_inativo_volta_para_os_outros(tmp_path, relogio):
+    alto = Limitador(taxa=4, prioridade=3, diretorio=str(tmp_path))
+    baixo = Limitador(taxa=4, prioridade=1, diretorio=str(tmp_path))
+    alto._tentar()
+    baixo._tentar()
+    relogio[0] += INATIVO_APOS + 1
+    # Só o peso 3 seguiu pedindo: balde cheio com a taxa toda (4 fichas) e, vazio, 1/4 s por ficha
+    esperas = [alto._tentar() for _ in range(5)]
+    assert esperas[:4] == [0, 0, 0, 0]
+    assert esperas[4] == pytest.approx(1 / 4)
+
+
+def test_sair_libera_a_fatia_na_hora(tmp_path, relogio):
+    alto = Limitador(taxa=4, prioridade=3, diretorio=str(tmp_path))
+    baixo = Limitador(taxa=4, prioridade=1, diretorio=str(tmp_path))
+    alto._tentar()
+    baixo._tentar()
+    alto._tentar()
+    baixo.sair()
+    assert set(alto._ler()) == {alto.job}
+    assert alto._tentar() == pytest.approx(1 / 4)
+
+
+def test_tentar_nao_espera(tmp_path, relogio):
+    limite = Limitador(taxa=1, diretorio=str(tmp_path))
+    assert limite.tentar()
+    assert not limite.tentar()
+    assert Limitador(taxa=0, diretorio=str(tmp_path)).tentar()  # desligado: sempre há ficha
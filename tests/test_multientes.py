@@ -0,0 +1,44 @@
+import pandas as pd
+import multientes
+from multientes import ConsultaMultiEntes
+
+PARAMS = {"an_exercicio": 2024, "nr_periodo": 1, "co_tipo_demonstrativo": "RREO Simplificado"}
+
+
+def nova_consulta(monkeypatch, resposta_do_grupo):
+    entes = pd.DataFrame({"cod_ibge": [1, 2, 3], "esfera": "M", "populacao": [3000, 2000, 1000]})
+    consulta = ConsultaMultiEntes("http://stub/rreo", "RREO", entes, tamanho=3)
+    sozinhas = []
+    monkeypatch.setattr(consulta, "_consultar_grupo", lambda grupo, params, rotulos: resposta_do_grupo(grupo))
+    monkeypatch.setattr(multientes, "obter_dataframe",
+                        lambda url, params, *a, **k: sozinhas.append(params["id_ente"]) or pd.DataFrame())
+    return consulta, sozinhas
+
+
+def fatias(grupo):
+    return {c: pd.DataFrame({"cod_ibge": [c]}) for c in grupo}
+
+
+def test_fatia_sai_quando_todos_pedem(monkeypatch):
+    consulta, sozinhas = nova_consulta(monkeypatch, fatias)
+    for c in (1, 2, 3):
+        assert consulta.obter(c, dict(PARAMS, id_ente=c))["cod_ibge"].tolist() == [c]
+    assert consulta.respostas == {} and sozinhas == []
+
+
+def test_fatias_de_quem_terminou_sem_pedir_saem_no_concluir(monkeypatch):
+    consulta, _ = nova_consulta(monkeypatch, fatias)
+    consulta.obter(1, dict(PARAMS, id_ente=1))
+    consulta.concluir(2, 2024)  # pulado pelo incremental
+    assert consulta.respostas
+    consulta.concluir(3, 2024)  # achou dados num tipo anterior
+    assert consulta.respostas == {}
+
+
+def test_grupo_que_falhou_sai_depois_das_requisicoes_individuais(monkeypatch):
+    consulta, sozinhas = nova_consulta(monkeypatch, lambda grupo: None)
+    consulta.obter(1, dict(PARAMS, id_ente=1))
+    consulta.obter(2, dict(PARAMS, id_ente=2))
+    assert sozinhas == [1, 2] and consulta.respostas
+    consulta.concluir(3, 2024)
+    assert consulta.respostas == {}
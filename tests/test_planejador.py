@@ -0,0 +1,64 @@
+import json
+
+import pandas as pd
+import pytest
+
+import armazem
+import planejador
+from planejador import Planejador, makespan_lpt
+
+
+@pytest.fixture
+def novo(monkeypatch, tmp_path):
+    # Sem histórico nem armazém: o custo sai da população (ou do que o teste puser em segundos_por_consulta)
+    monkeypatch.setattr(planejador, "METRICAS_DIR", str(tmp_path))
+    monkeypatch.setattr(armazem, "armazem_disponivel", lambda: False)
+    return lambda trabalhadores=1: Planejador("RREO", trabalhadores)
+
+
+def entes(populacoes, **colunas):
+    return pd.DataFrame({"cod_ibge": range(1, len(populacoes) + 1), "populacao": populacoes, **colunas})
+
+
+def test_maiores_primeiro(novo):
+    plano = novo()
+    ordenados = plano.ordenar(entes([1_000, 5_000_000, 200_000]), consultas=6)
+    assert ordenados["cod_ibge"].tolist() == [2, 3, 1]
+
+
+def test_historico_vale_mais_que_populacao(novo):
+    plano = novo()
+    plano.segundos_por_consulta = {1: 3.0}
+    ordenados = plano.ordenar(entes([1_000, 5_000_000]), consultas=6)
+    assert ordenados["cod_ibge"].tolist() == [1, 2]
+    assert ordenados["_custo"].tolist()[0] == 18.0
+
+
+def test_varios_anos_um_de_cada_vez(novo):
+    plano = novo()
+    df = pd.concat([entes([1_000, 5_000_000], _ano=2023), entes([1_000, 5_000_000], _ano=2024)],
+                   ignore_index=True)
+    ordenados = plano.ordenar(df, consultas=6)
+    assert list(zip(ordenados["_ano"], ordenados["cod_ibge"])) == [(2024, 2), (2024, 1), (2023, 2), (2023, 1)]
+
+
+def test_ufs_mais_caras_primeiro(novo):
+    plano = novo()
+    grupos = [("AC", entes([1_000, 2_000])), ("SP", entes([5_000_000])), ("RJ", entes([100_000, 100_000]))]
+    assert [uf for uf, _ in plano.ordenar_grupos(grupos, consultas=6)] == ["SP", "RJ", "AC"]
+
+
+def test_makespan_lpt():
+    assert makespan_lpt([5, 4, 3, 3, 3], 2) == 10  # LPT: 5+3 | 4+3+3 (o ótimo seria 9)
+    assert makespan_lpt([5, 4, 3], 1) == 12
+    assert makespan_lpt([5, 1, 1], 4) == 5
+
+
+def test_executar_na_ordem_e_grava_historico(novo, tmp_path):
+    plano = novo()
+    feitos = []
+    plano.executar(entes([1_000, 5_000_000, 200_000]), 6, lambda row: feitos.append(row["cod_ibge"]) or 2)
+    assert feitos == [2, 3, 1]
+    with open(tmp_path / "custos_RREO.json", encoding="utf-8") as f:
+        assert set(json.load(f)) == {"1", "2", "3"}
+    assert set(novo().segundos_por_consulta) == {1, 2, 3}